@@ -0,0 +1,80 @@
+# benchmarks/bench_dialect.py
+"""
+Compara a ingestão de um CSV latin1 (com acentos apenas no final do arquivo)
+entre a estratégia antiga, que tenta UTF-8 e reprocessa tudo em latin1 ao
+falhar, e a detecção de dialeto em um prefixo. Como o prefixo é só ASCII, a
+detecção escolhe UTF-8 e também precisa da segunda leitura em latin1; a
+diferença medida vem do delimitador, do decimal e do engine.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_dialect --rows 1000000
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.dialect import read_with_fallback, sniff_source
+from src.ingestion import read_csv_streaming
+
+THRESHOLD_ROWS = 100000
+SAMPLE_ROWS = 50000
+CHUNK_ROWS = 50000
+
+
+def make_csv(rows: int, seed: int = 42) -> bytes:
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "id": np.arange(rows),
+        "valor": rng.normal(100, 15, rows).round(2),
+        "cidade": rng.choice(["Campinas", "Santos", "Sorocaba", "Jundiai"], rows),
+    })
+    # O único caractere não ASCII fica no fim: a falha de UTF-8 só aparece após quase todo o parse.
+    frame.loc[rows - 1, "cidade"] = "São Paulo"
+    return frame.to_csv(index=False, sep=";", decimal=",").encode("latin1")
+
+
+def retry_strategy(content: bytes):
+    for read_kwargs in ({}, {"encoding": "latin1"}):
+        try:
+            return read_csv_streaming(io.BytesIO(content), THRESHOLD_ROWS, SAMPLE_ROWS, CHUNK_ROWS,
+                                      sep=";", decimal=",", **read_kwargs)
+        except UnicodeDecodeError:
+            continue
+
+
+def sniff_strategy(content: bytes, engine: str):
+    source = io.BytesIO(content)
+    dialect = sniff_source(source, 65536)
+    return read_with_fallback(source, dialect, lambda read_kwargs: read_csv_streaming(
+        source, THRESHOLD_ROWS, SAMPLE_ROWS, CHUNK_ROWS, engine=engine, **read_kwargs))
+
+
+def timed(function, *args, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    content = make_csv(args.rows)
+    print(f"{args.rows} linhas, {len(content) / 1024 ** 2:.1f} MB (latin1, ';' e decimal ',')")
+    baseline = timed(retry_strategy, content, repeat=args.repeat)
+    print(f"{'UTF-8 e nova leitura em latin1':<34} {baseline:8.3f}s")
+    for engine in ("c", "pyarrow"):
+        seconds = timed(sniff_strategy, content, engine, repeat=args.repeat)
+        print(f"{'prefixo + ' + engine:<34} {seconds:8.3f}s  ({baseline / seconds:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# benchmarks/datasets.py
+"""
+Geradores determinísticos de datasets sintéticos para os benchmarks.
+
+Cada tipo reproduz um perfil que costuma expor gargalos diferentes:
+    tall              poucas colunas e muitas linhas (ingestão em blocos, amostragem)
+    wide              centenas de colunas numéricas (perfil, contexto do prompt)
+    mixed             tipos variados: datas, textos, booleanos, decimais
+    high_cardinality  textos quase únicos (HyperLogLog, memória de strings)
+    null_heavy        colunas com 40% a 95% de nulos
+
+Os dados são gerados em blocos, cada um com sua própria semente derivada de
+(`seed`, índice do bloco), de modo que o mesmo arquivo é produzido com qualquer
+tamanho de bloco e arquivos de 10⁸ linhas nunca ficam inteiros em memória.
+"""
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+KINDS = ("tall", "wide", "mixed", "high_cardinality", "null_heavy")
+FORMATS = ("csv", "zip")
+
+# Linhas por bloco na geração (as sementes dependem deste valor, que por isso é fixo).
+_BLOCK_ROWS = 100000
+_CITIES = np.array(["Recife", "Salvador", "São Paulo", "Curitiba", "Manaus", "Belém", "Natal", "Goiânia"])
+_WIDE_COLUMNS = 200
+
+
+def _tall(rng: np.random.Generator, start: int, rows: int) -> pd.DataFrame:
+    ids = np.arange(start, start + rows)
+    return pd.DataFrame({
+        "id": ids,
+        "data": pd.Timestamp("2020-01-01") + pd.to_timedelta(ids, unit="min"),
+        "valor": rng.normal(100, 15, rows).round(2),
+        "quantidade": rng.integers(1, 50, rows),
+        "cidade": rng.choice(_CITIES, rows),
+        "ativo": rng.random(rows) < 0.7,
+    })
+
+
+def _wide(rng: np.random.Generator, start: int, rows: int) -> pd.DataFrame:
+    values = rng.normal(0, 1, (rows, _WIDE_COLUMNS)).round(4)
+    frame = pd.DataFrame(values, columns=[f"col_{i}" for i in range(_WIDE_COLUMNS)])
+    frame.insert(0, "id", np.arange(start, start + rows))
+    return frame
+
+
+def _mixed(rng: np.random.Generator, start: int, rows: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "id": np.arange(start, start + rows),
+        "data_compra": pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 730, rows), unit="D"),
+        "cliente": np.char.add("Cliente ", rng.integers(0, 5000, rows).astype(str)),
+        "cidade": rng.choice(_CITIES, rows),
+        "preco": rng.lognormal(3, 1, rows).round(2),
+        "desconto": rng.choice([0.0, 0.05, 0.1, 0.2], rows),
+        "parcelas": rng.integers(1, 12, rows),
+        "entregue": rng.random(rows) < 0.9,
+        "avaliacao": rng.choice(["ruim", "regular", "boa", "ótima"], rows, p=[0.1, 0.2, 0.4, 0.3]),
+    })
+
+
+def _high_cardinality(rng: np.random.Generator, start: int, rows: int) -> pd.DataFrame:
+    ids = np.arange(start, start + rows)
+    tokens = rng.integers(0, 2 ** 62, rows, dtype=np.int64)
+    return pd.DataFrame({
+        "id": ids,
+        "usuario": np.char.add("u", tokens.astype(str)),
+        "email": np.char.add(np.char.add("user", ids.astype(str)), "@exemplo.com"),
+        "sessao": np.char.add("s", rng.integers(0, max(rows // 2, 1), rows).astype(str)),
+        "valor": rng.exponential(50, rows).round(2),
+    })
+
+
+def _null_heavy(rng: np.random.Generator, start: int, rows: int) -> pd.DataFrame:
+    frame = pd.DataFrame({"id": np.arange(start, start + rows)})
+    for i, null_ratio in enumerate((0.4, 0.6, 0.8, 0.9, 0.95)):
+        numbers = rng.normal(10 * i, 3, rows).round(3)
+        numbers[rng.random(rows) < null_ratio] = np.nan
+        frame[f"medida_{i}"] = numbers
+        labels = rng.choice(_CITIES, rows).astype(object)
+        labels[rng.random(rows) < null_ratio] = None
+        frame[f"rotulo_{i}"] = labels
+    return frame
+
+
+GENERATORS: Dict[str, Callable[[np.random.Generator, int, int], pd.DataFrame]] = {
+    "tall": _tall,
+    "wide": _wide,
+    "mixed": _mixed,
+    "high_cardinality": _high_cardinality,
+    "null_heavy": _null_heavy,
+}
+
+# Perguntas respondidas pelo modelo simulado, com o código que ele "gera" para cada tipo.
+# As perguntas não correspondem a nenhuma intenção do caminho rápido.
+QUESTIONS: Dict[str, List[Tuple[str, str]]] = {
+    "tall": [
+        ("Valor médio e quantidade total por cidade",
+         "result = df.groupby('cidade').agg(valor=('valor', 'mean'), quantidade=('quantidade', 'sum'))"),
+        ("Evolução do valor ao longo do tempo", "fig = px.line(df.sort_values('data'), x='data', y='valor')"),
+    ],
+    "wide": [
+        ("Matriz de correlação das 20 primeiras medidas",
+         "result = df[[f'col_{i}' for i in range(20)]].corr()"),
+    ],
+    "mixed": [
+        ("Faturamento líquido por avaliação",
+         "result = (df['preco'] * (1 - df['desconto'])).groupby(df['avaliacao']).sum()"),
+        ("Dispersão entre preço e parcelas", "fig = px.scatter(df, x='preco', y='parcelas', color='avaliacao')"),
+    ],
+    "high_cardinality": [
+        ("Quantos usuários e sessões diferentes existem",
+         "result = df[['usuario', 'sessao']].nunique()"),
+    ],
+    "null_heavy": [
+        ("Percentual preenchido de cada coluna", "result = df.notna().mean().mul(100).round(1)"),
+    ],
+}
+
+
+def iter_frames(kind: str, rows: int, seed: int = 42) -> Iterator[pd.DataFrame]:
+    """Gera o dataset `kind` com `rows` linhas em blocos de até 100 mil linhas."""
+    generator = GENERATORS[kind]
+    for block, start in enumerate(range(0, rows, _BLOCK_ROWS)):
+        rng = np.random.default_rng([seed, block])
+        yield generator(rng, start, min(_BLOCK_ROWS, rows - start))
+
+
+def generate(kind: str, rows: int, seed: int = 42) -> pd.DataFrame:
+    """O dataset inteiro em memória (apenas para tamanhos pequenos)."""
+    return pd.concat(iter_frames(kind, rows, seed), ignore_index=True)
+
+
+def write_csv(kind: str, rows: int, target, seed: int = 42) -> None:
+    """Escreve o dataset como CSV UTF-8 em `target` (caminho ou arquivo binário aberto)."""
+    if isinstance(target, (str, Path)):
+        with open(target, "wb") as f:
+            write_csv(kind, rows, f, seed)
+        return
+    for block, frame in enumerate(iter_frames(kind, rows, seed)):
+        target.write(frame.to_csv(index=False, header=block == 0).encode("utf-8"))
+
+
+def write_zip(kind: str, rows: int, path, seed: int = 42) -> None:
+    """Escreve o dataset como um único CSV dentro de um ZIP (zip64 para arquivos grandes)."""
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        with archive.open(f"{kind}.csv", "w", force_zip64=True) as member:
+            write_csv(kind, rows, member, seed)
+
+
+def materialize(kind: str, rows: int, file_format: str, directory, seed: int = 42) -> Path:
+    """
+    Caminho do arquivo do dataset em `directory`, gerado apenas se ainda não
+    existir (arquivos grandes são reaproveitados entre execuções).
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{kind}-{rows}-s{seed}.{file_format}"
+    if not path.exists():
+        partial = path.with_name(path.name + ".partial")
+        (write_csv if file_format == "csv" else write_zip)(kind, rows, partial, seed)
+        partial.replace(path)
+    return path
@@ -0,0 +1,25 @@
+# benchmarks/mock_model.py
+from types import SimpleNamespace
+from typing import Dict
+
+
+class MockGenerativeModel:
+    """
+    Substituto offline e determinístico de `genai.GenerativeModel`: responde a
+    cada pergunta (última linha do prompt) com o código registrado para ela,
+    no mesmo formato de resposta do Gemini, sem latência de rede.
+    """
+
+    def __init__(self, answers: Dict[str, str]):
+        self.answers = answers
+        self.calls = 0
+
+    def generate_content(self, prompt: str, generation_config=None, stream: bool = False, **kwargs):
+        self.calls += 1
+        question = prompt.strip().splitlines()[-1].strip()
+        code = self.answers.get(question, "result = 'sem resposta'")
+        text = f"Aqui está:\n```python\n{code}\n```\n"
+        usage = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4)
+        if stream:
+            return iter([SimpleNamespace(text=text, usage_metadata=usage)])
+        return SimpleNamespace(text=text, usage_metadata=usage)
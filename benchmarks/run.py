@@ -0,0 +1,268 @@
+# benchmarks/run.py
+"""
+Suíte de benchmarks do pipeline, executada offline com um modelo simulado.
+
+Para cada dataset sintético (ver benchmarks/datasets.py) mede tempo (melhor de
+`--repeat` execuções) e pico de alocações (tracemalloc, em uma execução extra)
+de `load_file`, `handle_zip_file` (ZIPs), `pre_analysis`, `_build_prompt`,
+`_execute_code` e `answer_query`. Os resultados são comparados com a linha de
+base em benchmarks/baselines/<perfil>.json e a execução falha (código 1) se
+alguma etapa ficar mais lenta que `--max-slowdown` ou alocar mais que
+`--max-memory-growth` vezes o valor de referência.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.run --profile quick                  # compara com a linha de base
+    python -m benchmarks.run --profile quick --save-baseline  # grava uma nova linha de base
+    python -m benchmarks.run --kinds tall wide --rows 100000 --formats csv zip
+"""
+import argparse
+import copy
+import gc
+import itertools
+import json
+import mmap
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.datasets import FORMATS, KINDS, QUESTIONS, materialize
+from benchmarks.mock_model import MockGenerativeModel
+from src.agent import EDAAgentPro
+from src.config import settings
+from src.utils import handle_zip_file
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+
+@dataclass(frozen=True)
+class Case:
+    kind: str
+    rows: int
+    file_format: str
+
+    @property
+    def id(self) -> str:
+        return f"{self.kind}-{self.rows}-{self.file_format}"
+
+
+PROFILES: Dict[str, List[Case]] = {
+    "quick": [Case(kind, 10 ** 4, "csv") for kind in KINDS] + [Case("tall", 10 ** 4, "zip")],
+    "standard": [Case(kind, 10 ** 5, "csv") for kind in KINDS] + [
+        Case("tall", 10 ** 6, "csv"), Case("tall", 10 ** 6, "zip"), Case("mixed", 10 ** 6, "csv"),
+    ],
+    "large": [Case("tall", 10 ** 7, "csv"), Case("tall", 10 ** 7, "zip"), Case("tall", 10 ** 8, "csv")],
+}
+
+
+class FileUpload:
+    """Upload lido do disco via mmap, com a mesma interface usada do `UploadedFile` do Streamlit."""
+
+    def __init__(self, path: Path):
+        self.name = path.name
+        self._path = path
+        self._buffer = None
+
+    def getbuffer(self) -> memoryview:
+        if self._buffer is None:
+            with open(self._path, "rb") as f:
+                self._buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._buffer
+
+
+@contextmanager
+def benchmark_settings(workdir: Path, max_file_size_mb: int) -> Iterator[None]:
+    """
+    Desativa os caches (cada repetição deve refazer o trabalho), o caminho rápido
+    e a telemetria, restaurando as configurações ao final.
+    """
+    saved = copy.deepcopy(settings)
+    settings['cache']['enabled'] = False
+    settings['llm_cache']['enabled'] = False
+    settings['result_memo']['enabled'] = False
+    settings['llm_cache']['path'] = str(workdir / "answers.sqlite")
+    settings['store']['enabled'] = False
+    settings['fast_path']['enabled'] = False
+    settings['telemetry']['enabled'] = False
+    settings['history']['dir'] = str(workdir / "history")
+    settings['execution']['backend'] = "inprocess"
+    settings['zip']['mode'] = "first"
+    settings['file_limits']['max_file_size_mb'] = max_file_size_mb
+    try:
+        yield
+    finally:
+        settings.clear()
+        settings.update(saved)
+
+
+def measure(function: Callable[[], Any], repeat: int, memory: bool) -> Dict[str, float]:
+    """Melhor tempo de `repeat` execuções e, se `memory`, o pico de alocações de uma execução extra."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    stats = {"seconds": round(best, 6)}
+    if memory:
+        # Medido à parte porque o tracemalloc deixa a execução bem mais lenta.
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return stats
+
+
+def _loaded(outcome) -> None:
+    success, message = outcome
+    if not success:
+        raise RuntimeError(message)
+
+
+def _answered(result: Dict[str, Any]) -> None:
+    if result['type'] == 'error':
+        raise RuntimeError(result['content'])
+
+
+def run_case(case: Case, data_dir: Path, repeat: int = 3, memory: bool = True, seed: int = 42) -> Dict[str, Any]:
+    """Mede todas as etapas de um caso. As configurações já devem estar em `benchmark_settings`."""
+    path = materialize(case.kind, case.rows, case.file_format, data_dir, seed)
+    questions = QUESTIONS[case.kind]
+    agent = EDAAgentPro(api_key="benchmark")
+    agent.model = MockGenerativeModel(dict(questions))
+    upload = FileUpload(path)
+
+    stages = {"load_file": measure(lambda: _loaded(agent.load_file(upload)), repeat, memory)}
+    if case.file_format == "zip":
+        buffer = upload.getbuffer()
+        stages["handle_zip_file"] = measure(
+            lambda: handle_zip_file(buffer, reader=agent._read_csv, sniff_bytes=settings['csv']['sniff_bytes']),
+            repeat, memory)
+    stages["pre_analysis"] = measure(agent.pre_analysis, repeat, memory)
+    for index, (question, code) in enumerate(questions):
+        stages[f"_build_prompt[{index}]"] = measure(lambda: agent._build_prompt(question), repeat, memory)
+        stages[f"_execute_code[{index}]"] = measure(lambda: _answered(agent._execute_code(code)), repeat, memory)
+        stages[f"answer_query[{index}]"] = measure(lambda: _answered(agent.answer_query(question)), repeat, memory)
+    agent.history.close()
+    return {"rows": case.rows, "bytes": path.stat().st_size, "sampled": agent.is_sampled, "stages": stages}
+
+
+def run_suite(cases: List[Case], data_dir: Path, repeat: int = 3, memory: bool = True, seed: int = 42,
+              max_file_size_mb: int = 10 ** 6, report: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Executa os casos e devolve o documento de resultados (mesmo formato da linha de base)."""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="eda-bench-") as workdir, \
+            benchmark_settings(Path(workdir), max_file_size_mb):
+        for case in cases:
+            results[case.id] = run_case(case, data_dir, repeat, memory, seed)
+            for stage, stats in results[case.id]["stages"].items():
+                peak = f"{stats['peak_bytes'] / 1024 ** 2:9.1f} MB" if "peak_bytes" in stats else ""
+                report(f"{case.id:<28} {stage:<20} {stats['seconds']:9.4f}s {peak}")
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "options": {"repeat": repeat, "memory": memory, "seed": seed},
+        "results": results,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], max_slowdown: float = 1.5,
+            max_memory_growth: float = 1.3, min_seconds: float = 0.02, min_bytes: int = 1024 ** 2) -> List[str]:
+    """
+    Etapas que regrediram em relação à linha de base. Diferenças absolutas abaixo
+    de `min_seconds`/`min_bytes` são ignoradas, pois ficam dentro do ruído de medição.
+    """
+    regressions = []
+    for case_id, result in current["results"].items():
+        reference = baseline["results"].get(case_id)
+        if reference is None:
+            continue
+        for stage, stats in result["stages"].items():
+            expected = reference["stages"].get(stage)
+            if expected is None:
+                continue
+            seconds, base_seconds = stats["seconds"], expected["seconds"]
+            if seconds > base_seconds * max_slowdown and seconds - base_seconds > min_seconds:
+                regressions.append(f"{case_id} {stage}: {base_seconds:.4f}s → {seconds:.4f}s "
+                                   f"({seconds / base_seconds:.2f}x, limite {max_slowdown:.2f}x)")
+            peak, base_peak = stats.get("peak_bytes"), expected.get("peak_bytes")
+            if peak is not None and base_peak is not None \
+                    and peak > base_peak * max_memory_growth and peak - base_peak > min_bytes:
+                regressions.append(f"{case_id} {stage}: pico {base_peak / 1024 ** 2:.1f} MB → "
+                                   f"{peak / 1024 ** 2:.1f} MB (limite {max_memory_growth:.2f}x)")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, help="Substitui os casos do perfil por uma grade")
+    parser.add_argument("--rows", nargs="+", type=int, default=[10 ** 4])
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["csv"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="Não mede o pico de alocações")
+    parser.add_argument("--data-dir", default=".cache/benchmarks", help="Onde os datasets gerados são guardados")
+    parser.add_argument("--baseline", help="Arquivo da linha de base (padrão: benchmarks/baselines/<perfil>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como nova linha de base")
+    parser.add_argument("--output", help="Também grava os resultados neste arquivo JSON")
+    parser.add_argument("--max-slowdown", type=float, default=1.5)
+    parser.add_argument("--max-memory-growth", type=float, default=1.3)
+    parser.add_argument("--min-seconds", type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    if args.kinds:
+        name = "custom"
+        cases = [Case(*spec) for spec in itertools.product(args.kinds, args.rows, args.formats)]
+    else:
+        name, cases = args.profile, PROFILES[args.profile]
+    baseline_path = Path(args.baseline) if args.baseline else BASELINE_DIR / f"{name}.json"
+
+    document = run_suite(cases, Path(args.data_dir), args.repeat, not args.no_memory, args.seed)
+    document["profile"] = name
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2, ensure_ascii=False))
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(document, indent=2, ensure_ascii=False) + "\n")
+        print(f"Linha de base gravada em {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"Sem linha de base em {baseline_path}; use --save-baseline para criá-la.")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get("environment") != document["environment"]:
+        print("Aviso: a linha de base foi gravada em outro ambiente; as comparações são aproximadas.")
+    regressions = compare(baseline, document, args.max_slowdown, args.max_memory_growth, args.min_seconds)
+    for regression in regressions:
+        print(f"REGRESSÃO {regression}")
+    if regressions:
+        return 1
+    print(f"Sem regressões em relação a {baseline_path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
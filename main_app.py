@@ -81,6 +81,23 @@ with st.sidebar:
             st.session_state.messages = []
             st.session_state.pre_analysis_done = False
             st.rerun()
+
+        with st.expander("Cache de datasets"):
+            st.json(st.session_state.agent.dataset_cache.stats())
+        with st.expander("Cache de respostas"):
+            st.json(st.session_state.agent.answer_cache.stats())
+        with st.expander("Histórico da sessão"):
+            st.json(st.session_state.agent.history.usage())
+            memo = st.session_state.agent.result_memo.stats()
+            st.caption(f"Resultados reaproveitados: {memo['hits']} · {memo['entries']} guardados "
+                       f"({memo['bytes'] / 1024 ** 2:.1f} de {memo['max_bytes'] / 1024 ** 2:.0f} MB)")
+        registry = st.session_state.agent.registry
+        if registry is not None:
+            with st.expander("Datasets em memória"):
+                stats = registry.stats()
+                st.caption(f"{stats['datasets']} datasets, {stats['bytes'] / 1024 ** 2:.1f} MB "
+                           f"de {stats['max_bytes'] / 1024 ** 2:.0f} MB · {stats['hits']} reutilizações")
+                st.dataframe(registry.resident(), hide_index=True)
     
     st.info("Seus dados são processados em memória e apagados ao final da sessão.")
     st.warning("A execução de código gerado por IA pode ter riscos. Use com cautela.")
@@ -103,8 +120,9 @@ if uploaded_file and not agent.df:
         success, message = agent.load_file(uploaded_file)
         if success:
             st.toast(message, icon="✅")
-            pre_analysis_result = agent.pre_analysis()
-            st.session_state.messages.append({"role": "assistant", "content": pre_analysis_result})
+            agent.pre_analysis()
+            # As mensagens apontam para o histórico do agente, que limita a memória usada pelos resultados.
+            st.session_state.messages.append({"role": "assistant", "entry": agent.history.last_id})
             st.session_state.pre_analysis_done = True
             st.rerun()
         else:
@@ -113,14 +131,35 @@ if uploaded_file and not agent.df:
 
 # --- Exibição da Pré-Análise e Histórico de Chat ---
 if st.session_state.pre_analysis_done:
-    for message in st.session_state.messages:
+    for index, message in enumerate(st.session_state.messages):
         with st.chat_message(message["role"]):
-            content = message["content"]
-            if isinstance(content, dict) and "schema" in content:
+            content = message.get("content")
+            if "entry" in message:
+                entry = message["entry"]
+                if agent.history.is_resident(entry) or st.session_state.get(f"restore_{entry}"):
+                    content = agent.history.result(entry)
+                    if content is None:
+                        st.caption("Resultado descartado do histórico para liberar espaço.")
+                else:
+                    summary = agent.history.entry(entry)['summary']
+                    details = ", ".join(f"{key}: {value}" for key, value in summary.items())
+                    st.caption(f"Resultado arquivado em disco ({details}).")
+                    if st.button("Mostrar resultado", key=f"restore_btn_{entry}"):
+                        st.session_state[f"restore_{entry}"] = True
+                        st.rerun()
+            if content is None:
+                pass
+            elif isinstance(content, dict) and "schema" in content:
                 st.subheader("🔍 Pré-Análise Automática")
                 if content['is_sampled']:
                     st.warning(f"Dataset grande! Análise baseada em uma amostra de {content['sampled_shape']} linhas (Original: {content['original_shape']} linhas).")
                 st.dataframe(content['schema'])
+                if content.get('statistics') is not None:
+                    with st.expander("📊 Estatísticas do dataset completo"):
+                        st.dataframe(content['statistics'])
+                if content.get('ingestion_report') is not None:
+                    with st.expander("🗂️ Arquivos do ZIP"):
+                        st.dataframe(content['ingestion_report'])
                 st.subheader("💡 Queries Sugeridas")
                 for query in content['suggested_queries']:
                     if st.button(query, use_container_width=True):
@@ -131,6 +170,20 @@ if st.session_state.pre_analysis_done:
                 elif content['type'] == 'table': st.dataframe(content['content'])
                 elif content['type'] == 'plot': st.plotly_chart(content['content'], use_container_width=True)
                 elif content['type'] == 'error': st.error(content['content'])
+                if content['type'] == 'plot' and content.get('points'):
+                    st.caption(f"Gráfico simplificado: {content['points']['points_before']:,} → "
+                               f"{content['points']['points_after']:,} pontos.")
+                if content.get('exact'):
+                    st.caption("✅ Resultado exato, calculado sobre o dataset completo.")
+                elif agent.is_sampled and message.get('analysis') and content['type'] != 'error':
+                    st.caption("Resultado calculado sobre a amostra.")
+                    if agent.can_confirm(message['analysis']) and st.button("🔎 Confirmar nos dados completos", key=f"full_{index}"):
+                        bar = st.progress(0.0, text="Lendo o dataset completo...")
+                        agent.confirm_on_full_data(message['analysis'], progress=bar.progress)
+                        bar.empty()
+                        # Substitui a prévia da amostra pelo resultado exato
+                        message['entry'] = agent.history.last_id
+                        st.rerun()
             else:
                 st.write(content)
 
@@ -141,9 +194,21 @@ if st.session_state.pre_analysis_done:
     if query_to_process:
         st.session_state.messages.append({"role": "user", "content": query_to_process})
         with st.chat_message("user"): st.write(query_to_process)
-        with st.spinner("🤖 Gemini está pensando e gerando código..."):
-            response = agent.answer_query(query_to_process)
-            st.session_state.messages.append({"role": "assistant", "content": response})
+        if settings['llm']['stream']:
+            # Mostra a resposta do Gemini à medida que ela chega
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                for event in agent.answer_query_stream(query_to_process):
+                    if event['event'] == 'text':
+                        placeholder.markdown(event['content'])
+                    elif event['event'] == 'code':
+                        placeholder.code(event['content'], language="python")
+        else:
+            with st.spinner("🤖 Gemini está pensando e gerando código..."):
+                agent.answer_query(query_to_process)
+        st.session_state.messages.append(
+            {"role": "assistant", "entry": agent.history.last_id, "analysis": agent.last_analysis}
+        )
         st.rerun()
 else:
     if st.session_state.agent:
@@ -1,12 +1,32 @@
 # src/agent.py
-import io
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import weakref
+from collections import deque
 import pandas as pd
-import plotly.express as px
 import google.generativeai as genai
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple
 
+from src.cache import AnswerCache, CachedDataset, DatasetCache, content_key
 from src.config import settings
-from src.utils import handle_zip_file
+from src.context import DatasetContext, estimate_tokens
+from src.dialect import read_with_fallback, sniff_source
+from src.fulldata import FullDataSource, estimate_frame_bytes, load_full_frame, referenced_columns, referenced_names
+from src.history import InteractionHistory, payload_bytes
+from src.ingestion import concat_zip_members, member_report, read_csv_streaming, read_zip_members
+from src.intents import match_intent
+from src.memo import ResultMemo, analyze_code
+from src.optimize import compact_dtypes
+from src.plotting import reduce_figure
+from src.profiler import DatasetProfile
+from src.ratelimit import TokenBucket
+from src.sandbox import ExecutionPool, execute_code, get_execution_pool
+from src.store import DatasetRegistry, get_dataset_registry
+from src.telemetry import Telemetry, get_telemetry
+from src.utils import MemoryviewReader, csv_member_sizes, handle_zip_file, table_names, upload_buffer
 
 class EDAAgentPro:
     """
@@ -24,58 +44,336 @@ class EDAAgentPro:
         self.filename: Optional[str] = None
         self.is_sampled: bool = False
         self.original_shape: Optional[Tuple[int, int]] = None
-        self.memory_log: List[Dict[str, Any]] = []
+        self.profile: Optional[DatasetProfile] = None
+        self.dataset_key: Optional[str] = None
+        self.memory_report: Optional[Dict[str, int]] = None
+        self.context: Optional[DatasetContext] = None
+        # Tamanho dos prompts mais recentes (`prompt.stats_entries`), do mais antigo ao mais novo.
+        self.prompt_stats: "deque[Dict[str, Any]]" = deque(maxlen=settings['prompt']['stats_entries'])
+        self.full_source: Optional[FullDataSource] = None
+        self.last_analysis: Optional[Dict[str, Any]] = None
+        self.tables: Dict[str, pd.DataFrame] = {}
+        self.ingestion_report: List[Dict[str, Any]] = []
+        self.dataset_cache = DatasetCache(
+            settings['cache']['dir'],
+            max_bytes=settings['cache']['max_size_mb'] * 1024 * 1024,
+            enabled=settings['cache']['enabled'],
+        )
+        # Reaproveitar código gerado só é seguro com geração determinística (temperatura 0).
+        self.answer_cache = AnswerCache(
+            settings['llm_cache']['path'],
+            memory_entries=settings['llm_cache']['memory_entries'],
+            max_entries=settings['llm_cache']['max_entries'],
+            ttl_seconds=settings['llm_cache']['ttl_seconds'],
+            enabled=settings['llm_cache']['enabled'] and settings['llm']['temperature'] == 0,
+        )
+        # Resultados já executados sobre a versão atual do dataset (descartados a cada carga).
+        self.result_memo = ResultMemo(
+            max_bytes=settings['result_memo']['max_memory_mb'] * 1024 * 1024,
+            enabled=settings['result_memo']['enabled'],
+        )
+        self.history = InteractionHistory(
+            settings['history']['dir'],
+            max_memory_bytes=settings['history']['max_memory_mb'] * 1024 * 1024,
+            max_disk_bytes=settings['history']['max_disk_mb'] * 1024 * 1024,
+        )
+        self.executor: Optional[ExecutionPool] = (
+            get_execution_pool() if settings['execution']['backend'] == 'pool' else None
+        )
+        # Datasets compartilhados entre sessões; a referência é devolvida ao trocar
+        # de arquivo ou quando a sessão (e este objeto) deixa de existir.
+        self.registry: Optional[DatasetRegistry] = (
+            get_dataset_registry() if settings['store']['enabled'] else None
+        )
+        self._registry_ref: Optional[weakref.finalize] = None
+        self._load_source: Optional[str] = None
+        self.telemetry: Telemetry = get_telemetry()
 
     def load_file(self, uploaded_file) -> Tuple[bool, str]:
         """
         Carrega e valida um arquivo (CSV ou ZIP), aplicando a lógica de amostragem adaptativa.
+        A leitura é feita em blocos, de modo que arquivos grandes nunca são
+        materializados por inteiro em memória. Os bytes do upload são lidos
+        diretamente do buffer do Streamlit, sem cópias, e arquivos acima de
+        `file_limits.max_file_size_mb` (para ZIPs, também o conteúdo descompactado
+        segundo o diretório central) são recusados antes de qualquer leitura.
         """
         try:
-            self.filename = uploaded_file.name
-            file_content = uploaded_file.getvalue()
+            with self.telemetry.span("load_file", filename=uploaded_file.name) as span:
+                self.filename = uploaded_file.name
+                file_content = upload_buffer(uploaded_file)
+                span.set(bytes=len(file_content))
             
-            if self.filename.lower().endswith('.csv'):
-                self.df = pd.read_csv(io.BytesIO(file_content))
-            elif self.filename.lower().endswith('.zip'):
-                result = handle_zip_file(file_content)
-                if result:
-                    self.filename, self.df = result
+                if not self.filename.lower().endswith(('.csv', '.zip')):
+                    return False, "Formato de arquivo não suportado. Use CSV ou ZIP."
+
+                is_zip = self.filename.lower().endswith('.zip')
+                zip_mode = settings['zip']['mode'] if is_zip else None
+                max_bytes = settings['file_limits']['max_file_size_mb'] * 1024 * 1024
+                if len(file_content) > max_bytes:
+                    return False, (f"Arquivo muito grande ({len(file_content) / 1024 ** 2:.1f} MB). "
+                                   f"O limite é {settings['file_limits']['max_file_size_mb']} MB.")
+                members = None
+                if is_zip:
+                    sizes = csv_member_sizes(file_content)
+                    if not sizes:
+                        return False, "Nenhum arquivo CSV encontrado no ZIP."
+                    members = list(sizes)[:1] if zip_mode == 'first' else list(sizes)
+                    uncompressed = sum(sizes[name] for name in members)
+                    if uncompressed > max_bytes:
+                        return False, (f"O conteúdo descompactado do ZIP ({uncompressed / 1024 ** 2:.1f} MB) "
+                                       f"excede o limite de {settings['file_limits']['max_file_size_mb']} MB.")
+
+                # Qualquer resultado memorizado deixa de valer a partir daqui, mesmo se a carga falhar.
+                self.result_memo.invalidate()
+                self.dataset_key = content_key(file_content, self._ingestion_params())
+                load = lambda: self._load_dataset(file_content, zip_mode, members)
+                if self.registry is not None:
+                    dataset, resident = self.registry.acquire(self.dataset_key, load)
+                    # A referência ao dataset anterior só é devolvida depois da nova carga.
+                    previous, self._registry_ref = self._registry_ref, weakref.finalize(
+                        self, self.registry.release, self.dataset_key)
+                    if previous is not None:
+                        previous()
+                    source = "memory" if resident else self._load_source
                 else:
-                    return False, "Nenhum arquivo CSV encontrado no ZIP."
-            else:
-                return False, "Formato de arquivo não suportado. Use CSV ou ZIP."
-
-            self.original_shape = self.df.shape
-            threshold = settings['file_limits']['sampling_threshold_rows']
-            if len(self.df) > threshold:
-                self.is_sampled = True
-                sample_size = settings['file_limits']['sampling_rows']
-                self.df = self.df.sample(n=sample_size, random_state=42)
-                msg = (f"Arquivo '{self.filename}' carregado. "
-                       f"Dataset grande ({self.original_shape[0]} linhas), "
-                       f"usando uma amostra de {len(self.df)} linhas.")
-            else:
-                self.is_sampled = False
-                msg = f"Arquivo '{self.filename}' ({self.original_shape[0]} linhas) carregado."
+                    dataset, source = load(), self._load_source
+
+                # Um CSV mantém o nome do upload; de um ZIP vem o nome do membro lido.
+                self.filename = dataset.filename if is_zip else uploaded_file.name
+                self.df, self.tables = dataset.df, dataset.tables
+                self.original_shape, self.is_sampled = dataset.original_shape, dataset.is_sampled
+                self.profile, self.memory_report = dataset.profile, dataset.memory_report
+                self.ingestion_report = dataset.ingestion_report
+
+                self.context = DatasetContext(self.df, self.profile, settings['prompt']['example_values'])
+                # Em `tables`, `df` é apenas a primeira tabela.
+                self._retain_full_source(file_content, members[:1] if zip_mode == 'tables' else members)
+
+                if self.tables:
+                    msg = (f"Arquivo '{self.filename}' carregado com {len(self.tables)} tabelas: "
+                           f"{', '.join(f'`{name}`' for name in self.tables)}. `df` é a tabela `{next(iter(self.tables))}`.")
+                elif self.is_sampled:
+                    msg = (f"Arquivo '{self.filename}' carregado. "
+                           f"Dataset grande ({self.original_shape[0]} linhas), "
+                           f"usando uma amostra de {len(self.df)} linhas.")
+                else:
+                    msg = f"Arquivo '{self.filename}' ({self.original_shape[0]} linhas) carregado."
+                if len(self.ingestion_report) > 1 and not self.tables:
+                    msg += f" {len(self.ingestion_report)} arquivos CSV combinados."
+                if self.memory_report:
+                    msg += (f" Memória otimizada: {self.memory_report['bytes_before'] / 1024 ** 2:.1f} MB"
+                            f" → {self.memory_report['bytes_after'] / 1024 ** 2:.1f} MB.")
             
-            self._log_interaction("load_file", {"filename": self.filename}, msg)
-            return True, msg
+                span.set(rows=self.original_shape[0], columns=self.df.shape[1], sampled=self.is_sampled,
+                         source=source, cache="dataset", cache_hit=source != "parse")
+                self._log_interaction("load_file", {"filename": self.filename, "source": source}, msg)
+                return True, msg
         except Exception as e:
             return False, f"Erro ao processar o arquivo: {str(e)}"
 
+    def _load_dataset(self, file_content: memoryview, zip_mode: Optional[str], members: Optional[List[str]]) -> CachedDataset:
+        """
+        Obtém o dataset do cache em disco ou, na ausência dele, faz a ingestão.
+        A origem ('disk' ou 'parse') fica em `_load_source`.
+        """
+        # Tabelas nomeadas não cabem em uma única entrada do cache de datasets.
+        cached = self.dataset_cache.get(self.dataset_key) if zip_mode != 'tables' else None
+        if cached is not None:
+            self._load_source = "disk"
+            return cached
+
+        self._load_source = "parse"
+        start = time.perf_counter()
+        with self.telemetry.span("parse", zip_mode=zip_mode, bytes=len(file_content)) as span:
+            self.tables, self.ingestion_report = {}, []
+            if zip_mode is None:
+                self.df, self.original_shape, self.is_sampled, self.profile = self._read_csv(MemoryviewReader(file_content))
+            elif zip_mode == 'first':
+                result = handle_zip_file(file_content, reader=self._read_csv, sniff_bytes=settings['csv']['sniff_bytes'])
+                if not result:
+                    raise ValueError("Nenhum arquivo CSV encontrado no ZIP.")
+                self.filename, (self.df, self.original_shape, self.is_sampled, self.profile) = result
+            else:
+                self._read_zip_members(file_content, members, zip_mode)
+            span.set(rows=self.original_shape[0], members=len(self.ingestion_report) or 1)
+        self.memory_report = self._optimize_memory()
+        dataset = CachedDataset(self.filename, self.df, self.original_shape, self.is_sampled,
+                                self.profile, self.memory_report, self.tables, self.ingestion_report)
+        if zip_mode != 'tables':
+            self.dataset_cache.put(self.dataset_key, dataset, parse_seconds=time.perf_counter() - start)
+        return dataset
+
+    def _read_zip_members(self, file_content: memoryview, members: List[str], mode: str) -> None:
+        """
+        Lê todos os CSVs de um ZIP em paralelo (`zip.workers` processos).
+
+        No modo `concat` os membros, que devem ter o mesmo esquema, viram um único
+        `df` (com amostragem uniforme sobre todas as linhas quando necessário). No
+        modo `tables` cada membro vira uma tabela nomeada no escopo de execução e
+        `df` aponta para a primeira. Tempo e linhas de cada membro ficam em
+        `ingestion_report`.
+        """
+        limits = settings['file_limits']
+        profiling = settings['profiling']
+        handle, path = tempfile.mkstemp(prefix="eda-upload-", suffix=".zip")
+        results = None
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                f.write(file_content)
+            results = read_zip_members(
+                path, members, settings['zip']['workers'],
+                threshold_rows=limits['sampling_threshold_rows'],
+                sample_rows=limits['sampling_rows'],
+                chunk_rows=limits['chunk_rows'],
+                random_state=42,
+                profile_options={
+                    "hll_precision": profiling['hll_precision'],
+                    "quantile_capacity": profiling['quantile_centroids'],
+                    "top_k": profiling['top_k'],
+                },
+                sniff_bytes=settings['csv']['sniff_bytes'],
+                engine=settings['csv']['engine'],
+            )
+            if mode == 'concat':
+                self.df, self.original_shape, self.is_sampled, self.profile, self.ingestion_report = concat_zip_members(
+                    results, limits['sampling_threshold_rows'], limits['sampling_rows'], random_state=42,
+                )
+                return
+
+            names = table_names(members)
+            first = None
+            for result in results:
+                self.ingestion_report.append(member_report(result))
+                self.tables[names[result["member"]]] = result["df"]
+                if first is None:
+                    first = result
+        finally:
+            # Encerra o pool (ex: após um erro de esquema) antes de remover o arquivo.
+            if results is not None:
+                results.close()
+            os.remove(path)
+        self.df, self.original_shape = first["df"], first["shape"]
+        self.is_sampled, self.profile = first["is_sampled"], first["profile"]
+
+    def _retain_full_source(self, file_content: memoryview, members: Optional[List[str]]) -> None:
+        """
+        Guarda em disco o upload original de datasets amostrados, para que
+        `confirm_on_full_data` possa reprocessar todas as linhas depois.
+        `members` são os CSVs que compõem `df` quando o upload é um ZIP.
+        """
+        if self.full_source is not None:
+            self.full_source.close()
+            self.full_source = None
+        if not self.is_sampled or not settings['full_data']['enabled']:
+            return
+        self.full_source = FullDataSource(
+            file_content,
+            suffix=".csv" if members is None else ".zip",
+            members=members,
+            sniff_bytes=settings['csv']['sniff_bytes'],
+        )
+        weakref.finalize(self, self.full_source.close)
+
+    def _ingestion_params(self) -> Dict[str, Any]:
+        """Parâmetros que alteram o resultado da ingestão e, portanto, compõem a chave do cache."""
+        return {
+            "file_limits": {key: settings['file_limits'][key]
+                            for key in ('sampling_threshold_rows', 'sampling_rows', 'chunk_rows')},
+            "profiling": settings['profiling'],
+            "memory_optimization": settings['memory_optimization'],
+            "csv": settings['csv'],
+            "zip_mode": settings['zip']['mode'],
+            "random_state": 42,
+        }
+
+    def _optimize_memory(self) -> Optional[Dict[str, int]]:
+        """
+        Compacta os tipos de `self.df` (e das tabelas de um ZIP) quando `memory_optimization.enabled` está ativo.
+        Os valores não mudam, então o código gerado pelo LLM continua funcionando.
+        """
+        options = settings['memory_optimization']
+        if not options['enabled']:
+            return None
+        compact = lambda frame: compact_dtypes(
+            frame,
+            category_max_ratio=options['category_max_ratio'],
+            arrow_strings=options['arrow_strings'],
+            categories=options['categories'],
+            min_integer_dtype=options['min_integer_dtype'],
+            nullable_integers=options['nullable_integers'],
+        )
+        if not self.tables:
+            self.df, report = compact(self.df)
+            return report
+
+        report = {"bytes_before": 0, "bytes_after": 0}
+        for name, frame in self.tables.items():
+            self.tables[name], table_report = compact(frame)
+            report = {key: report[key] + table_report[key] for key in report}
+        self.df = next(iter(self.tables.values()))
+        return report
+
+    def _read_csv(self, source, **read_kwargs) -> Tuple[pd.DataFrame, Tuple[int, int], bool, DatasetProfile]:
+        """
+        Lê um CSV em blocos, com amostragem por reservatório para arquivos grandes.
+        A memória de pico fica limitada pelo tamanho da amostra, e não do arquivo.
+        Cada bloco também alimenta o perfil estatístico de todas as linhas.
+        Sem `read_kwargs`, o dialeto (encoding, delimitador, decimal, cabeçalho)
+        é detectado em um prefixo de `source` antes da leitura única.
+        """
+        if not read_kwargs:
+            dialect = sniff_source(source, settings['csv']['sniff_bytes'])
+            return read_with_fallback(source, dialect, lambda detected: self._read_csv(source, **detected))
+
+        limits = settings['file_limits']
+        profiling = settings['profiling']
+        profile = DatasetProfile(
+            hll_precision=profiling['hll_precision'],
+            quantile_capacity=profiling['quantile_centroids'],
+            top_k=profiling['top_k'],
+        )
+        df, shape, is_sampled = read_csv_streaming(
+            source,
+            threshold_rows=limits['sampling_threshold_rows'],
+            sample_rows=limits['sampling_rows'],
+            chunk_rows=limits['chunk_rows'],
+            random_state=42,
+            on_chunk=profile.update,
+            engine=settings['csv']['engine'],
+            **read_kwargs,
+        )
+        return df, shape, is_sampled, profile
+
     def pre_analysis(self) -> Optional[Dict[str, Any]]:
-        """Gera um resumo inicial do dataset e sugere queries."""
+        """
+        Gera um resumo inicial do dataset e sugere queries.
+        Esquema e estatísticas vêm do perfil acumulado na ingestão, cobrindo todas
+        as linhas do arquivo mesmo quando `df` é uma amostra.
+        """
         if self.df is None:
             return None
 
-        schema = pd.DataFrame({
-            'Coluna': self.df.columns,
-            'Tipo de Dado': self.df.dtypes.astype(str),
-            'Valores Nulos (%)': (self.df.isnull().sum() * 100 / len(self.df)).round(2)
-        })
+        with self.telemetry.span("pre_analysis", rows=self.original_shape[0]):
+            result = self._pre_analysis()
+        self._log_interaction("pre_analysis", {}, result)
+        return result
 
-        numeric_cols = self.df.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = self.df.select_dtypes(include=['object', 'category']).columns.tolist()
+    def _pre_analysis(self) -> Dict[str, Any]:
+        if self.profile is not None:
+            schema = self.profile.schema()
+            statistics = self.profile.statistics()
+            numeric_cols = self.profile.numeric_columns
+            categorical_cols = self.profile.categorical_columns
+        else:
+            schema = pd.DataFrame({
+                'Coluna': self.df.columns,
+                'Tipo de Dado': self.df.dtypes.astype(str),
+                'Valores Nulos (%)': (self.df.isnull().sum() * 100 / len(self.df)).round(2)
+            })
+            statistics = None
+            numeric_cols = self.df.select_dtypes(include=['number']).columns.tolist()
+            categorical_cols = self.df.select_dtypes(include=['object', 'category']).columns.tolist()
 
         result = {
             "filename": self.filename,
@@ -83,11 +381,12 @@ class EDAAgentPro:
             "is_sampled": self.is_sampled,
             "sampled_shape": self.df.shape if self.is_sampled else None,
             "schema": schema,
+            "statistics": statistics,
+            "ingestion_report": pd.DataFrame(self.ingestion_report) if self.ingestion_report else None,
             "numeric_columns": numeric_cols,
             "categorical_columns": categorical_cols,
             "suggested_queries": self._generate_suggested_queries(numeric_cols, categorical_cols)
         }
-        self._log_interaction("pre_analysis", {}, result)
         return result
 
     def _generate_suggested_queries(self, numeric_cols: List[str], categorical_cols: List[str]) -> List[str]:
@@ -105,51 +404,370 @@ class EDAAgentPro:
     def answer_query(self, question: str) -> Dict[str, Any]:
         """
         Usa o Gemini para gerar e executar código Python para responder a uma pergunta.
+        Perguntas comuns são respondidas por rotinas locais, sem chamar a API, e
+        perguntas repetidas sobre o mesmo dataset reutilizam o código em cache.
         """
         if self.df is None:
             return {"type": "error", "content": "Nenhum dado carregado."}
 
-        prompt = self._build_prompt(question)
-        
-        try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    candidate_count=1,
-                    max_output_tokens=settings['llm']['max_output_tokens'],
-                    temperature=settings['llm']['temperature'],
-                )
-            )
-            
-            generated_code = self._extract_python_code(response.text)
+        with self.telemetry.span("answer_query", streaming=False):
+            self.last_analysis = None
+            fast_result = self._answer_fast_path(question)
+            if fast_result is not None:
+                return fast_result
 
-            if generated_code:
-                result = self._execute_code(generated_code)
-                self._log_interaction("answer_query", {"question": question, "code": generated_code}, result)
+            started = time.perf_counter()
+            cache_key = generated_code = None
+            try:
+                generated_code, response_text, cache_key = self._generate_code(question)
+                if not generated_code:
+                    result = {"type": "text", "content": response_text}
+                    self._log_interaction("answer_query", {"question": question}, result, started)
+                    return result
+
+                result, size = self._execute_code_sized(generated_code)
+                self._remember_code(cache_key, generated_code, result, fresh=bool(response_text))
+                self.last_analysis = {"question": question, "code": generated_code}
+                self._log_interaction("answer_query", {"question": question, "code": generated_code}, result,
+                                      started, size)
                 return result
+
+            except Exception as e:
+                self._remember_code(cache_key, generated_code, None)
+                error_msg = f"Ocorreu um erro ao interagir com a API Gemini ou executar o código: {str(e)}"
+                self._log_interaction("answer_query", {"question": question}, {"type": "error", "content": error_msg}, started)
+                return {"type": "error", "content": error_msg}
+
+    def answer_query_stream(self, question: str) -> Iterator[Dict[str, Any]]:
+        """
+        Variante em streaming de `answer_query`, para renderização incremental.
+
+        Emite eventos `{"event": "text", "content": <texto acumulado>}` conforme a
+        resposta do Gemini chega, `{"event": "code", ...}` quando o código vai ser
+        executado e, ao final, `{"event": "result", "result": ..., "metrics": ...}`. O código é executado assim que o bloco ```python é
+        fechado, sem esperar pelo texto que o modelo escreve depois dele.
+        """
+        if self.df is None:
+            yield {"event": "result", "result": {"type": "error", "content": "Nenhum dado carregado."}, "metrics": {}}
+            return
+
+        with self.telemetry.span("answer_query", streaming=True):
+            start = time.perf_counter()
+            metrics: Dict[str, float] = {}
+            self.last_analysis = None
+            fast_result = self._answer_fast_path(question)
+            if fast_result is not None:
+                metrics["time_to_result"] = time.perf_counter() - start
+                yield {"event": "result", "result": fast_result, "metrics": metrics}
+                return
+
+            cache_key = generated_code = None
+            try:
+                cache_key, generated_code = self._lookup_code(question)
+                text = ""
+                if generated_code is None:
+                    prompt, _ = self._build_prompt(question)
+                    with self.telemetry.span("generate_content", streaming=True) as span:
+                        response = self.model.generate_content(
+                            prompt, generation_config=self._generation_config(), stream=True)
+                        complete = True
+                        for chunk in response:
+                            metrics.setdefault("time_to_first_token", time.perf_counter() - start)
+                            text += self._chunk_text(chunk)
+                            yield {"event": "text", "content": text}
+                            generated_code = self._find_closed_code_block(text)
+                            if generated_code is not None:
+                                complete = False
+                                break
+                        # Um stream interrompido ainda não trouxe o uso de tokens: fica a estimativa do texto recebido.
+                        self._record_usage(span, response if complete else None, prompt, text)
+                    if generated_code is None:
+                        generated_code = self._extract_python_code(text)
+                    if not generated_code:
+                        metrics["time_to_result"] = time.perf_counter() - start
+                        result = {"type": "text", "content": text}
+                        self._log_interaction("answer_query", {"question": question, "metrics": metrics}, result, start)
+                        yield {"event": "result", "result": result, "metrics": metrics}
+                        return
+                metrics["time_to_code"] = time.perf_counter() - start
+                yield {"event": "code", "content": generated_code}
+
+                result, size = self._execute_code_sized(generated_code)
+                self._remember_code(cache_key, generated_code, result, fresh=bool(text))
+                metrics["time_to_result"] = time.perf_counter() - start
+                self.last_analysis = {"question": question, "code": generated_code}
+                self._log_interaction("answer_query", {"question": question, "code": generated_code, "metrics": metrics},
+                                      result, start, size)
+            except Exception as e:
+                self._remember_code(cache_key, generated_code, None)
+                error_msg = f"Ocorreu um erro ao interagir com a API Gemini ou executar o código: {str(e)}"
+                result = {"type": "error", "content": error_msg}
+                self._log_interaction("answer_query", {"question": question}, result, start)
+            yield {"event": "result", "result": result, "metrics": metrics}
+
+    def _answer_fast_path(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Responde sem o LLM quando a pergunta corresponde a uma intenção comum de EDA
+        (distribuição, contagens, correlação, resumo, nulos, top-k, agregações por grupo).
+        """
+        if not settings['fast_path']['enabled']:
+            return None
+        started = time.perf_counter()
+        with self.telemetry.span("fast_path", rows=len(self.df)) as span:
+            intent = match_intent(question, self.df)
+            span.set(intent=intent.name if intent is not None else None)
+            if intent is None:
+                return None
+            try:
+                result = intent.run(self.df)
+            except Exception:
+                # Qualquer imprevisto na rotina devolve a pergunta ao fluxo normal do LLM.
+                return None
+        self.last_analysis = {"question": question, "intent": intent}
+        self._log_interaction("answer_query", {"question": question, "intent": intent.name}, result, started)
+        return result
+
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        # Blocos sem partes de texto (ex: apenas metadados de segurança) levantam ValueError.
+        try:
+            return chunk.text
+        except ValueError:
+            return ""
+
+    @staticmethod
+    def _find_closed_code_block(text: str) -> Optional[str]:
+        """Retorna o código de um bloco ```python apenas quando a cerca de fechamento já chegou."""
+        start = text.find("```python")
+        if start == -1:
+            return None
+        end = text.find("```", start + len("```python"))
+        if end == -1:
+            return None
+        return text[start + len("```python"):end].strip()
+
+    def confirm_on_full_data(self, analysis: Dict[str, Any], progress: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+        """
+        Reavalia uma análise feita sobre a amostra usando todas as linhas do arquivo.
+
+        Apenas as colunas usadas pela análise (identificadas pela AST do código ou
+        pela intenção do caminho rápido) são lidas, em blocos, a partir da cópia
+        em disco do upload. `progress` recebe a fração lida, de 0.0 a 1.0.
+
+        Args:
+            analysis: O dicionário de `last_analysis` ({"code": ...} ou {"intent": ...}).
+            progress: Função opcional chamada a cada bloco lido.
+        """
+        if self.df is None:
+            return {"type": "error", "content": "Nenhum dado carregado."}
+        if not self.is_sampled or self.full_source is None:
+            return {"type": "error", "content": "O dataset já está completo em memória; não há amostra a confirmar."}
+
+        started = time.perf_counter()
+        intent = analysis.get("intent")
+        code = analysis.get("code")
+        columns = None
+        try:
+            if intent is not None:
+                columns = intent.columns
             else:
-                return {"type": "text", "content": response.text}
+                sampled = self._sampled_tables_used(code)
+                if sampled:
+                    return {"type": "error",
+                            "content": (f"A análise usa {', '.join(f'`{name}`' for name in sampled)}, também "
+                                        f"amostrada(s); apenas `df` pode ser confirmada nos dados completos.")}
+                # Em `tables`, `df` também está no escopo com o nome da tabela, que pode ser usada inteira.
+                first = next(iter(self.tables), None)
+                uses_df_table = first is not None and referenced_names(code, [first])
+                columns = None if uses_df_table else referenced_columns(code, self.df.columns)
+            options = settings['full_data']
+            needed = estimate_frame_bytes(self.profile, columns)
+            if needed > options['max_memory_mb'] * 1024 * 1024:
+                return {"type": "error",
+                        "content": (f"A análise exigiria cerca de {needed / 1024 ** 2:.0f} MB para os dados completos, "
+                                    f"acima do limite de {options['max_memory_mb']} MB.")}
 
+            with self.telemetry.span("confirm_on_full_data", rows=self.original_shape[0],
+                                     columns=len(columns) if columns else self.df.shape[1]):
+                full_df = load_full_frame(self.full_source, columns, self.original_shape[0], options['chunk_rows'], progress)
+                # As demais tabelas do ZIP continuam disponíveis, como na pergunta original.
+                frames = {**self.tables, 'df': full_df}
+                if self.tables:
+                    frames[next(iter(self.tables))] = full_df
+                if intent is not None:
+                    result = intent.run(full_df)
+                elif self.executor is not None:
+                    # A chave vira nome de arquivo no worker: as colunas entram apenas como hash.
+                    projection = hashlib.blake2b(repr(columns).encode('utf-8'), digest_size=8).hexdigest()
+                    result = self.executor.run(f"{self.dataset_key}-full-{projection}", frames, code)
+                else:
+                    result = execute_code(code, frames)
+                result = self._reduce_plot(result)
         except Exception as e:
-            error_msg = f"Ocorreu um erro ao interagir com a API Gemini ou executar o código: {str(e)}"
-            self._log_interaction("answer_query", {"question": question}, {"type": "error", "content": error_msg})
-            return {"type": "error", "content": error_msg}
-
-    def _build_prompt(self, question: str) -> str:
-        """Constrói o prompt para o Gemini."""
-        # Usar io.StringIO para capturar a saída de df.info()
-        buffer = io.StringIO()
-        self.df.info(buf=buffer)
-        schema_info = buffer.getvalue()
-
-        return f"""
+            result = {"type": "error", "content": f"Erro ao processar os dados completos: {str(e)}"}
+
+        if result['type'] != 'error':
+            result["exact"] = True
+        self._log_interaction("confirm_on_full_data", {"question": analysis.get("question"), "columns": columns},
+                              result, started)
+        return result
+
+    def can_confirm(self, analysis: Dict[str, Any]) -> bool:
+        """Se `confirm_on_full_data` consegue reavaliar a análise (a interface só oferece o botão nesse caso)."""
+        if not self.is_sampled or self.full_source is None:
+            return False
+        code = analysis.get("code")
+        return code is None or not self._sampled_tables_used(code)
+
+    def _sampled_tables_used(self, code: str) -> List[str]:
+        """Tabelas do ZIP (modo `tables`), além da de `df`, que o código usa e que foram amostradas."""
+        if not self.tables:
+            return []
+        sampled = [name for name, entry in list(zip(self.tables, self.ingestion_report))[1:] if entry['Amostrado']]
+        return referenced_names(code, sampled)
+
+    def answer_queries(self, questions: List[str]) -> List[Dict[str, Any]]:
+        """
+        Versão síncrona de `answer_queries_async`, para scripts e relatórios.
+        Não deve ser chamada de dentro de um event loop em execução.
+        """
+        return asyncio.run(self.answer_queries_async(questions))
+
+    async def answer_queries_async(self, questions: List[str]) -> List[Dict[str, Any]]:
+        """
+        Responde a várias perguntas de uma vez, na ordem em que foram enviadas.
+
+        As chamadas ao Gemini são sobrepostas com concorrência limitada
+        (`batch.max_concurrency`) e passam por um token bucket
+        (`batch.requests_per_minute` / `batch.burst`). A execução do código só
+        é paralela no backend `pool`; em processo, ela é serializada porque todas
+        as perguntas compartilham o mesmo `df`.
+        """
+        if self.df is None:
+            return [{"type": "error", "content": "Nenhum dado carregado."} for _ in questions]
+
+        options = settings['batch']
+        limiter = TokenBucket(rate=options['requests_per_minute'] / 60, capacity=options['burst'])
+        semaphore = asyncio.Semaphore(options['max_concurrency'])
+        execution_lock = asyncio.Lock() if self.executor is None else None
+
+        async def answer(question: str) -> Dict[str, Any]:
+            cache_key = generated_code = None
+            try:
+                fast_result = self._answer_fast_path(question)
+                if fast_result is not None:
+                    return fast_result
+                async with semaphore:
+                    generated_code, response_text, cache_key = await asyncio.to_thread(
+                        self._generate_code, question, limiter.acquire
+                    )
+                if not generated_code:
+                    result = {"type": "text", "content": response_text}
+                    self._log_interaction("answer_query", {"question": question}, result)
+                    return result
+                if execution_lock is None:
+                    result, size = await asyncio.to_thread(self._execute_code_sized, generated_code)
+                else:
+                    async with execution_lock:
+                        result, size = await asyncio.to_thread(self._execute_code_sized, generated_code)
+                self._remember_code(cache_key, generated_code, result, fresh=bool(response_text))
+                self._log_interaction("answer_query", {"question": question, "code": generated_code}, result,
+                                      size=size)
+                return result
+            except Exception as e:
+                self._remember_code(cache_key, generated_code, None)
+                error_msg = f"Ocorreu um erro ao interagir com a API Gemini ou executar o código: {str(e)}"
+                self._log_interaction("answer_query", {"question": question}, {"type": "error", "content": error_msg})
+                return {"type": "error", "content": error_msg}
+
+        # As threads de `asyncio.to_thread` herdam o contexto: os spans de cada pergunta ficam sob este.
+        with self.telemetry.span("answer_queries", questions=len(questions)):
+            return list(await asyncio.gather(*(answer(question) for question in questions)))
+
+    def _generate_code(self, question: str,
+                       before_request: Optional[Callable[[], None]] = None) -> Tuple[Optional[str], str, str]:
+        """
+        Obtém o código para a pergunta, do cache ou do Gemini. O código novo só
+        entra no cache depois de executado sem erro (ver `_remember_code`).
+        `before_request` é chamado imediatamente antes de cada chamada à API (ex: limitador de taxa).
+
+        Returns:
+            Uma tupla (código extraído ou None, texto bruto da resposta, chave no cache).
+        """
+        cache_key, generated_code = self._lookup_code(question)
+        if generated_code is not None:
+            return generated_code, "", cache_key
+
+        if before_request is not None:
+            before_request()
+        prompt, _ = self._build_prompt(question)
+        with self.telemetry.span("generate_content", streaming=False) as span:
+            response = self.model.generate_content(prompt, generation_config=self._generation_config())
+            self._record_usage(span, response, prompt, response.text)
+        return self._extract_python_code(response.text), response.text, cache_key
+
+    def _lookup_code(self, question: str) -> Tuple[str, Optional[str]]:
+        """Chave da pergunta no cache de respostas e o código guardado nela, se houver."""
+        cache_key = AnswerCache.make_key(self._dataset_fingerprint(), question)
+        generated_code = self.answer_cache.get(cache_key)
+        self._count_cache("answer", generated_code is not None)
+        return cache_key, generated_code
+
+    @staticmethod
+    def _generation_config() -> "genai.types.GenerationConfig":
+        return genai.types.GenerationConfig(
+            candidate_count=1,
+            max_output_tokens=settings['llm']['max_output_tokens'],
+            temperature=settings['llm']['temperature'],
+        )
+
+    def _remember_code(self, cache_key: Optional[str], code: Optional[str], result: Optional[Dict[str, Any]],
+                       fresh: bool = False) -> None:
+        """
+        Guarda no cache o código recém-gerado (`fresh`) que executou sem erro e
+        descarta o que falhou (`result` None ou do tipo 'error'), para que a
+        próxima vez gere um novo.
+        """
+        if cache_key is None or not code:
+            return
+        if result is None or result['type'] == 'error':
+            self.answer_cache.discard(cache_key)
+        elif fresh:
+            self.answer_cache.put(cache_key, code)
+
+    def _dataset_fingerprint(self) -> str:
+        """Identifica o dataset carregado (conteúdo e esquema) e o modelo que gera o código."""
+        schema = ",".join(f"{name}:{dtype}" for name, dtype in self.df.dtypes.items())
+        return f"{settings['llm']['model_name']}|{self.dataset_key}|{schema}"
+
+    def _build_prompt(self, question: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Constrói o prompt para o Gemini.
+        O contexto do dataset é pré-calculado na carga e limitado a
+        `prompt.max_context_tokens`. Retorna o prompt e o seu tamanho, que também
+        fica em `prompt_stats` (perguntas em paralelo não leem as medidas umas das outras).
+        """
+        with self.telemetry.span("build_prompt") as span:
+            prompt, stats = self._compose_prompt(question)
+            self.prompt_stats.append(stats)
+            span.set(prompt_chars=stats['prompt_chars'], prompt_tokens_estimate=stats['prompt_tokens'],
+                     columns_included=stats['columns_included'], columns_total=stats['columns_total'])
+        return prompt, stats
+
+    def _compose_prompt(self, question: str) -> Tuple[str, Dict[str, Any]]:
+        if self.context is None:
+            self.context = DatasetContext(self.df, self.profile, settings['prompt']['example_values'])
+        context, context_stats = self.context.render(question, settings['prompt']['max_context_tokens'])
+        if self.tables:
+            listing = "\n".join(f"- `{name}` ({len(frame)} linhas): {', '.join(map(str, frame.columns))}"
+                                 for name, frame in self.tables.items())
+            context += f"\n\nO arquivo também tem as tabelas abaixo, disponíveis como variáveis:\n{listing}"
+
+        prompt = f"""
         Você é um analista de dados especialista. Sua tarefa é ajudar um usuário a analisar um DataFrame do pandas chamado `df`.
 
         **Contexto do DataFrame (`df`):**
-        - Primeiras 5 linhas:
-        {self.df.head().to_string()}
-        - Esquema e tipos de dados:
-        {schema_info}
+{context}
 
         **Tarefa:**
         Com base na pergunta do usuário, gere um único bloco de código Python para realizar a análise.
@@ -162,37 +780,122 @@ class EDAAgentPro:
         **Pergunta do Usuário:**
         {question}
         """
+        stats = {
+            "question": question,
+            "prompt_chars": len(prompt),
+            "prompt_tokens": estimate_tokens(prompt),
+            **context_stats,
+        }
+        return prompt, stats
 
     def _extract_python_code(self, text: str) -> Optional[str]:
         """Extrai o código de um bloco de markdown."""
-        if "```python" in text:
-            return text.split("```python\n")[1].split("```").strip()
-        return None
+        with self.telemetry.span("extract_python_code", response_chars=len(text)) as span:
+            code = text.split("```python")[1].split("```")[0].strip() if "```python" in text else None
+            span.set(found=code is not None)
+        return code
 
     def _execute_code(self, code: str) -> Dict[str, Any]:
+        """Executa o código gerado (ver `_execute_code_sized`)."""
+        return self._execute_code_sized(code)[0]
+
+    def _execute_code_sized(self, code: str) -> Tuple[Dict[str, Any], int]:
         """
-        Executa o código gerado em um ambiente controlado.
-        AVISO: `exec` é poderoso e deve ser usado com cautela.
+        Executa o código gerado no próprio processo ou, com `execution.backend: pool`,
+        em um worker isolado com limites de tempo e memória.
+
+        Código equivalente ao de uma execução anterior sobre a mesma versão dos
+        dados (mesma AST após normalizar formatação, nomes de variáveis e ordem de
+        argumentos nomeados) devolve o resultado memorizado. Código que altera `df`
+        ou depende de aleatoriedade é sempre executado, e alterações descartam a
+        memória de resultados.
+
+        Retorna também o tamanho do resultado (`payload_bytes`), calculado uma só
+        vez para a memória de resultados e o histórico.
         """
-        local_scope = {}
-        global_scope = {
-            'df': self.df,
-            'pd': pd,
-            'px': px
-        }
-        
-        exec(code, global_scope, local_scope)
-
-        if 'fig' in local_scope:
-            return {"type": "plot", "content": local_scope['fig']}
-        elif 'result' in local_scope:
-            content = local_scope['result']
-            if isinstance(content, (pd.DataFrame, pd.Series)):
-                return {"type": "table", "content": content}
+        frames = {'df': self.df, **self.tables}
+        backend = 'pool' if self.executor is not None else 'inprocess'
+        with self.telemetry.span("execute_code", rows=len(self.df), backend=backend) as span:
+            analysis = analyze_code(code, frames)
+            memoizable = self.result_memo.enabled and analysis.memoizable
+            if memoizable:
+                cached = self.result_memo.get(analysis.key)
+                self._count_cache("result", cached is not None)
+                if cached is not None:
+                    span.set(result_type=cached[0]['type'], memoized=True)
+                    return cached
+            if analysis.mutates:
+                # Descartada antes da execução, para valer mesmo se o código falhar no meio.
+                self.result_memo.invalidate()
+                if self._registry_ref is not None and self.executor is None:
+                    frames = self._detach_shared_frames()
+            version = self.result_memo.version
+
+            if self.executor is not None:
+                result = self.executor.run(self.dataset_key or f"frame-{id(self.df)}", frames, code)
             else:
-                return {"type": "text", "content": str(content)}
-        else:
-            return {"type": "text", "content": "O código foi executado, mas não produziu um resultado visível ('fig' ou 'result')."}
+                result = execute_code(code, frames)
+            result = self._reduce_plot(result)
+            size = payload_bytes(result)
+            if memoizable and result['type'] != 'error':
+                self.result_memo.put(analysis.key, result, version, size)
+            span.set(result_type=result['type'], memoized=False, **result.get('points', {}))
+        return result, size
+
+    def _detach_shared_frames(self) -> Dict[str, pd.DataFrame]:
+        """
+        Troca os DataFrames compartilhados pelo registro por cópias próprias da
+        sessão, antes de um código que os altera no próprio processo, e devolve a
+        referência ao registro.
+        """
+        self.df = self.df.copy()
+        self.tables = {name: frame.copy() for name, frame in self.tables.items()}
+        if self.tables:
+            self.df = next(iter(self.tables.values()))
+        self._registry_ref()
+        self._registry_ref = None
+        return {'df': self.df, **self.tables}
+
+    def _reduce_plot(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Simplifica figuras com traces grandes antes de enviá-las ao navegador
+        (ver `plots` no config.yaml). A contagem de pontos antes e depois fica em
+        `result["points"]`.
+        """
+        options = settings['plots']
+        if result['type'] != 'plot' or not options['enabled']:
+            return result
+        figure, stats = reduce_figure(
+            result['content'],
+            max_points=options['max_points'],
+            line_method=options['line_method'],
+            scatter_bins=options['scatter_bins'],
+            webgl=options['webgl'],
+        )
+        if stats['traces_reduced']:
+            result = {**result, "content": figure, "points": stats}
+        return result
             
-    def _log_interaction(self, action: str, params: Dict, result: Any):
-        self.memory_log.append({"action": action, "params": params, "result": result})
\ No newline at end of file
+    @property
+    def memory_log(self) -> InteractionHistory:
+        """Compatibilidade: o histórico se comporta como a antiga lista de interações."""
+        return self.history
+
+    def _count_cache(self, cache: str, hit: bool) -> None:
+        self.telemetry.count("eda_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+    @staticmethod
+    def _record_usage(span, response, prompt: str, text: str) -> None:
+        """Tokens de entrada e saída informados pela API (estimados se ela não os informar ou sem `response`)."""
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        response_tokens = getattr(usage, "candidates_token_count", None)
+        if prompt_tokens and response_tokens:
+            span.set(prompt_tokens=prompt_tokens, response_tokens=response_tokens, tokens_estimated=False)
+        else:
+            span.set(prompt_tokens=estimate_tokens(prompt), response_tokens=estimate_tokens(text), tokens_estimated=True)
+
+    def _log_interaction(self, action: str, params: Dict, result: Any, started: Optional[float] = None,
+                         size: Optional[int] = None) -> int:
+        seconds = time.perf_counter() - started if started is not None else None
+        return self.history.append(action, params, result, seconds, size)
\ No newline at end of file
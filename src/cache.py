@@ -0,0 +1,312 @@
+# src/cache.py
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import closing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+# Incrementar quando o formato das entradas mudar, invalidando o cache antigo.
+CACHE_FORMAT_VERSION = 2
+
+
+def content_key(content: bytes, params: Dict[str, Any]) -> str:
+    """Chave de conteúdo: hash dos bytes enviados e dos parâmetros que afetam o resultado."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(content)
+    digest.update(json.dumps({"version": CACHE_FORMAT_VERSION, **params}, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _dtype_name(dtype) -> str:
+    # `str(StringDtype)` omite o armazenamento (python/pyarrow), que precisa ser preservado.
+    if isinstance(dtype, pd.StringDtype):
+        return f"string[{dtype.storage}]"
+    return str(dtype)
+
+
+def _restore_dtypes(df: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """Reaplica tipos que a conversão Arrow -> pandas não reconstrói sozinha."""
+    mismatched = {name: dtype for name, dtype in dtypes.items()
+                  if name in df.columns and _dtype_name(df[name].dtype) != dtype}
+    return df.astype(mismatched) if mismatched else df
+
+
+@dataclass
+class CachedDataset:
+    """Resultado de uma ingestão, tal como armazenado no cache."""
+    filename: str
+    df: pd.DataFrame
+    original_shape: Tuple[int, int]
+    is_sampled: bool
+    profile: Any = None
+    memory_report: Optional[Dict[str, int]] = None
+    # Tabelas nomeadas de um ZIP (modo `tables`); não são gravadas em disco.
+    tables: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    ingestion_report: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class DatasetCache:
+    """
+    Cache em disco de datasets já processados, endereçado pelo conteúdo do upload.
+
+    Cada entrada é um diretório com o DataFrame em formato Arrow IPC, os
+    metadados da ingestão e o perfil estatístico. O arquivo é lido via
+    memory-map, mas a conversão para pandas copia os dados: um acerto evita o
+    parse do CSV, não a alocação do DataFrame. A política de remoção é LRU,
+    limitada pelo tamanho total em bytes.
+    """
+
+    DATA_FILE = "data.arrow"
+    META_FILE = "meta.json"
+    PROFILE_FILE = "profile.pkl"
+
+    def __init__(self, directory: str, max_bytes: int, enabled: bool = True):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get(self, key: str) -> Optional[CachedDataset]:
+        """Reabre uma entrada do cache, ou retorna None em caso de ausência."""
+        if not self.enabled:
+            return None
+        entry = self.directory / key
+        try:
+            meta = json.loads((entry / self.META_FILE).read_text(encoding='utf-8'))
+            with pa.memory_map(str(entry / self.DATA_FILE), 'r') as source:
+                # `to_pandas` copia para blocos NumPy graváveis, com os mesmos tipos do parse original.
+                df = pa.ipc.open_file(source).read_all().to_pandas()
+            df = _restore_dtypes(df, meta['dtypes'])
+            with open(entry / self.PROFILE_FILE, 'rb') as f:
+                profile = pickle.load(f)
+        except (OSError, ValueError, pa.ArrowException, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return None
+
+        # Atualiza o horário de acesso usado pela política LRU.
+        os.utime(entry)
+        self.hits += 1
+        self.saved_seconds += meta['parse_seconds']
+        return CachedDataset(
+            filename=meta['filename'],
+            df=df,
+            original_shape=tuple(meta['original_shape']),
+            is_sampled=meta['is_sampled'],
+            profile=profile,
+            memory_report=meta.get('memory_report'),
+            ingestion_report=meta.get('ingestion_report', []),
+        )
+
+    def contains(self, key: str) -> bool:
+        return self.enabled and (self.directory / key / self.META_FILE).exists()
+
+    def put(self, key: str, dataset: CachedDataset, parse_seconds: float) -> None:
+        """Grava uma entrada de forma atômica e aplica a política de remoção."""
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        staging = self.directory / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        try:
+            table = pa.Table.from_pandas(dataset.df, preserve_index=True)
+            with pa.OSFile(str(staging / self.DATA_FILE), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            with open(staging / self.PROFILE_FILE, 'wb') as f:
+                pickle.dump(dataset.profile, f, protocol=pickle.HIGHEST_PROTOCOL)
+            meta = {
+                "filename": dataset.filename,
+                "original_shape": list(dataset.original_shape),
+                "is_sampled": dataset.is_sampled,
+                "parse_seconds": parse_seconds,
+                "dtypes": {str(name): _dtype_name(dtype) for name, dtype in dataset.df.dtypes.items()},
+                "memory_report": dataset.memory_report,
+                "ingestion_report": dataset.ingestion_report,
+                "created_at": time.time(),
+            }
+            (staging / self.META_FILE).write_text(json.dumps(meta), encoding='utf-8')
+            target = self.directory / key
+            shutil.rmtree(target, ignore_errors=True)
+            staging.rename(target)
+        except (OSError, pa.ArrowException):
+            # O cache é apenas uma otimização: falhas de escrita não interrompem a ingestão.
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de acerto/erro, tempo de parse economizado e ocupação em disco."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_parse_seconds": round(self.saved_seconds, 3),
+            "entries": len(self._entries()),
+            "bytes": sum(size for _, _, size in self._entries()),
+        }
+
+    def _entries(self):
+        if not self.directory.exists():
+            return []
+        entries = []
+        for entry in self.directory.iterdir():
+            if entry.is_dir() and not entry.name.startswith('.'):
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry.stat().st_mtime, entry, size))
+        return entries
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, entry, size in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def normalize_question(question: str) -> str:
+    """Normaliza a pergunta para que variações triviais compartilhem a mesma entrada."""
+    text = unicodedata.normalize('NFKC', question).casefold()
+    text = ' '.join(text.split())
+    return text.rstrip(' ?.!;:')
+
+
+class AnswerCache:
+    """
+    Cache em dois níveis do código gerado pelo LLM: LRU em memória na frente de
+    um armazenamento SQLite local. Entradas expiram por TTL e o armazenamento é
+    limitado pelo número de entradas, removendo as menos acessadas.
+    """
+
+    def __init__(self, path: str, memory_entries: int, max_entries: int, ttl_seconds: float, enabled: bool = True):
+        self.path = Path(path)
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @staticmethod
+    def make_key(fingerprint: str, question: str) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(fingerprint.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(normalize_question(question).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna o código armazenado para a chave, ou None se ausente ou expirado."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and now - cached[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return cached[0]
+            self._memory.pop(key, None)
+
+        row = self._query(
+            "SELECT value, created_at FROM answers WHERE key = ?", (key,), fetch=True
+        )
+        if row is None or now - row[1] > self.ttl_seconds:
+            if row is not None:
+                self._query("DELETE FROM answers WHERE key = ?", (key,))
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._query("UPDATE answers SET accessed_at = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, row[0], row[1])
+        return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Armazena o código nos dois níveis e aplica os limites de tamanho."""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+        self._query(
+            "INSERT OR REPLACE INTO answers (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, now, now),
+        )
+        self._query(
+            "DELETE FROM answers WHERE key IN ("
+            " SELECT key FROM answers ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def discard(self, key: str) -> None:
+        """Remove a entrada dos dois níveis (ex: código que deixou de funcionar)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._memory.pop(key, None)
+        self._query("DELETE FROM answers WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de acerto por nível e taxa de acerto global."""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _query(self, sql: str, params: Tuple, fetch: bool = False):
+        # Uma conexão por operação: o Streamlit atende cada sessão em uma thread diferente.
+        try:
+            with closing(self._connect()) as conn, conn:
+                cursor = conn.execute(sql, params)
+                return cursor.fetchone() if fetch else None
+        except sqlite3.Error:
+            # O cache é apenas uma otimização: falhas de disco equivalem a uma ausência.
+            return None
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5)
+        if not self._initialized:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._initialized = True
+        return conn
@@ -17,12 +17,50 @@ def load_config() -> dict:
                 "max_file_size_mb": 200,
                 "sampling_threshold_rows": 100000,
                 "sampling_rows": 50000,
+                "chunk_rows": 50000,
             },
+            "csv": {"sniff_bytes": 65536, "engine": "c"},
+            "memory_optimization": {
+                "enabled": False,
+                "arrow_strings": True,
+                "categories": False,
+                "category_max_ratio": 0.5,
+                "min_integer_dtype": "int32",
+                "nullable_integers": False,
+            },
+            "cache": {"enabled": True, "dir": ".cache/datasets", "max_size_mb": 1024},
+            "zip": {"mode": "first", "workers": 4},
+            "store": {"enabled": True, "max_memory_mb": 4096, "spill_to_disk": True},
+            "history": {"max_memory_mb": 64, "max_disk_mb": 512, "dir": ".cache/history"},
+            "plots": {"enabled": True, "max_points": 5000, "line_method": "lttb", "scatter_bins": 100, "webgl": True},
+            "result_memo": {"enabled": True, "max_memory_mb": 256},
             "analysis": {"num_suggested_queries": 5},
+            "profiling": {"hll_precision": 12, "quantile_centroids": 200, "top_k": 10},
+            "fast_path": {"enabled": True},
             "llm": {
                 "model_name": "gemini-2.5-flash",
                 "temperature": 0.0,
                 "max_output_tokens": 2048,
+                "stream": True,
+            },
+            "prompt": {"max_context_tokens": 1500, "example_values": 3, "stats_entries": 100},
+            "llm_cache": {
+                "enabled": True,
+                "path": ".cache/answers.sqlite",
+                "memory_entries": 256,
+                "max_entries": 5000,
+                "ttl_seconds": 604800,
+            },
+            "full_data": {"enabled": True, "chunk_rows": 200000, "max_memory_mb": 2048},
+            "batch": {"max_concurrency": 4, "requests_per_minute": 60, "burst": 4},
+            "execution": {"backend": "inprocess", "workers": 2, "timeout_seconds": 30, "max_memory_mb": 1024},
+            "telemetry": {
+                "enabled": False,
+                "log_path": ".cache/telemetry/spans.jsonl",
+                "metrics_path": ".cache/telemetry/metrics.prom",
+                "metrics_flush_seconds": 5,
+                "metrics_port": 0,
+                "trace_allocations": False,
             },
             "ui": {"app_title": "Agente EDA com Gemini", "sidebar_header": "Configurações"},
         }
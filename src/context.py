@@ -0,0 +1,78 @@
+# src/context.py
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from src.intents import mentioned_columns
+
+# Aproximação usual de ~4 caracteres por token para modelos como o Gemini.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class DatasetContext:
+    """
+    Resumo compacto do esquema de um dataset, calculado uma única vez por carga
+    e reutilizado em todos os prompts. Cada coluna vira uma linha com tipo, % de
+    nulos, cardinalidade e exemplos; na montagem do prompt, as colunas citadas
+    na pergunta vêm primeiro e as demais entram até o limite de tokens.
+    """
+
+    def __init__(self, df: pd.DataFrame, profile=None, example_values: int = 3):
+        self.n_rows, self.n_cols = df.shape
+        self._frame = df.iloc[:0]
+        self.lines: Dict[Any, str] = {}
+        stats = profile.columns if profile is not None else {}
+        head = df.head(1000)
+
+        for name in df.columns:
+            column = stats.get(name)
+            if column is not None:
+                total = column.count + column.nulls
+                null_pct = column.nulls * 100 / total if total else 0.0
+                distinct = column.distinct.estimate() if column.count else 0
+            else:
+                null_pct = df[name].isnull().mean() * 100 if len(df) else 0.0
+                distinct = df[name].nunique()
+            examples = ", ".join(_shorten(value) for value in head[name].dropna().unique()[:example_values])
+            self.lines[name] = (f"- `{name}` ({df[name].dtype}) | nulos: {null_pct:.1f}% | "
+                                f"distintos: ~{distinct} | exemplos: {examples}")
+
+    def render(self, question: str, max_tokens: int) -> Tuple[str, Dict[str, int]]:
+        """
+        Monta o trecho de contexto dentro do orçamento de tokens.
+
+        Returns:
+            O texto do contexto e as estatísticas de quantas colunas couberam.
+        """
+        mentioned = mentioned_columns(question, self._frame)
+        ranked = mentioned + [name for name in self.lines if name not in mentioned]
+
+        header = f"{self.n_rows} linhas x {self.n_cols} colunas. Colunas:"
+        parts: List[str] = [header]
+        budget = max_tokens - estimate_tokens(header)
+        included = 0
+        for name in ranked:
+            cost = estimate_tokens(self.lines[name]) + 1
+            if cost > budget:
+                break
+            parts.append(self.lines[name])
+            budget -= cost
+            included += 1
+
+        omitted = ranked[included:]
+        if omitted:
+            names = ", ".join(f"`{name}`" for name in omitted)
+            note = f"- ... {len(omitted)} colunas omitidas: {names}"
+            parts.append(note[:max(budget, 0) * CHARS_PER_TOKEN] if estimate_tokens(note) > budget else note)
+
+        text = "\n".join(parts)
+        return text, {"columns_included": included, "columns_total": len(self.lines)}
+
+
+def _shorten(value: Any, limit: int = 30) -> str:
+    text = str(value)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
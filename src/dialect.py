@@ -0,0 +1,147 @@
+# src/dialect.py
+import codecs
+import csv
+import re
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, TypeVar
+
+# Delimitadores considerados pelo Sniffer, em ordem de preferência nos empates.
+_DELIMITERS = ",;\t|"
+_NUMBER = re.compile(r"^[+-]?(\d+([.,]\d*)?|[.,]\d+)([eE][+-]?\d+)?$")
+_COMMA_DECIMAL = re.compile(r"^[+-]?\d*,\d+$")
+# Encoding da segunda leitura quando o UTF-8 falha depois do prefixo analisado.
+FALLBACK_ENCODING = "latin1"
+T = TypeVar("T")
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+@dataclass
+class CsvDialect:
+    """Formato de um CSV detectado a partir de um prefixo do arquivo."""
+    encoding: str = "utf-8"
+    delimiter: str = ","
+    quotechar: str = '"'
+    decimal: str = "."
+    header: bool = True
+
+    def read_kwargs(self) -> Dict[str, Any]:
+        """Argumentos para `pd.read_csv` (a decodificação é estrita; ver `read_with_fallback`)."""
+        return {
+            "encoding": self.encoding,
+            "sep": self.delimiter,
+            "quotechar": self.quotechar,
+            "decimal": self.decimal,
+            "header": 0 if self.header else None,
+        }
+
+
+def sniff_dialect(prefix: bytes) -> CsvDialect:
+    """
+    Detecta encoding, delimitador, aspas, separador decimal e cabeçalho a partir
+    dos primeiros bytes de um CSV.
+    """
+    encoding = _detect_encoding(prefix)
+    # O prefixo pode cortar um caractere multibyte ou a última linha ao meio.
+    text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(prefix, final=False)
+    lines = text.splitlines()
+    if len(lines) > 1 and not text.endswith(("\n", "\r")):
+        lines = lines[:-1]
+    sample = "\n".join(lines)
+    if not sample.strip():
+        return CsvDialect(encoding=encoding)
+
+    try:
+        sniffed = csv.Sniffer().sniff(sample, delimiters=_DELIMITERS)
+        delimiter, quotechar = sniffed.delimiter, sniffed.quotechar or '"'
+    except csv.Error:
+        delimiter, quotechar = _most_frequent_delimiter(lines[0]), '"'
+
+    rows = list(csv.reader(lines, delimiter=delimiter, quotechar=quotechar))
+    return CsvDialect(
+        encoding=encoding,
+        delimiter=delimiter,
+        quotechar=quotechar,
+        decimal=_detect_decimal(rows[1:], delimiter),
+        header=_detect_header(rows),
+    )
+
+
+def sniff_source(source: Any, sniff_bytes: int) -> CsvDialect:
+    """Lê até `sniff_bytes` de um arquivo aberto em modo binário e volta ao início."""
+    position = source.tell()
+    prefix = source.read(sniff_bytes)
+    source.seek(position)
+    return sniff_dialect(prefix)
+
+
+def read_with_fallback(source: Any, dialect: CsvDialect, read: Callable[[Dict[str, Any]], T]) -> T:
+    """
+    Chama `read` com os argumentos do dialeto. O encoding é deduzido apenas do
+    prefixo: se um byte que não é UTF-8 aparecer depois dele, `source` volta à
+    posição inicial e é lido mais uma vez em latin1, em vez de trocar os
+    caracteres por '�'.
+    """
+    position = source.tell()
+    try:
+        return read(dialect.read_kwargs())
+    except UnicodeDecodeError:
+        if dialect.encoding != "utf-8":
+            raise
+        source.seek(position)
+        return read(replace(dialect, encoding=FALLBACK_ENCODING).read_kwargs())
+
+
+def _detect_encoding(prefix: bytes) -> str:
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        # Mesmo fallback da ingestão anterior: latin1 decodifica qualquer byte.
+        return "latin1"
+
+
+def _most_frequent_delimiter(line: str) -> str:
+    return max(_DELIMITERS, key=line.count) if any(d in line for d in _DELIMITERS) else ","
+
+
+def _detect_decimal(rows: List[List[str]], delimiter: str) -> str:
+    """Vírgula decimal só é possível quando ela não é o delimitador (ex: '1,5' em CSVs com ';')."""
+    if delimiter == ",":
+        return "."
+    values = [field.strip() for row in rows for field in row if _NUMBER.match(field.strip())]
+    comma = sum(1 for value in values if _COMMA_DECIMAL.match(value))
+    point = sum(1 for value in values if "." in value)
+    return "," if comma > point else "."
+
+
+def _detect_header(rows: List[List[str]]) -> bool:
+    """
+    Assume cabeçalho, como o `pd.read_csv`, salvo evidência de que a primeira
+    linha é um registro: toda numérica e, coluna a coluna, com o mesmo tipo e a
+    mesma largura das linhas seguintes (critério do `csv.Sniffer.has_header`).
+    Assim, cabeçalhos numéricos como anos (`2020,2021`) continuam sendo nomes.
+    """
+    if len(rows) < 2 or not rows[0]:
+        return True
+    first = [field.strip() for field in rows[0]]
+    if not all(field and _NUMBER.match(field) for field in first):
+        return True
+    data = [row for row in rows[1:21] if len(row) == len(first)]
+    if not data:
+        return True
+    for index, field in enumerate(first):
+        column = [row[index].strip() for row in data]
+        # Um número sobre uma coluna de texto só pode ser nome de coluna.
+        if not all(value and _NUMBER.match(value) for value in column):
+            return True
+        widths = {len(value) for value in column}
+        if len(widths) == 1 and len(field) not in widths:
+            return True
+    return False
@@ -0,0 +1,138 @@
+# src/fulldata.py
+import ast
+import os
+import tempfile
+import zipfile
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from src.dialect import FALLBACK_ENCODING, sniff_source
+
+ProgressCallback = Callable[[float], None]
+
+def _selected_columns(node: ast.AST, by_name: Dict[str, Any]) -> Optional[List[Any]]:
+    """Colunas lidas por `df['col']`, `df[['a', 'b']]` ou `df.col`; None para qualquer outro uso de `df`."""
+    if isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Load):
+        keys = node.slice.elts if isinstance(node.slice, ast.List) else [node.slice]
+        if keys and all(isinstance(key, ast.Constant) and isinstance(key.value, str) and key.value in by_name
+                        for key in keys):
+            return [by_name[key.value] for key in keys]
+    elif isinstance(node, ast.Attribute) and node.attr in by_name:
+        return [by_name[node.attr]]
+    return None
+
+
+def referenced_columns(code: str, columns: Sequence[Any]) -> Optional[List[Any]]:
+    """
+    Descobre, pela AST do código, quais colunas de `df` ele utiliza.
+
+    Só há poda quando todo uso de `df` é a leitura direta de colunas
+    (`df['col']`, `df[['a', 'b']]` ou `df.col`). Qualquer outro uso (métodos
+    como `df.groupby(...)`, filtros por máscara `df[df['a'] > 0]`, `df`
+    repassado a uma função ou a outra variável) pode depender das demais
+    colunas, e então o retorno é None (carregar todas).
+    """
+    by_name = {str(name): name for name in columns}
+    tree = ast.parse(code)
+    parents = {child: node for node in ast.walk(tree) for child in ast.iter_child_nodes(node)}
+    used = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Name) and node.id == 'df'):
+            continue
+        parent = parents.get(node)
+        selected = _selected_columns(parent, by_name) if getattr(parent, "value", None) is node else None
+        if selected is None:
+            return None
+        used.extend(selected)
+    if not used:
+        return None
+    return list(dict.fromkeys(used))
+
+
+def referenced_names(code: str, names: Sequence[str]) -> List[str]:
+    """Quais de `names` (ex: tabelas de um ZIP) aparecem como variáveis no código, na ordem de `names`."""
+    used = {node.id for node in ast.walk(ast.parse(code)) if isinstance(node, ast.Name)}
+    return [name for name in names if name in used]
+
+
+class FullDataSource:
+    """
+    Cópia em disco do upload original, usada para reprocessar o dataset completo
+    em blocos quando a análise interativa roda sobre uma amostra.
+    """
+
+    def __init__(self, content: bytes, suffix: str, members: Optional[List[str]] = None, sniff_bytes: int = 65536):
+        handle, self.path = tempfile.mkstemp(prefix="eda-source-", suffix=suffix)
+        with os.fdopen(handle, 'wb') as f:
+            f.write(content)
+        self.members = members
+        self.sniff_bytes = sniff_bytes
+
+    def iter_chunks(self, columns: Optional[List[Any]], chunk_rows: int, **read_kwargs) -> Iterator[pd.DataFrame]:
+        """
+        Lê o arquivo completo em blocos, apenas com as colunas pedidas. Em um ZIP,
+        os membros de `members` são lidos em sequência, como um único dataset.
+        """
+        if self.members is None:
+            with open(self.path, 'rb') as f:
+                yield from self._read(f, columns, chunk_rows, read_kwargs)
+            return
+        with zipfile.ZipFile(self.path) as z:
+            for name in self.members:
+                with z.open(name) as member:
+                    yield from self._read(member, columns, chunk_rows, read_kwargs)
+
+    def _read(self, source, columns, chunk_rows: int, read_kwargs: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+        options = {**sniff_source(source, self.sniff_bytes).read_kwargs(), **read_kwargs}
+        with pd.read_csv(source, usecols=columns, chunksize=chunk_rows, **options) as reader:
+            yield from reader
+
+    def close(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def load_full_frame(
+    source: FullDataSource,
+    columns: Optional[List[Any]],
+    total_rows: int,
+    chunk_rows: int,
+    progress: Optional[ProgressCallback] = None,
+) -> pd.DataFrame:
+    """
+    Materializa o dataset completo restrito às colunas usadas pela análise,
+    relatando o progresso (0.0 a 1.0) a cada bloco lido.
+    """
+    # Mesma estratégia de encoding da ingestão: o dialeto detectado e, se falhar, latin1.
+    for read_kwargs in ({}, {'encoding': FALLBACK_ENCODING}):
+        chunks = []
+        rows = 0
+        try:
+            for chunk in source.iter_chunks(columns, chunk_rows, **read_kwargs):
+                chunks.append(chunk)
+                rows += len(chunk)
+                if progress is not None and total_rows:
+                    progress(min(rows / total_rows, 1.0))
+            break
+        except UnicodeDecodeError:
+            continue
+    return pd.concat(chunks) if chunks else pd.DataFrame(columns=columns)
+
+
+def estimate_frame_bytes(profile, columns: Optional[List[Any]]) -> int:
+    """Estimativa grosseira de memória para carregar as colunas a partir do perfil de ingestão."""
+    if profile is None:
+        return 0
+    names = columns if columns is not None else list(profile.columns)
+    total = 0
+    for name in names:
+        column = profile.columns.get(name)
+        if column is None:
+            continue
+        # Numéricos ocupam 8 bytes; texto em `object` custa ~60 bytes por valor.
+        per_value = 8 if column.is_numeric else 60
+        total += profile.n_rows * per_value
+    return total
@@ -0,0 +1,225 @@
+# src/history.py
+import gzip
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from plotly.basedatatypes import BaseFigure
+
+# Estados do resultado de uma entrada.
+RESIDENT = "memory"
+SPILLED = "disk"
+EVICTED = "evicted"
+
+
+# Layout, nomes e demais propriedades escalares de uma figura.
+_FIGURE_OVERHEAD = 4096
+
+
+def payload_bytes(payload: Any) -> int:
+    """
+    Estimativa da memória ocupada por um resultado (DataFrames, figuras, textos e dicts deles).
+    Figuras são medidas pelos arrays dos traces, sem serializá-las.
+    """
+    if isinstance(payload, pd.DataFrame):
+        return int(payload.memory_usage(index=True, deep=True).sum())
+    if isinstance(payload, pd.Series):
+        return int(payload.memory_usage(index=True, deep=True))
+    if isinstance(payload, BaseFigure):
+        # `_props` são as propriedades já atribuídas ao trace; `to_plotly_json` as copiaria.
+        return _FIGURE_OVERHEAD + sum(_property_bytes(trace._props or {}) for trace in payload.data)
+    if isinstance(payload, (str, bytes)):
+        return len(payload)
+    if isinstance(payload, dict):
+        return 64 + sum(payload_bytes(value) for value in payload.values())
+    if isinstance(payload, (list, tuple)):
+        return 64 + sum(payload_bytes(value) for value in payload)
+    return sys.getsizeof(payload)
+
+
+def _property_bytes(value: Any) -> int:
+    """Bytes dos arrays de um trace (x, y, marker.color, text...); listas contam 8 bytes por item."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_property_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return 8 * len(value)
+    return 0
+
+
+def summarize(payload: Any) -> Dict[str, Any]:
+    """Metadados leves de um resultado, mantidos em memória mesmo após o descarte do conteúdo."""
+    if isinstance(payload, dict) and "type" in payload:
+        content = payload.get("content")
+        summary: Dict[str, Any] = {"type": payload["type"]}
+        if isinstance(content, (pd.DataFrame, pd.Series)):
+            summary["shape"] = content.shape
+        elif isinstance(content, BaseFigure):
+            summary["traces"] = len(content.data)
+        elif isinstance(content, str):
+            summary["chars"] = len(content)
+        return summary
+    if isinstance(payload, dict) and "schema" in payload:
+        return {"type": "pre_analysis", "shape": payload.get("original_shape")}
+    return {"type": type(payload).__name__}
+
+
+class InteractionHistory:
+    """
+    Histórico das interações de uma sessão com orçamento de memória.
+
+    Cada entrada guarda em memória apenas metadados leves (ação, parâmetros como
+    pergunta e código, duração e formato do resultado). O resultado completo fica
+    em memória enquanto cabe em `max_memory_bytes`; acima disso, os mais antigos
+    são gravados comprimidos em disco e reabertos sob demanda. O disco também é
+    limitado (`max_disk_bytes`): os resultados mais antigos são descartados,
+    mantendo apenas os metadados.
+    """
+
+    def __init__(self, directory: str, max_memory_bytes: int, max_disk_bytes: int):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._root = Path(directory)
+        self._directory: Optional[Path] = None
+        self._entries: List[Dict[str, Any]] = []
+        self._payloads: "OrderedDict[int, Any]" = OrderedDict()
+        self._memory_bytes = 0
+        self._spilled: "OrderedDict[int, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+    def append(self, action: str, params: Dict[str, Any], result: Any, seconds: Optional[float] = None,
+               size: Optional[int] = None) -> int:
+        """
+        Registra uma interação e retorna o identificador da entrada. `size` é o
+        tamanho do resultado, se já calculado (ver `payload_bytes`).
+        """
+        if size is None:
+            size = payload_bytes(result)
+        with self._lock:
+            entry_id = len(self._entries)
+            self._entries.append({
+                "id": entry_id,
+                "action": action,
+                "params": params,
+                "timestamp": time.time(),
+                "seconds": seconds,
+                "summary": summarize(result),
+                "bytes": size,
+                "state": RESIDENT,
+            })
+            self._payloads[entry_id] = result
+            self._memory_bytes += size
+            self._enforce_budget()
+            return entry_id
+
+    @property
+    def last_id(self) -> Optional[int]:
+        return len(self._entries) - 1 if self._entries else None
+
+    def result(self, entry_id: int) -> Any:
+        """
+        Resultado completo de uma entrada, relido do disco se necessário.
+        Retorna None se ele já foi descartado.
+        """
+        with self._lock:
+            if entry_id in self._payloads:
+                return self._payloads[entry_id]
+            if entry_id not in self._spilled:
+                return None
+            path = self._path(entry_id)
+        try:
+            with gzip.open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def is_resident(self, entry_id: int) -> bool:
+        return entry_id in self._payloads
+
+    def entry(self, entry_id: int) -> Dict[str, Any]:
+        """Metadados de uma entrada (sem o resultado)."""
+        return dict(self._entries[entry_id])
+
+    def usage(self) -> Dict[str, Any]:
+        """Uso de memória e disco do histórico desta sessão."""
+        with self._lock:
+            states = [entry["state"] for entry in self._entries]
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "in_memory": states.count(RESIDENT),
+                "on_disk": states.count(SPILLED),
+                "evicted": states.count(EVICTED),
+            }
+
+    def close(self) -> None:
+        """Remove os resultados gravados em disco."""
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        """Entrada no formato do antigo `memory_log`: {"action", "params", "result"} e metadados."""
+        entry = dict(self._entries[index])
+        entry["result"] = self.result(entry["id"])
+        return entry
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self._entries)):
+            yield self[index]
+
+    def _enforce_budget(self) -> None:
+        # A entrada mais recente nunca sai da memória, mesmo que sozinha exceda o orçamento.
+        while self._memory_bytes > self.max_memory_bytes and len(self._payloads) > 1:
+            entry_id, payload = self._payloads.popitem(last=False)
+            entry = self._entries[entry_id]
+            self._memory_bytes -= entry["bytes"]
+            entry["state"] = self._spill(entry_id, payload)
+
+        while self._disk_bytes > self.max_disk_bytes and self._spilled:
+            entry_id, size = self._spilled.popitem(last=False)
+            self._disk_bytes -= size
+            self._entries[entry_id]["state"] = EVICTED
+            try:
+                os.remove(self._path(entry_id))
+            except OSError:
+                pass
+
+    def _spill(self, entry_id: int, payload: Any) -> str:
+        if self.max_disk_bytes <= 0:
+            return EVICTED
+        if self._directory is None:
+            self._root.mkdir(parents=True, exist_ok=True)
+            self._directory = Path(tempfile.mkdtemp(prefix="session-", dir=self._root))
+            weakref.finalize(self, shutil.rmtree, self._directory, True)
+        path = self._path(entry_id)
+        try:
+            with gzip.open(path, 'wb', compresslevel=3) as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # Resultados que não podem ser serializados são apenas descartados.
+            return EVICTED
+        size = path.stat().st_size
+        self._spilled[entry_id] = size
+        self._disk_bytes += size
+        return SPILLED
+
+    def _path(self, entry_id: int) -> Path:
+        return self._directory / f"{entry_id}.pkl.gz"
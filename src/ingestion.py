@@ -0,0 +1,358 @@
+# src/ingestion.py
+import multiprocessing
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.dialect import read_with_fallback, sniff_source
+from src.profiler import DatasetProfile
+
+ChunkCallback = Callable[[pd.DataFrame], None]
+
+class ReservoirSampler:
+    """
+    Amostragem por reservatório (Algoritmo R) aplicada bloco a bloco.
+
+    Mantém no máximo `capacity` linhas em memória, independentemente do
+    tamanho total do fluxo, e é determinística para uma mesma semente.
+    """
+
+    def __init__(self, capacity: int, random_state: int = 42):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(random_state)
+        self.rows_seen = 0
+        self.reservoir: Optional[pd.DataFrame] = None
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        """Processa um bloco de linhas de forma vetorizada."""
+        if chunk.empty:
+            return
+
+        # Enquanto o reservatório não está cheio, as linhas entram diretamente.
+        free = max(self.capacity - self._size(), 0)
+        if free:
+            head = chunk.iloc[:free]
+            self.reservoir = head if self.reservoir is None else pd.concat([self.reservoir, head])
+            self.rows_seen += len(head)
+            chunk = chunk.iloc[free:]
+            if chunk.empty:
+                return
+
+        # Para a i-ésima linha do fluxo (base 0) sorteia-se j em [0, i];
+        # se j < capacity, a linha substitui a posição j do reservatório.
+        positions = np.arange(self.rows_seen, self.rows_seen + len(chunk))
+        slots = self.rng.integers(0, positions + 1)
+        self.rows_seen += len(chunk)
+
+        accepted = np.flatnonzero(slots < self.capacity)
+        if accepted.size == 0:
+            return
+        # Quando várias linhas do bloco disputam a mesma posição, vence a última,
+        # exatamente como na versão sequencial do algoritmo.
+        reversed_slots = slots[accepted][::-1]
+        _, first = np.unique(reversed_slots, return_index=True)
+        winners = accepted[::-1][first]
+        replaced = slots[winners]
+
+        keep = np.ones(self._size(), dtype=bool)
+        keep[replaced] = False
+        self.reservoir = pd.concat([self.reservoir.iloc[keep], chunk.iloc[winners]])
+
+    def result(self) -> Optional[pd.DataFrame]:
+        """Retorna a amostra na ordem original do arquivo."""
+        if self.reservoir is None:
+            return None
+        return self.reservoir.sort_index()
+
+    def _size(self) -> int:
+        return 0 if self.reservoir is None else len(self.reservoir)
+
+
+def read_csv_streaming(
+    source: Any,
+    threshold_rows: int,
+    sample_rows: int,
+    chunk_rows: int,
+    random_state: int = 42,
+    on_chunk: Optional[ChunkCallback] = None,
+    engine: str = "c",
+    **read_kwargs,
+) -> Tuple[pd.DataFrame, Tuple[int, int], bool]:
+    """
+    Lê um CSV em blocos, mantendo a memória limitada pelo tamanho da amostra.
+
+    Enquanto o total de linhas não ultrapassa `threshold_rows`, os blocos são
+    acumulados para devolver o arquivo completo. Ao ultrapassar o limite, os
+    blocos passam a alimentar um reservatório de `sample_rows` linhas.
+
+    Args:
+        source: Caminho ou objeto de arquivo aceito por `pd.read_csv`.
+        threshold_rows: Número de linhas a partir do qual a amostragem é ativada.
+        sample_rows: Tamanho da amostra mantida em memória.
+        chunk_rows: Número de linhas lidas por bloco.
+        random_state: Semente da amostragem.
+        on_chunk: Função opcional chamada com cada bloco lido (ex: estatísticas).
+        engine: 'c' (leitor em blocos do pandas) ou 'pyarrow' (leitor em streaming do Arrow).
+        **read_kwargs: Argumentos adicionais repassados ao `pd.read_csv`.
+
+    Returns:
+        Uma tupla (DataFrame, formato original, indicador de amostragem).
+    """
+    buffered: List[pd.DataFrame] = []
+    sampler: Optional[ReservoirSampler] = None
+    n_rows = 0
+    n_cols = 0
+
+    for chunk in iter_csv_chunks(source, chunk_rows, engine, **read_kwargs):
+        n_rows += len(chunk)
+        n_cols = chunk.shape[1]
+        if on_chunk is not None:
+            on_chunk(chunk)
+
+        if sampler is not None:
+            sampler.add(chunk)
+            continue
+
+        buffered.append(chunk)
+        if n_rows > threshold_rows:
+            sampler = ReservoirSampler(sample_rows, random_state)
+            sampler.add(pd.concat(buffered))
+            buffered = []
+
+    if sampler is not None:
+        return sampler.result(), (n_rows, n_cols), True
+
+    if not buffered:
+        # Arquivo apenas com cabeçalho: o leitor em blocos não produz nenhum bloco.
+        return pd.DataFrame(), (0, n_cols), False
+    df = buffered[0] if len(buffered) == 1 else pd.concat(buffered)
+    return df, (n_rows, df.shape[1]), False
+
+
+def iter_csv_chunks(source: Any, chunk_rows: int, engine: str = "c", **read_kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Lê um CSV em blocos com o motor escolhido. Os blocos têm índices contínuos
+    (como no `pd.read_csv` com `chunksize`), o que a amostragem pressupõe.
+    """
+    if engine != "pyarrow":
+        with pd.read_csv(source, chunksize=chunk_rows, **read_kwargs) as reader:
+            yield from reader
+        return
+
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    header = read_kwargs.get("header", 0) is not None
+    reader = _open_arrow_csv(
+        source,
+        read_options=pa_csv.ReadOptions(
+            encoding=read_kwargs.get("encoding", "utf-8"),
+            autogenerate_column_names=not header,
+            # O Arrow divide o arquivo em blocos de bytes; ~64 bytes por linha é uma estimativa típica.
+            block_size=max(chunk_rows * 64, 1 << 20),
+        ),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=read_kwargs.get("sep", ","),
+            quote_char=read_kwargs.get("quotechar", '"'),
+        ),
+        convert_options=pa_csv.ConvertOptions(decimal_point=read_kwargs.get("decimal", ".")),
+    )
+    # UTF-8 inválido no primeiro bloco não gera erro: a coluna é inferida como binária.
+    binary = [field.name for field in reader.schema if pa.types.is_binary(field.type)]
+    if binary:
+        raise UnicodeDecodeError("utf-8", b"", 0, 1, f"UTF-8 inválido nas colunas {binary}")
+    offset = 0
+    while True:
+        try:
+            batch = reader.read_next_batch()
+        except StopIteration:
+            return
+        except pa.ArrowInvalid as e:
+            _raise_if_invalid_utf8(e)
+            # Os tipos do Arrow são inferidos no primeiro bloco e não mudam depois.
+            raise ValueError(f"O leitor pyarrow não conseguiu ler o arquivo ({e}); use csv.engine 'c'.") from e
+        chunk = batch.to_pandas()
+        if not header:
+            chunk.columns = range(chunk.shape[1])
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+def _open_arrow_csv(source: Any, **options):
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    try:
+        return pa_csv.open_csv(source, **options)
+    except pa.ArrowInvalid as e:
+        _raise_if_invalid_utf8(e)
+        raise
+
+
+def _raise_if_invalid_utf8(error: Exception) -> None:
+    """O Arrow valida UTF-8 com `ArrowInvalid`; vira `UnicodeDecodeError`, como no leitor 'c'."""
+    if "UTF8" in str(error) or "UTF-8" in str(error):
+        raise UnicodeDecodeError("utf-8", b"", 0, 1, str(error)) from error
+
+
+def merge_samples(
+    left: pd.DataFrame,
+    left_rows: int,
+    right: pd.DataFrame,
+    right_rows: int,
+    threshold_rows: int,
+    sample_rows: int,
+    rng: np.random.Generator,
+) -> Tuple[pd.DataFrame, int, bool]:
+    """
+    Combina dois resultados de ingestão (completos ou amostrados) em um só,
+    preservando uma amostra uniforme das `left_rows + right_rows` linhas.
+
+    Cada lado é o conjunto completo (quando coube no limite) ou uma amostra
+    uniforme de `sample_rows` linhas. O número de linhas vindas de cada lado
+    segue a distribuição hipergeométrica, como se a amostra fosse única.
+    """
+    total = left_rows + right_rows
+    if total <= threshold_rows:
+        return pd.concat([left, right], ignore_index=True), total, False
+
+    from_left = int(rng.hypergeometric(left_rows, right_rows, sample_rows))
+    parts = [
+        left.sample(n=from_left, random_state=rng),
+        right.sample(n=sample_rows - from_left, random_state=rng),
+    ]
+    return pd.concat(parts, ignore_index=True), total, True
+
+
+def read_zip_member(
+    path: str,
+    member: str,
+    threshold_rows: int,
+    sample_rows: int,
+    chunk_rows: int,
+    random_state: int,
+    profile_options: Dict[str, int],
+    sniff_bytes: int = 65536,
+    engine: str = "c",
+) -> Dict[str, Any]:
+    """
+    Lê um membro CSV de um arquivo ZIP em disco. Executada nos processos do
+    pool de ingestão, por isso recebe apenas argumentos serializáveis.
+    """
+    start = time.perf_counter()
+
+    def read(read_kwargs: Dict[str, Any]):
+        # Um perfil novo a cada leitura: a segunda (em latin1) recomeça do zero.
+        profile = DatasetProfile(**profile_options)
+        return (*read_csv_streaming(
+            csv_file, threshold_rows, sample_rows, chunk_rows, random_state,
+            on_chunk=profile.update, engine=engine, **read_kwargs,
+        ), profile)
+
+    with zipfile.ZipFile(path) as z, z.open(member) as csv_file:
+        dialect = sniff_source(csv_file, sniff_bytes)
+        df, shape, is_sampled, profile = read_with_fallback(csv_file, dialect, read)
+    return {
+        "member": member,
+        "df": df,
+        "shape": shape,
+        "is_sampled": is_sampled,
+        "profile": profile,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def read_zip_members(path: str, members: List[str], workers: int, **member_kwargs) -> Iterator[Dict[str, Any]]:
+    """
+    Lê vários membros CSV em paralelo, em um pool de processos, e devolve os
+    resultados na ordem de `members`. No máximo `2 * workers` membros ficam em
+    andamento ao mesmo tempo, limitando a memória dos resultados pendentes.
+    """
+    random_state = member_kwargs.pop('random_state')
+    if workers <= 1 or len(members) <= 1:
+        for index, member in enumerate(members):
+            yield read_zip_member(path, member, random_state=random_state + index, **member_kwargs)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        pending = deque()
+        for index, member in enumerate(members):
+            pending.append(pool.submit(read_zip_member, path, member, random_state=random_state + index, **member_kwargs))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Se o consumidor desistir no meio (ex: esquema divergente), os membros na fila não são lidos.
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def concat_zip_members(
+    results: Iterable[Dict[str, Any]],
+    threshold_rows: int,
+    sample_rows: int,
+    random_state: int = 42,
+) -> Tuple[pd.DataFrame, Tuple[int, int], bool, Optional[DatasetProfile], List[Dict[str, Any]]]:
+    """
+    Junta os membros lidos por `read_zip_members` em um único dataset.
+
+    Os resultados são combinados à medida que chegam, de modo que a memória
+    fica limitada por uma amostra acumulada mais os membros em andamento.
+    Todos os membros devem ter as mesmas colunas que o primeiro.
+
+    Returns:
+        Uma tupla (DataFrame, formato original, indicador de amostragem,
+        perfil combinado, relatório por membro).
+    """
+    rng = np.random.default_rng(random_state)
+    df: Optional[pd.DataFrame] = None
+    profile: Optional[DatasetProfile] = None
+    n_rows = 0
+    is_sampled = False
+    reference = None
+    report = []
+
+    for result in results:
+        report.append(member_report(result))
+        frame, (rows, _) = result["df"], result["shape"]
+        if frame.columns.empty and rows == 0:
+            continue
+        if reference is None:
+            reference = frame.columns
+        elif set(frame.columns) != set(reference):
+            missing = [str(c) for c in reference if c not in frame.columns]
+            extra = [str(c) for c in frame.columns if c not in reference]
+            raise ValueError(f"O arquivo '{result['member']}' tem um esquema diferente dos demais "
+                             f"(ausentes: {missing}; extras: {extra}).")
+        frame = frame[reference]
+
+        if profile is None:
+            profile = result["profile"]
+        else:
+            profile.merge(result["profile"])
+        if df is None:
+            df, n_rows, is_sampled = frame.reset_index(drop=True), rows, result["is_sampled"]
+        else:
+            df, n_rows, is_sampled = merge_samples(df, n_rows, frame, rows, threshold_rows, sample_rows, rng)
+
+    if df is None:
+        return pd.DataFrame(), (0, 0), False, profile, report
+    return df, (n_rows, df.shape[1]), is_sampled, profile, report
+
+
+def member_report(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Linha do relatório de ingestão de um membro: linhas, colunas, amostragem e tempo."""
+    rows, cols = result["shape"]
+    return {
+        "Arquivo": result["member"],
+        "Linhas": rows,
+        "Colunas": cols,
+        "Amostrado": result["is_sampled"],
+        "Tempo (s)": round(result["seconds"], 3),
+    }
@@ -0,0 +1,210 @@
+# src/intents.py
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+# Limite de barras do histograma; o tamanho da figura depende disso, e não do número de linhas.
+_MAX_HISTOGRAM_BINS = 100
+
+_AGGREGATIONS = {
+    "média": "mean", "media": "mean", "mean": "mean", "average": "mean",
+    "soma": "sum", "total": "sum", "sum": "sum",
+    "máximo": "max", "maximo": "max", "max": "max",
+    "mínimo": "min", "minimo": "min", "min": "min",
+    "mediana": "median", "median": "median",
+    "contagem": "count", "count": "count",
+}
+
+# Marcador que substitui cada coluna citada no texto normalizado da pergunta.
+_COLUMN = "\x00"
+# Palavras de abertura e artigos que não mudam o sentido ("qual a", "mostre a", "what is the").
+_LEAD = (r"(?:(?:qual|quais|quantos|quantas|mostre|mostrar|me|exiba|calcule|gere|liste|existe|existem|há|"
+         r"show|what|is|are|the|how|many|o|a|os|as|é|são|uma?)\s)*")
+_OF = r"(?:(?:de|da|do|das|dos|em|na|no|of|in|for|para)\s)?(?:(?:coluna|column)\s)?"
+_COLUMNS = rf"{_COLUMN}(?:\s(?:e|and)?\s?{_COLUMN})*"
+
+# Cada template precisa cobrir a pergunta inteira (ver `match_intent`).
+_TEMPLATES = [
+    ("groupby", re.compile(
+        rf"{_LEAD}(?P<aggregation>{'|'.join(_AGGREGATIONS)})\s{_OF}{_COLUMN}\s(?:por|by|per)\s(?:cada\s)?{_COLUMN}")),
+    ("correlation", re.compile(
+        rf"{_LEAD}(?:matriz\sde\s)?(?:correla[cç][aã]o|correlation(?:\smatrix)?)"
+        rf"(?:\s(?:entre|between|of)\s(?:(?:as|os|the)\s)?(?:(?:colunas\snum[eé]ricas|numeric\scolumns)|{_COLUMNS}))?")),
+    ("nulls", re.compile(
+        rf"{_LEAD}(?:(?:valores|dados|quantidade\sde|contagem\sde)\s)?(?:nulos|nulas|faltantes|ausentes|missing|nulls?)"
+        rf"(?:\svalues)?(?:\s(?:existem|há))?(?:\s(?:por|em|de|na|no|nas|nos|in|per)\s(?:cada\s)?"
+        rf"(?:(?:coluna|column)s?|{_OF}{_COLUMNS}))?")),
+    ("describe", re.compile(
+        rf"{_LEAD}(?:estat[ií]sticas?\sdescritivas?|resumo\sestat[ií]stico|describe|summary\sstatistics)"
+        rf"(?:\s{_OF}(?:(?:colunas|columns)\s)?{_COLUMNS})?")),
+    ("top_k", re.compile(
+        rf"{_LEAD}(?:top\s(?P<n>\d+)|(?P<count>\d+)\s(?P<order>maiores|menores|primeiros|largest|smallest)|"
+        rf"(?P<direction>maiores|menores))\s(?:(?:valores|registros|linhas|values|rows)\s)?"
+        rf"(?:(?:de|da|do|em|por|of|by)\s)?(?:(?:coluna|column)\s)?{_COLUMN}")),
+    ("distribution", re.compile(
+        rf"{_LEAD}(?:distribui[cç][aã]o|histograma|distribution|histogram)\s{_OF}{_COLUMN}")),
+    ("value_counts", re.compile(
+        rf"{_LEAD}(?:contagem|frequ[eê]ncia|value\scounts|count)\s(?:(?:de|das|dos|of)\s)?"
+        rf"(?:(?:categorias|valores|values|categories)\s)?{_OF}{_COLUMN}"
+        rf"|{_LEAD}(?:registros|linhas|vezes)\s(?:(?:há|existem)\s)?(?:(?:em|para|de|por)\s)?cada\s{_COLUMN}")),
+]
+
+
+class Intent(NamedTuple):
+    """
+    Intenção reconhecida na pergunta e a rotina que a responde sem o LLM.
+    `columns` são as colunas que a rotina lê (None quando ela usa o DataFrame inteiro).
+    """
+    name: str
+    columns: Optional[List[str]]
+    run: Callable[[pd.DataFrame], Dict[str, Any]]
+
+
+def match_intent(question: str, df: pd.DataFrame) -> Optional[Intent]:
+    """
+    Reconhece perguntas comuns de EDA que podem ser respondidas de forma exata
+    por rotinas vetorizadas. Retorna None quando nenhuma intenção se aplica.
+
+    Só perguntas que um template cobre por inteiro usam o caminho rápido. Qualquer
+    sobra (um número, um literal entre aspas, um valor das células, uma condição)
+    indica um filtro ou detalhe que a rotina ignoraria, e a pergunta vai ao LLM.
+    """
+    text, columns = _template_text(question, df)
+    for name, template in _TEMPLATES:
+        match = template.fullmatch(text)
+        if match is not None:
+            return _build_intent(name, match, columns, df)
+    return None
+
+
+def _build_intent(name: str, match: "re.Match", columns: List[Any], df: pd.DataFrame) -> Optional[Intent]:
+    numeric = [c for c in columns if _is_numeric(df[c])]
+
+    if name == "groupby":
+        value, group = columns
+        aggregation = _AGGREGATIONS[match.group("aggregation")]
+        if aggregation == "count" or _is_numeric(df[value]):
+            return Intent("groupby", columns, lambda d: _groupby(d, group, value, aggregation))
+        return None
+
+    if name == "correlation":
+        if columns and len(numeric) < 2:
+            return None
+        targets = numeric or None
+        return Intent("correlation", targets, lambda d: _correlation(d, targets))
+
+    if name == "nulls":
+        return Intent("nulls", columns or None, lambda d: _null_report(d, columns))
+
+    if name == "describe":
+        return Intent("describe", columns or None, lambda d: _describe(d, columns))
+
+    column = columns[0]
+    if name == "top_k":
+        if not _is_numeric(df[column]):
+            return None
+        n = int(match.group("n") or match.group("count") or 10)
+        largest = (match.group("order") or match.group("direction")) not in ("menores", "smallest")
+        # A rotina devolve as linhas inteiras, não só a coluna ordenada.
+        return Intent("top_k", None, lambda d: _top_k(d, column, n, largest))
+
+    if name == "distribution" and _is_numeric(df[column]):
+        return Intent("histogram", columns, lambda d: _histogram(d, column))
+    return Intent("value_counts", columns, lambda d: _value_counts(d, column))
+
+
+def _template_text(question: str, df: pd.DataFrame) -> Tuple[str, List[Any]]:
+    """
+    Normaliza a pergunta para os templates: caixa, espaços e pontuação final são
+    descartados e cada coluna citada (com ou sem aspas) vira `_COLUMN`.
+    """
+    text = re.sub(r"[\s,;:]+", " ", question.casefold()).strip().rstrip("?.!").strip()
+    spans = _column_spans(text, df)
+    pieces, position = [], 0
+    for start, end, _ in spans:
+        # Aspas em volta do nome da coluna fazem parte da citação, não são um literal.
+        quoted = start > 0 and end < len(text) and text[start - 1] == text[end] and text[end] in "'\""
+        if quoted:
+            start, end = start - 1, end + 1
+        pieces.append(text[position:start])
+        pieces.append(_COLUMN)
+        position = end
+    pieces.append(text[position:])
+    return "".join(pieces), [name for _, _, name in spans]
+
+
+def mentioned_columns(question: str, df: pd.DataFrame) -> List[Any]:
+    """Colunas citadas na pergunta, na ordem em que aparecem."""
+    return [name for _, _, name in _column_spans(question.casefold(), df)]
+
+
+def _column_spans(lowered: str, df: pd.DataFrame) -> List[Tuple[int, int, Any]]:
+    """Primeira ocorrência de cada coluna em `lowered`, sem sobreposições, em ordem de posição."""
+    taken = []
+    found = []
+    # Nomes mais longos primeiro, para que 'Valor Total' não seja lido como 'Valor'.
+    for name in sorted(df.columns, key=lambda c: len(str(c)), reverse=True):
+        pattern = r"(?<![\w])" + re.escape(str(name).casefold()) + r"(?![\w])"
+        for match in re.finditer(pattern, lowered):
+            if any(match.start() < end and start < match.end() for start, end in taken):
+                continue
+            taken.append(match.span())
+            found.append((*match.span(), name))
+            break
+    return sorted(found, key=lambda item: item[0])
+
+
+def _is_numeric(column: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column)
+
+
+def _histogram(df: pd.DataFrame, column: str) -> Dict[str, Any]:
+    """Contagens calculadas no servidor: a figura leva uma barra por faixa, e não os valores brutos."""
+    values = df[column].dropna().to_numpy(dtype=np.float64)
+    edges = np.histogram_bin_edges(values, bins="auto")
+    if len(edges) > _MAX_HISTOGRAM_BINS + 1:
+        edges = np.histogram_bin_edges(values, bins=_MAX_HISTOGRAM_BINS)
+    counts, edges = np.histogram(values, bins=edges)
+    bins = pd.DataFrame({column: (edges[:-1] + edges[1:]) / 2, "contagem": counts})
+    figure = px.bar(bins, x=column, y="contagem", title=f"Distribuição de {column}")
+    figure.update_traces(width=np.diff(edges))
+    figure.update_layout(bargap=0)
+    return {"type": "plot", "content": figure}
+
+
+def _value_counts(df: pd.DataFrame, column: str) -> Dict[str, Any]:
+    counts = df[column].value_counts(dropna=False).rename_axis(column).reset_index(name="contagem")
+    return {"type": "table", "content": counts}
+
+
+def _correlation(df: pd.DataFrame, columns: Optional[List[str]]) -> Dict[str, Any]:
+    frame = df[columns] if columns else df
+    return {"type": "table", "content": frame.corr(numeric_only=True)}
+
+
+def _null_report(df: pd.DataFrame, columns: List[str]) -> Dict[str, Any]:
+    frame = df[columns] if columns else df
+    nulls = frame.isnull().sum()
+    report = pd.DataFrame({
+        "Valores Nulos": nulls,
+        "Valores Nulos (%)": (nulls * 100 / len(frame)).round(2) if len(frame) else 0.0,
+    })
+    return {"type": "table", "content": report}
+
+
+def _describe(df: pd.DataFrame, columns: List[str]) -> Dict[str, Any]:
+    frame = df[columns] if columns else df
+    return {"type": "table", "content": frame.describe(include="all") if columns else frame.describe()}
+
+
+def _top_k(df: pd.DataFrame, column: str, n: int, largest: bool) -> Dict[str, Any]:
+    rows = df.nlargest(n, column) if largest else df.nsmallest(n, column)
+    return {"type": "table", "content": rows}
+
+
+def _groupby(df: pd.DataFrame, group: str, value: str, aggregation: str) -> Dict[str, Any]:
+    grouped = df.groupby(group, observed=True)[value].agg(aggregation)
+    return {"type": "table", "content": grouped.sort_values(ascending=False)}
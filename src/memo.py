@@ -0,0 +1,236 @@
+# src/memo.py
+import ast
+import builtins
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from src.history import payload_bytes
+
+# Nomes que o escopo de execução fornece ou lê e que, portanto, não podem ser renomeados.
+_SCOPE_NAMES = frozenset({'df', 'pd', 'px', 'fig', 'result'}) | frozenset(dir(builtins))
+# Métodos que alteram o DataFrame sem `inplace=True`.
+_MUTATING_METHODS = frozenset({'insert', 'pop', 'update', '__setitem__', '__delitem__'})
+# Chamadas cujo resultado muda a cada execução (amostras sem semente, relógio, aleatoriedade).
+_NONDETERMINISTIC_ATTRIBUTES = frozenset({
+    'now', 'today', 'utcnow', 'random', 'rand', 'randn', 'randint', 'choice',
+    'shuffle', 'permutation', 'uniform', 'normal', 'uuid4',
+})
+_NONDETERMINISTIC_NAMES = frozenset({'random', 'time', 'uuid', 'open', 'input'})
+
+
+@dataclass
+class CodeAnalysis:
+    """
+    Resultado da análise estática do código gerado.
+
+    `key` identifica o código independentemente de formatação, comentários,
+    nomes de variáveis auxiliares e ordem de argumentos nomeados (None se o
+    código não compila). `mutates` indica que o código altera um dos DataFrames
+    do escopo e `deterministic` que o resultado depende apenas dos dados.
+    """
+    key: Optional[str]
+    mutates: bool = False
+    deterministic: bool = True
+
+    @property
+    def memoizable(self) -> bool:
+        return self.key is not None and self.deterministic and not self.mutates
+
+
+def analyze_code(code: str, frame_names: Iterable[str] = ('df',)) -> CodeAnalysis:
+    """Analisa o código gerado; `frame_names` são os DataFrames expostos no escopo de execução."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return CodeAnalysis(key=None)
+    frames = set(frame_names)
+    mutates, deterministic = _inspect(tree, frames)
+    normalized = _Normalizer(_local_names(tree, frames | _SCOPE_NAMES)).visit(tree)
+    dump = ast.dump(normalized, annotate_fields=False, include_attributes=False)
+    return CodeAnalysis(key=hashlib.blake2b(dump.encode('utf-8'), digest_size=20).hexdigest(),
+                        mutates=mutates, deterministic=deterministic)
+
+
+def _root_name(node: ast.AST) -> Optional[str]:
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _inspect(tree: ast.AST, frames: Set[str]) -> Tuple[bool, bool]:
+    """Detecta alterações nos DataFrames do escopo (inclusive por apelidos como `d = df`) e não determinismo."""
+    frames = set(frames)
+    for node in ast.walk(tree):
+        # `d = df` cria um apelido para o mesmo objeto; alterar `d` altera `df`.
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Name) and node.value.id in frames:
+            frames.update(target.id for target in node.targets if isinstance(target, ast.Name))
+
+    mutates, deterministic = False, True
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Assign, ast.AugAssign, ast.AnnAssign, ast.Delete)):
+            targets = node.targets if isinstance(node, (ast.Assign, ast.Delete)) else [node.target]
+            for target in targets:
+                for element in ast.walk(target):
+                    # `df = ...` apenas rebate o nome no escopo local; `df[...] = ...` altera o objeto.
+                    if isinstance(element, (ast.Attribute, ast.Subscript)) and _root_name(element) in frames:
+                        mutates = True
+        elif isinstance(node, ast.Call):
+            if any(keyword.arg == 'inplace' and not (isinstance(keyword.value, ast.Constant)
+                                                     and keyword.value.value is False)
+                   for keyword in node.keywords):
+                mutates = True
+            function = node.func
+            if isinstance(function, ast.Attribute):
+                if function.attr in _MUTATING_METHODS and _root_name(function.value) in frames:
+                    mutates = True
+                if function.attr in _NONDETERMINISTIC_ATTRIBUTES:
+                    deterministic = False
+                if function.attr == 'sample' and not any(keyword.arg == 'random_state' for keyword in node.keywords):
+                    deterministic = False
+        elif isinstance(node, ast.Name) and node.id in _NONDETERMINISTIC_NAMES:
+            deterministic = False
+    return mutates, deterministic
+
+
+def _local_names(tree: ast.AST, protected: Set[str]) -> Dict[str, str]:
+    """Nomes definidos pelo próprio código, na ordem em que aparecem, mapeados para nomes canônicos."""
+    names: Dict[str, str] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            name = node.id
+        elif isinstance(node, ast.arg):
+            name = node.arg
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            name = node.name
+        else:
+            continue
+        if name not in protected and name not in names:
+            names[name] = f"__v{len(names)}"
+    return names
+
+
+def _pure(node: ast.AST) -> bool:
+    """Expressões cuja avaliação não tem efeitos colaterais (podem ser reordenadas)."""
+    if isinstance(node, (ast.Constant, ast.Name)):
+        return True
+    if isinstance(node, ast.Attribute):
+        return _pure(node.value)
+    if isinstance(node, (ast.Tuple, ast.List)):
+        return all(_pure(element) for element in node.elts)
+    if isinstance(node, ast.UnaryOp):
+        return _pure(node.operand)
+    return False
+
+
+class _Normalizer(ast.NodeTransformer):
+    """Renomeia variáveis locais, ordena argumentos nomeados e conjuntos de constantes e remove docstrings."""
+
+    def __init__(self, names: Dict[str, str]):
+        self.names = names
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        return ast.Name(id=self.names.get(node.id, node.id), ctx=node.ctx)
+
+    def visit_arg(self, node: ast.arg) -> ast.AST:
+        node.arg = self.names.get(node.arg, node.arg)
+        node.annotation = None
+        return node
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        node.name = self.names.get(node.name, node.name)
+        return self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> ast.AST:
+        node.name = self.names.get(node.name, node.name)
+        return self.generic_visit(node)
+
+    def visit_Expr(self, node: ast.Expr) -> Optional[ast.AST]:
+        # Strings soltas (docstrings, "comentários") não afetam o resultado.
+        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            return None
+        return self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        self.generic_visit(node)
+        if all(keyword.arg is not None and _pure(keyword.value) for keyword in node.keywords):
+            node.keywords.sort(key=lambda keyword: keyword.arg)
+        return node
+
+    def visit_Set(self, node: ast.Set) -> ast.AST:
+        self.generic_visit(node)
+        if all(isinstance(element, ast.Constant) for element in node.elts):
+            node.elts.sort(key=lambda element: (type(element.value).__name__, repr(element.value)))
+        return node
+
+
+class ResultMemo:
+    """
+    Memória dos resultados de código já executado sobre a versão atual dos dados,
+    indexada pela chave de `analyze_code`. Perguntas diferentes que geram o mesmo
+    código (ou variações triviais dele) e reexecuções da interface reaproveitam a
+    tabela, o texto ou a figura sem executar nada.
+
+    O tamanho total é limitado a `max_bytes`, descartando os resultados menos
+    usados recentemente. `invalidate` descarta tudo e avança a versão: resultados
+    calculados sobre uma versão anterior e entregues depois disso são ignorados.
+    """
+
+    def __init__(self, max_bytes: int, enabled: bool = True):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Resultado memorizado para `key` e o tamanho dele, ou None."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Cópia rasa: quem recebe o resultado pode acrescentar chaves sem afetar a memória.
+        return dict(cached[0]), cached[1]
+
+    def put(self, key: str, result: Dict[str, Any], version: int, size: Optional[int] = None) -> bool:
+        """
+        Armazena `result`, calculado sobre `version`, se ele couber no orçamento.
+        `size` é o tamanho do resultado, se já calculado (ver `payload_bytes`).
+        """
+        if size is None:
+            size = payload_bytes(result)
+        if not self.enabled or size > self.max_bytes:
+            return False
+        with self._lock:
+            if version != self.version:
+                return False
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (dict(result), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+        return True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "version": self.version}
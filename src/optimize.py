@@ -0,0 +1,92 @@
+# src/optimize.py
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+
+try:
+    # Strings em Arrow com semântica de NaN (pandas >= 2.1), compatíveis com código legado.
+    ARROW_STRING_DTYPE = pd.StringDtype("pyarrow_numpy")
+except (ImportError, ValueError):
+    ARROW_STRING_DTYPE = None
+
+
+def compact_dtypes(
+    df: pd.DataFrame,
+    category_max_ratio: float = 0.5,
+    arrow_strings: bool = True,
+    categories: bool = False,
+    min_integer_dtype: str = "int32",
+    nullable_integers: bool = False,
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Reduz o consumo de memória de um DataFrame sem alterar seus valores.
+
+    - Inteiros são reduzidos ao menor tipo que comporta seus valores, sem descer
+      abaixo de `min_integer_dtype` (evita overflow em aritmética do código gerado).
+    - Floats passam a float32 apenas quando a conversão é exata.
+    - Colunas de texto usam strings em Arrow, quando disponível. Com `categories`,
+      as que têm poucos valores distintos viram `category`; isso é opcional porque
+      `groupby` sem `observed=` e `value_counts` passam a listar categorias vazias.
+    - Opcionalmente, floats que contêm apenas inteiros e nulos viram inteiros anuláveis.
+
+    Returns:
+        Uma tupla com o DataFrame compactado e o relatório de bytes antes/depois.
+    """
+    bytes_before = int(df.memory_usage(deep=True).sum())
+    floor = np.dtype(min_integer_dtype)
+    compacted = {}
+
+    for name in df.columns:
+        column = df[name]
+        kind = column.dtype.kind
+        if kind in 'iu':
+            compacted[name] = _downcast_integer(column, floor)
+        elif kind == 'f':
+            compacted[name] = _compact_float(column, floor, nullable_integers)
+        elif column.dtype == object:
+            compacted[name] = _compact_text(column, category_max_ratio if categories else None, arrow_strings)
+
+    if compacted:
+        df = df.copy(deep=False)
+        for name, values in compacted.items():
+            df[name] = values
+    bytes_after = int(df.memory_usage(deep=True).sum())
+    return df, {"bytes_before": bytes_before, "bytes_after": bytes_after}
+
+
+def _downcast_integer(column: pd.Series, floor: np.dtype) -> pd.Series:
+    if column.empty:
+        return column
+    for candidate in (np.int8, np.int16, np.int32, np.int64):
+        dtype = np.dtype(candidate)
+        if dtype.itemsize < floor.itemsize:
+            continue
+        info = np.iinfo(dtype)
+        if column.min() >= info.min and column.max() <= info.max:
+            return column.astype(dtype) if dtype != column.dtype else column
+    return column
+
+
+def _compact_float(column: pd.Series, floor: np.dtype, nullable_integers: bool) -> pd.Series:
+    values = column.dropna()
+    if nullable_integers and column.hasnans and not values.empty and (values % 1 == 0).all():
+        integer = _downcast_integer(values.astype(np.int64), floor)
+        return column.astype(pd.api.types.pandas_dtype(integer.dtype.name.capitalize()))
+    if column.dtype == np.float64:
+        narrowed = column.astype(np.float32)
+        # Só aceita float32 se todos os valores sobreviverem à ida e volta sem perda.
+        if ((narrowed.astype(np.float64) == column) | column.isna()).all():
+            return narrowed
+    return column
+
+
+def _compact_text(column: pd.Series, category_max_ratio: Optional[float], arrow_strings: bool) -> pd.Series:
+    values = column.dropna()
+    if values.empty or not values.map(type).eq(str).all():
+        # Colunas com tipos misturados permanecem como `object`.
+        return column
+    if category_max_ratio is not None and values.nunique() <= category_max_ratio * len(values):
+        return column.astype('category')
+    if arrow_strings and ARROW_STRING_DTYPE is not None:
+        return column.astype(ARROW_STRING_DTYPE)
+    return column
@@ -0,0 +1,152 @@
+# src/plotting.py
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Propriedades por ponto que precisam acompanhar a seleção de x/y.
+_POINT_PROPERTIES = (
+    "x", "y", "text", "hovertext", "customdata", "ids",
+    "marker.color", "marker.size", "marker.symbol", "marker.opacity",
+)
+_SCATTER_TYPES = ("scatter", "scattergl")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: escolhe `threshold` pontos que preservam a
+    forma visual de uma série, mantendo sempre o primeiro e o último.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        # O terceiro vértice é a média do balde seguinte (ou o último ponto).
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        if next_end <= next_start:
+            next_x, next_y = x[n - 1], y[n - 1]
+        else:
+            next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """Mantém o mínimo e o máximo de cada um dos `threshold / 2` baldes, preservando picos."""
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    buckets = max(threshold // 2, 1)
+    bucket = np.arange(n) * buckets // n
+    order = np.lexsort((y, bucket))
+    first = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    return np.unique(np.r_[order[first], order[last], 0, n - 1])
+
+
+def grid_indices(x: np.ndarray, y: np.ndarray, bins: int, threshold: int, random_state: int = 42) -> np.ndarray:
+    """
+    Binning 2D: um ponto representativo por célula ocupada de uma grade
+    `bins` x `bins`, o que preserva o contorno da nuvem e os pontos isolados.
+    """
+    cells = _bin(x, bins) * bins + _bin(y, bins)
+    _, representatives = np.unique(cells, return_index=True)
+    if len(representatives) > threshold:
+        rng = np.random.default_rng(random_state)
+        representatives = rng.choice(representatives, threshold, replace=False)
+    return np.sort(representatives)
+
+
+def reduce_figure(fig: go.Figure, max_points: int, line_method: str = "lttb",
+                  scatter_bins: int = 100, webgl: bool = True) -> Tuple[go.Figure, Dict[str, int]]:
+    """
+    Reduz os traces de dispersão/linha com mais de `max_points` pontos antes do
+    envio ao navegador: LTTB ou mínimo/máximo para linhas e binning 2D para
+    nuvens de pontos. Traces grandes passam a usar WebGL (`scattergl`).
+
+    Os traces reduzidos são alterados no lugar, para não duplicar arrays grandes.
+
+    Returns:
+        A figura (nova, se algo mudou) e a contagem de pontos antes e depois.
+    """
+    before = after = reduced = 0
+    traces: List[Any] = []
+    for trace in fig.data:
+        n = _points(trace)
+        before += n
+        if trace.type not in _SCATTER_TYPES or n <= max_points:
+            traces.append(trace)
+            after += n
+            continue
+
+        x, y = _numeric(trace.x, n), _numeric(trace.y, n)
+        if "lines" in (trace.mode or "lines"):
+            indices = lttb_indices(x, y, max_points) if line_method == "lttb" else minmax_indices(y, max_points)
+        else:
+            indices = grid_indices(x, y, scatter_bins, max_points)
+        traces.append(_take(trace, indices, n, webgl))
+        after += len(indices)
+        reduced += 1
+
+    stats = {"points_before": before, "points_after": after, "traces_reduced": reduced}
+    if not reduced:
+        return fig, stats
+    return go.Figure(data=traces, layout=fig.layout), stats
+
+
+def _points(trace) -> int:
+    for name in ("x", "y"):
+        values = getattr(trace, name, None)
+        if values is not None:
+            return len(values)
+    return 0
+
+
+def _numeric(values: Optional[Any], n: int) -> np.ndarray:
+    """Eixo como float: datas viram números e categorias viram a posição do ponto."""
+    if values is None:
+        return np.arange(n, dtype=np.float64)
+    array = np.asarray(values)
+    if array.dtype == object and pd.api.types.infer_dtype(array[:100], skipna=True).startswith("datetime"):
+        array = pd.to_datetime(array).to_numpy()
+    if np.issubdtype(array.dtype, np.datetime64):
+        return array.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    if np.issubdtype(array.dtype, np.number) or np.issubdtype(array.dtype, np.bool_):
+        return np.nan_to_num(array.astype(np.float64))
+    converted = pd.to_numeric(pd.Series(array), errors="coerce")
+    if converted.notna().all():
+        return converted.to_numpy(np.float64)
+    return np.arange(n, dtype=np.float64)
+
+
+def _bin(values: np.ndarray, bins: int) -> np.ndarray:
+    low, high = values.min(), values.max()
+    if high <= low:
+        return np.zeros(len(values), dtype=np.int64)
+    return np.minimum(((values - low) / (high - low) * bins).astype(np.int64), bins - 1)
+
+
+def _take(trace, indices: np.ndarray, n: int, webgl: bool):
+    """Restringe o trace aos pontos escolhidos (alterando-o no lugar) e o converte para WebGL."""
+    for path in _POINT_PROPERTIES:
+        value = trace[path]
+        if value is None or isinstance(value, str) or np.ndim(value) == 0 or len(value) != n:
+            continue
+        trace[path] = np.asarray(value)[indices]
+    if not webgl or trace.type == "scattergl":
+        return trace
+    properties = trace.to_plotly_json()
+    properties.pop("type", None)
+    # Algumas propriedades de `scatter` não existem em `scattergl` (ex: preenchimento empilhado).
+    return go.Scattergl(properties, skip_invalid=True)
@@ -0,0 +1,299 @@
+# src/profiler.py
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+
+# Colunas com pelo menos esta proporção de valores distintos não têm "mais frequentes".
+NEAR_UNIQUE_RATIO = 0.9
+
+
+class HyperLogLog:
+    """Contador aproximado de valores distintos (HyperLogLog) com registradores mescláveis."""
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        if hashes.size == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # Bit de guarda garante que o posto máximo seja limitado mesmo para hash nulo.
+        rest = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        np.maximum.at(self.registers, index, _leading_zeros(rest) + 1)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = float(self.registers.size)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and zeros:
+            # Correção para cardinalidades pequenas (linear counting).
+            raw = m * np.log(m / zeros)
+        return int(round(raw))
+
+
+def _leading_zeros(values: np.ndarray) -> np.ndarray:
+    """Conta os zeros à esquerda de inteiros de 64 bits por busca binária vetorizada."""
+    count = np.zeros(values.shape, dtype=np.uint8)
+    x = values.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (x >> np.uint64(64 - shift)) == 0
+        count[empty] += shift
+        x[empty] <<= np.uint64(shift)
+    return count
+
+
+class QuantileSketch:
+    """
+    Sketch de quantis baseado em centróides ordenados (estilo t-digest simplificado).
+    Dois sketches podem ser mesclados concatenando e recomprimindo os centróides.
+    """
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+
+    def add(self, values: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        self._absorb(values.astype(np.float64, copy=False), np.ones(values.size))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.means.size:
+            self._absorb(other.means, other.weights)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.means.size == 0:
+            return None
+        cumulative = np.cumsum(self.weights)
+        midpoints = cumulative - self.weights / 2
+        return float(np.interp(q * cumulative[-1], midpoints, self.means))
+
+    def _absorb(self, means: np.ndarray, weights: np.ndarray) -> None:
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        if means.size > self.capacity:
+            # Agrupa centróides vizinhos em `capacity` faixas de mesmo peso.
+            cumulative = np.cumsum(weights)
+            bins = ((cumulative - weights / 2) / cumulative[-1] * self.capacity).astype(np.intp)
+            bins = np.minimum(bins, self.capacity - 1)
+            total = np.bincount(bins, weights=weights, minlength=self.capacity)
+            weighted = np.bincount(bins, weights=weights * means, minlength=self.capacity)
+            filled = total > 0
+            means, weights = weighted[filled] / total[filled], total[filled]
+        self.means, self.weights = means, weights
+
+
+class TopK:
+    """
+    Valores mais frequentes pelo algoritmo de Misra-Gries (contagens são limites inferiores).
+    Colunas quase únicas podem ser descartadas com `skip`: seus "mais frequentes"
+    aparecem uma vez cada e só custariam tempo.
+    """
+
+    def __init__(self, k: int = 10):
+        self.k = k
+        # Mantém mais contadores que o necessário para reduzir o erro das contagens.
+        self.capacity = 4 * k
+        self.counts = pd.Series(dtype=np.float64)
+        self.skipped = False
+
+    def add(self, values: pd.Series) -> None:
+        if not self.skipped:
+            # Cada bloco vira um resumo com no máximo `capacity` contadores antes da mescla,
+            # que assim alinha dezenas de valores em vez de todos os distintos do bloco.
+            self._absorb(self._reduce(values.value_counts(sort=False).astype(np.float64)))
+
+    def merge(self, other: "TopK") -> None:
+        if other.skipped:
+            self.skip()
+        elif not self.skipped:
+            self._absorb(other.counts)
+
+    def skip(self) -> None:
+        self.skipped = True
+        self.counts = pd.Series(dtype=np.float64)
+
+    def top(self) -> Dict[Any, int]:
+        best = self.counts.nlargest(self.k)
+        return {value: int(count) for value, count in best.items()}
+
+    def _absorb(self, counts: pd.Series) -> None:
+        if counts.empty:
+            return
+        self.counts = counts if self.counts.empty else self._reduce(self.counts.add(counts, fill_value=0))
+
+    def _reduce(self, counts: pd.Series) -> pd.Series:
+        """Passo de redução do Misra-Gries: desconta a (capacity + 1)-ésima contagem de todas."""
+        if len(counts) <= self.capacity:
+            return counts
+        largest = counts.nlargest(self.capacity + 1)
+        threshold = largest.iloc[-1]
+        return largest[largest > threshold] - threshold
+
+
+class ColumnProfile:
+    """Acumuladores mescláveis de uma coluna: nulos, extremos, momentos, distintos, quantis e frequentes."""
+
+    def __init__(self, hll_precision: int, quantile_capacity: int, top_k: int):
+        self.dtype: Optional[np.dtype] = None
+        self.count = 0
+        self.nulls = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.numeric_count = 0
+        self.distinct = HyperLogLog(hll_precision)
+        self.quantiles = QuantileSketch(quantile_capacity)
+        self.frequent = TopK(top_k)
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.dtype is not None and _is_numeric(self.dtype)
+
+    def update(self, column: pd.Series) -> None:
+        self.dtype = _combine_dtypes(self.dtype, column.dtype)
+        values = column.dropna()
+        self.nulls += len(column) - len(values)
+        self.count += len(values)
+        if values.empty:
+            return
+
+        self.distinct.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        if _is_numeric(column.dtype):
+            array = values.to_numpy(dtype=np.float64)
+            self._merge_moments(array.size, float(array.mean()), float(((array - array.mean()) ** 2).sum()))
+            self._merge_extremes(float(array.min()), float(array.max()))
+            self.quantiles.add(array)
+        if column.dtype.kind != 'f' and not self.frequent.skipped:
+            if self.count > self.frequent.capacity and self.distinct.estimate() >= NEAR_UNIQUE_RATIO * self.count:
+                self.frequent.skip()
+            else:
+                self.frequent.add(values)
+
+    def merge(self, other: "ColumnProfile") -> None:
+        if other.dtype is not None:
+            self.dtype = _combine_dtypes(self.dtype, other.dtype)
+        self.count += other.count
+        self.nulls += other.nulls
+        if other.numeric_count:
+            self._merge_moments(other.numeric_count, other.mean, other.m2)
+            self._merge_extremes(other.minimum, other.maximum)
+        self.distinct.merge(other.distinct)
+        self.quantiles.merge(other.quantiles)
+        self.frequent.merge(other.frequent)
+
+    def _merge_moments(self, n: int, mean: float, m2: float) -> None:
+        # Combinação paralela de Welford (Chan et al.).
+        total = self.numeric_count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.numeric_count * n / total
+        self.numeric_count = total
+
+    def _merge_extremes(self, minimum: float, maximum: float) -> None:
+        self.minimum = minimum if self.minimum is None else min(self.minimum, minimum)
+        self.maximum = maximum if self.maximum is None else max(self.maximum, maximum)
+
+
+def _is_numeric(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _combine_dtypes(current, new):
+    """Reproduz a inferência do pandas ao juntar blocos com tipos diferentes."""
+    if current is None or current == new:
+        return new
+    if _is_numeric(current) and _is_numeric(new):
+        return np.result_type(current, new)
+    return np.dtype(object)
+
+
+class DatasetProfile:
+    """
+    Estatísticas incrementais de todas as linhas de um dataset, alimentadas bloco a bloco
+    durante a ingestão. Perfis de partes diferentes do mesmo dataset podem ser mesclados.
+    """
+
+    def __init__(self, hll_precision: int = 12, quantile_capacity: int = 200, top_k: int = 10):
+        self.hll_precision = hll_precision
+        self.quantile_capacity = quantile_capacity
+        self.top_k = top_k
+        self.n_rows = 0
+        self.columns: Dict[str, ColumnProfile] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Atualiza os acumuladores com um bloco de linhas."""
+        self.n_rows += len(chunk)
+        for name in chunk.columns:
+            self._column(name).update(chunk[name])
+
+    def merge(self, other: "DatasetProfile") -> None:
+        """Incorpora o perfil de outra parte do mesmo dataset."""
+        self.n_rows += other.n_rows
+        for name, column in other.columns.items():
+            self._column(name).merge(column)
+
+    @property
+    def dtypes(self) -> Dict[str, str]:
+        return {name: str(column.dtype) for name, column in self.columns.items()}
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        return [name for name, column in self.columns.items() if column.is_numeric]
+
+    @property
+    def categorical_columns(self) -> List[str]:
+        return [name for name, column in self.columns.items()
+                if column.dtype is not None and (column.dtype == object or str(column.dtype) == 'category')]
+
+    def schema(self) -> pd.DataFrame:
+        """Tabela de esquema (tipo e % de nulos) calculada sobre o dataset completo."""
+        names = list(self.columns)
+        return pd.DataFrame({
+            'Coluna': names,
+            'Tipo de Dado': [str(self.columns[n].dtype) for n in names],
+            'Valores Nulos (%)': [self._null_pct(self.columns[n]) for n in names],
+        }, index=names)
+
+    def statistics(self) -> pd.DataFrame:
+        """Tabela com as estatísticas acumuladas de cada coluna."""
+        rows = []
+        for name, column in self.columns.items():
+            numeric = column.is_numeric and column.numeric_count > 0
+            std = np.sqrt(column.m2 / (column.numeric_count - 1)) if numeric and column.numeric_count > 1 else None
+            rows.append({
+                'Coluna': name,
+                'Tipo de Dado': str(column.dtype),
+                'Não Nulos': column.count,
+                'Valores Nulos (%)': self._null_pct(column),
+                'Distintos (aprox.)': column.distinct.estimate() if column.count else 0,
+                'Mínimo': column.minimum if numeric else None,
+                'Máximo': column.maximum if numeric else None,
+                'Média': column.mean if numeric else None,
+                'Desvio Padrão': std,
+                'P25': column.quantiles.quantile(0.25) if numeric else None,
+                'Mediana': column.quantiles.quantile(0.5) if numeric else None,
+                'P75': column.quantiles.quantile(0.75) if numeric else None,
+                'Mais Frequentes': ", ".join(f"{value} ({count})" for value, count in column.frequent.top().items()),
+            })
+        return pd.DataFrame(rows, index=list(self.columns))
+
+    def _null_pct(self, column: ColumnProfile) -> float:
+        return round(column.nulls * 100 / self.n_rows, 2) if self.n_rows else 0.0
+
+    def _column(self, name: str) -> ColumnProfile:
+        if name not in self.columns:
+            self.columns[name] = ColumnProfile(self.hll_precision, self.quantile_capacity, self.top_k)
+        return self.columns[name]
@@ -0,0 +1,257 @@
+# src/sandbox.py
+import atexit
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import pyarrow as pa
+
+from src.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows: sem limite de memória por processo
+    resource = None
+
+
+def execute_code(code: str, frames: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """
+    Executa o código gerado em um ambiente controlado.
+    AVISO: `exec` é poderoso e deve ser usado com cautela.
+
+    Args:
+        code: Código Python gerado pelo LLM.
+        frames: DataFrames expostos ao código, por nome (ex: {'df': df}).
+    """
+    local_scope = {}
+    global_scope = {
+        **frames,
+        'pd': pd,
+        'px': px
+    }
+
+    exec(code, global_scope, local_scope)
+
+    if 'fig' in local_scope:
+        return {"type": "plot", "content": local_scope['fig']}
+    elif 'result' in local_scope:
+        content = local_scope['result']
+        if isinstance(content, (pd.DataFrame, pd.Series)):
+            return {"type": "table", "content": content}
+        else:
+            return {"type": "text", "content": str(content)}
+    else:
+        return {"type": "text", "content": "O código foi executado, mas não produziu um resultado visível ('fig' ou 'result')."}
+
+
+def _worker_main(conn, max_memory_bytes: int) -> None:
+    """
+    Laço de um processo executor. Os datasets chegam como arquivos Arrow IPC
+    mapeados em memória, compartilhados entre processos sem serialização.
+    """
+    # Com copy-on-write, alterações feitas pelo código gerado nunca atingem o
+    # dataset compartilhado nem vazam para execuções seguintes. A opção vale só
+    # neste processo executor, não no processo da aplicação.
+    pd.set_option("mode.copy_on_write", True)
+    attached: "OrderedDict[str, Dict[str, pd.DataFrame]]" = OrderedDict()
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        key, paths, code = message
+
+        try:
+            if key not in attached:
+                attached[key] = {name: _open_frame(path) for name, path in paths.items()}
+                while len(attached) > 2:
+                    attached.popitem(last=False)
+            frames = {name: frame.copy(deep=False) for name, frame in attached[key].items()}
+            with _memory_limit(max_memory_bytes):
+                result = execute_code(code, frames)
+            if result['type'] == 'plot':
+                # Figuras trafegam como JSON do Plotly, bem mais compacto que o objeto serializado.
+                result = {"type": "plot", "content": pio.to_json(result['content'], validate=False)}
+        except MemoryError:
+            result = {"type": "error", "content": "A execução excedeu o limite de memória configurado."}
+        except Exception as e:
+            result = {"type": "error", "content": f"Erro ao executar o código: {str(e)}"}
+        conn.send(result)
+
+
+def _open_frame(path: str) -> pd.DataFrame:
+    source = pa.memory_map(path, 'r')
+    # `split_blocks` permite que colunas numéricas apontem direto para o mapeamento.
+    return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+
+
+class _memory_limit:
+    """Limita o espaço de endereçamento do processo durante uma execução (Linux/macOS)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.previous = None
+
+    def __enter__(self):
+        if resource is None or not self.max_bytes:
+            return self
+        self.previous = resource.getrlimit(resource.RLIMIT_AS)
+        limit = _virtual_memory() + self.max_bytes
+        hard = self.previous[1]
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+        return self
+
+    def __exit__(self, *exc):
+        if self.previous is not None:
+            resource.setrlimit(resource.RLIMIT_AS, self.previous)
+        return False
+
+
+def _virtual_memory() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+class _Worker:
+    def __init__(self, context, max_memory_bytes: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, max_memory_bytes), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class ExecutionPool:
+    """
+    Pool de processos pré-aquecidos para executar o código gerado fora do servidor.
+
+    Cada dataset é publicado uma única vez como arquivo Arrow IPC (em /dev/shm,
+    quando disponível) e mapeado em memória pelos workers. Cada execução tem
+    tempo máximo e limite de memória; estouros voltam como `{"type": "error"}`
+    e o worker afetado é substituído.
+    """
+
+    def __init__(self, workers: int, timeout_seconds: float, max_memory_mb: int, max_datasets: int = 4):
+        self.timeout_seconds = timeout_seconds
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.max_datasets = max_datasets
+        self._context = multiprocessing.get_context("spawn")
+        shm = "/dev/shm"
+        self._directory = tempfile.mkdtemp(prefix="eda-datasets-", dir=shm if os.path.isdir(shm) else None)
+        self._published: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers = [self._spawn() for _ in range(workers)]
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    def run(self, key: str, frames: Dict[str, pd.DataFrame], code: str) -> Dict[str, Any]:
+        """Executa `code` em um worker livre e devolve o resultado estruturado."""
+        paths = self.publish(key, frames)
+        worker = self._idle.get()
+        try:
+            worker.conn.send((key, paths, code))
+            if not worker.conn.poll(self.timeout_seconds):
+                worker = self._replace(worker)
+                return {"type": "error",
+                        "content": f"A execução excedeu o tempo limite de {self.timeout_seconds}s."}
+            result = worker.conn.recv()
+        except (EOFError, OSError):
+            worker = self._replace(worker)
+            return {"type": "error", "content": "O processo de execução foi encerrado inesperadamente."}
+        finally:
+            self._idle.put(worker)
+
+        if result['type'] == 'plot':
+            result['content'] = pio.from_json(result['content'], skip_invalid=True)
+        return result
+
+    def publish(self, key: str, frames: Dict[str, pd.DataFrame]) -> Dict[str, str]:
+        """Grava os DataFrames de um dataset para os workers, uma única vez por chave."""
+        with self._lock:
+            if key in self._published:
+                self._published.move_to_end(key)
+                return self._published[key]
+            paths = {}
+            for index, (name, frame) in enumerate(frames.items()):
+                path = os.path.join(self._directory, f"{key}-{index}.arrow")
+                table = pa.Table.from_pandas(frame, preserve_index=True)
+                with pa.OSFile(path, 'wb') as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                paths[name] = path
+            self._published[key] = paths
+            while len(self._published) > self.max_datasets:
+                # Workers que ainda mapeiam o arquivo mantêm o conteúdo até liberá-lo.
+                _, stale = self._published.popitem(last=False)
+                for path in stale.values():
+                    os.remove(path)
+            return paths
+
+    def close(self) -> None:
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.stop()
+        with self._lock:
+            for paths in self._published.values():
+                for path in paths.values():
+                    os.remove(path)
+            self._published.clear()
+        try:
+            os.rmdir(self._directory)
+        except OSError:
+            pass
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._context, self.max_memory_bytes)
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.stop()
+        replacement = self._spawn()
+        with self._lock:
+            self._workers[self._workers.index(worker)] = replacement
+        return replacement
+
+
+_pool: Optional[ExecutionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_execution_pool() -> ExecutionPool:
+    """Pool compartilhado por todas as sessões do processo, criado sob demanda."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            options = settings['execution']
+            _pool = ExecutionPool(
+                workers=options['workers'],
+                timeout_seconds=options['timeout_seconds'],
+                max_memory_mb=options['max_memory_mb'],
+            )
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,200 @@
+# src/store.py
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.cache import CachedDataset, DatasetCache
+from src.config import settings
+
+
+def dataset_bytes(dataset: CachedDataset) -> int:
+    """Memória ocupada pelos DataFrames de um dataset (incluindo o conteúdo das strings)."""
+    frames = [dataset.df, *dataset.tables.values()]
+    return int(sum(frame.memory_usage(index=True, deep=True).sum() for frame in frames))
+
+
+class _Entry:
+    def __init__(self, dataset: CachedDataset, size: int):
+        self.dataset = dataset
+        self.size = size
+        self.refs = 0
+        self.last_used = time.time()
+
+
+class DatasetRegistry:
+    """
+    Registro de datasets compartilhado por todas as sessões do processo,
+    endereçado pela mesma chave de conteúdo do cache em disco.
+
+    Sessões que carregam o mesmo arquivo recebem cópias rasas dos mesmos
+    DataFrames. Os arrays NumPy residentes ficam somente leitura: uma escrita
+    no lugar falha em vez de atingir as demais sessões, e a sessão que vai
+    alterar os dados faz antes a própria cópia (ver `EDAAgentPro._execute_code`).
+    Cada sessão mantém uma referência enquanto usa o dataset. Quando a memória residente
+    passa de `max_bytes`, os datasets sem referências são descartados do menos
+    para o mais recentemente usado, indo antes para o cache em disco se
+    `spill` estiver configurado.
+    """
+
+    def __init__(self, max_bytes: int, spill: Optional[DatasetCache] = None):
+        self.max_bytes = max_bytes
+        self.spill = spill
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, loader: Callable[[], CachedDataset]) -> Tuple[CachedDataset, bool]:
+        """
+        Obtém o dataset `key`, carregando-o com `loader` se ele não estiver residente.
+        Cargas simultâneas da mesma chave executam `loader` uma única vez.
+
+        Returns:
+            Uma cópia rasa do dataset e se ele já estava em memória.
+            A referência deve ser devolvida com `release(key)`.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refs += 1
+                    entry.last_used = time.time()
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._share(entry.dataset), True
+                pending = self._loading.get(key)
+                if pending is None:
+                    pending = self._loading[key] = Future()
+                    break
+            # Outra sessão está carregando o mesmo arquivo: espera e tenta de novo.
+            try:
+                pending.result()
+            except Exception:
+                pass
+
+        try:
+            dataset = loader()
+            for frame in (dataset.df, *dataset.tables.values()):
+                _freeze(frame)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            pending.set_exception(e)
+            raise
+
+        entry = _Entry(dataset, dataset_bytes(dataset))
+        entry.refs = 1
+        with self._lock:
+            self._entries[key] = entry
+            del self._loading[key]
+            self.loads += 1
+            evicted = self._evict()
+        pending.set_result(None)
+        self._spill(evicted)
+        return self._share(dataset), False
+
+    def release(self, key: str) -> None:
+        """Devolve uma referência obtida com `acquire`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refs == 0:
+                return
+            entry.refs -= 1
+            evicted = self._evict()
+        self._spill(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Ocupação total e contadores de reutilização, para a visão administrativa."""
+        with self._lock:
+            resident = sum(entry.size for entry in self._entries.values())
+            return {
+                "datasets": len(self._entries),
+                "bytes": resident,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+    def resident(self) -> List[Dict[str, Any]]:
+        """Datasets em memória, do mais para o menos recentemente usado."""
+        with self._lock:
+            return [
+                {
+                    "Arquivo": entry.dataset.filename,
+                    "Chave": key[:12],
+                    "Linhas": len(entry.dataset.df),
+                    "Tamanho (MB)": round(entry.size / 1024 ** 2, 2),
+                    "Sessões": entry.refs,
+                    "Último uso": time.strftime("%H:%M:%S", time.localtime(entry.last_used)),
+                }
+                for key, entry in reversed(self._entries.items())
+            ]
+
+    @staticmethod
+    def _share(dataset: CachedDataset) -> CachedDataset:
+        return replace(
+            dataset,
+            df=dataset.df.copy(deep=False),
+            tables={name: frame.copy(deep=False) for name, frame in dataset.tables.items()},
+        )
+
+    def _evict(self) -> List[Tuple[str, CachedDataset]]:
+        """Remove datasets sem referências até caber no orçamento. Chamado com o lock adquirido."""
+        total = sum(entry.size for entry in self._entries.values())
+        evicted = []
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.refs:
+                continue
+            del self._entries[key]
+            total -= entry.size
+            self.evictions += 1
+            evicted.append((key, entry.dataset))
+        return evicted
+
+    def _spill(self, evicted: List[Tuple[str, CachedDataset]]) -> None:
+        # Tabelas nomeadas não cabem em uma entrada do cache em disco; são apenas descartadas.
+        if self.spill is None:
+            return
+        for key, dataset in evicted:
+            if not dataset.tables and not self.spill.contains(key):
+                self.spill.put(key, dataset, parse_seconds=0.0)
+
+
+def _freeze(frame: pd.DataFrame) -> None:
+    """Marca como somente leitura os blocos NumPy de `frame`, que as cópias rasas compartilham."""
+    for block in frame._mgr.blocks:
+        if isinstance(block.values, np.ndarray):
+            block.values.flags.writeable = False
+
+
+_registry: Optional[DatasetRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_dataset_registry() -> DatasetRegistry:
+    """Registro compartilhado por todas as sessões do processo, criado sob demanda."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            options = settings['store']
+            spill = None
+            if options['spill_to_disk']:
+                spill = DatasetCache(
+                    settings['cache']['dir'],
+                    max_bytes=settings['cache']['max_size_mb'] * 1024 * 1024,
+                    enabled=settings['cache']['enabled'],
+                )
+            _registry = DatasetRegistry(options['max_memory_mb'] * 1024 * 1024, spill)
+        return _registry
@@ -0,0 +1,302 @@
+# src/telemetry.py
+import atexit
+import contextvars
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+
+from src.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Campos de um span que também viram contadores no Prometheus.
+_COUNTED_FIELDS = ("rows", "bytes", "prompt_tokens", "response_tokens")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("eda_span", default=None)
+
+
+def rss_bytes() -> int:
+    """Memória residente atual do processo (0 se não for possível medir)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+def peak_rss_bytes() -> int:
+    """Maior memória residente já atingida pelo processo."""
+    if resource is None:
+        return 0
+    # ru_maxrss vem em KB no Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _NoopSpan:
+    """Span usado com a telemetria desativada: não mede nem grava nada."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def set(self, **fields: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """
+    Uma etapa medida do pipeline. Mede duração, memória residente e, com
+    `trace_allocations`, o pico de alocações Python; outros campos (linhas,
+    bytes, tokens, acertos de cache) são adicionados com `set`.
+    """
+
+    def __init__(self, telemetry: "Telemetry", name: str, fields: Dict[str, Any]):
+        self.telemetry = telemetry
+        self.name = name
+        self.fields = fields
+        self.parent: Optional["Span"] = None
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = self.span_id
+        self._allocated_peak = 0
+
+    def set(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+    def __enter__(self) -> "Span":
+        self.parent = _current_span.get()
+        if self.parent is not None:
+            self.trace_id = self.parent.trace_id
+        _current_span.set(self)
+        if self.telemetry.trace_allocations:
+            # O pico é zerado por etapa; o pai herda o pico dos filhos ao final deles.
+            if self.parent is not None:
+                self.parent._allocated_peak = max(self.parent._allocated_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._allocated_start = tracemalloc.get_traced_memory()[0]
+        self._rss_start = rss_bytes()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        seconds = time.perf_counter() - self._start
+        _current_span.set(self.parent)
+        rss = rss_bytes()
+        record = {
+            "span": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "seconds": round(seconds, 6),
+            "rss_bytes": rss,
+            "rss_delta_bytes": rss - self._rss_start,
+            "rss_peak_bytes": peak_rss_bytes(),
+            **self.fields,
+        }
+        if self.telemetry.trace_allocations:
+            peak = max(self._allocated_peak, tracemalloc.get_traced_memory()[1])
+            record["allocated_peak_bytes"] = peak - self._allocated_start
+            if self.parent is not None:
+                self.parent._allocated_peak = max(self.parent._allocated_peak, peak)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        self.telemetry._record(record)
+        return False
+
+
+class Telemetry:
+    """
+    Instrumentação do pipeline (carga, prompt, chamada ao Gemini, execução).
+
+    Cada etapa é um span gravado pelo structlog como uma linha JSON em `log_path`,
+    com `trace_id`/`parent_id` para reconstruir o encadeamento. Durações, linhas,
+    bytes, tokens e acertos de cache também são agregados em métricas no formato
+    de exposição do Prometheus, regravadas em `metrics_path` no máximo a cada
+    `flush_seconds` e, opcionalmente, servidas em `http://127.0.0.1:<port>/metrics`.
+    Desativada, `span` devolve um objeto vazio e o custo é o de uma chamada.
+    """
+
+    def __init__(self, enabled: bool = False, log_path: Optional[str] = None, metrics_path: Optional[str] = None,
+                 flush_seconds: float = 5.0, trace_allocations: bool = False):
+        self.enabled = enabled
+        self.trace_allocations = enabled and trace_allocations
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.flush_seconds = flush_seconds
+        self._durations: Dict[str, list] = defaultdict(lambda: [0, 0.0, 0.0])  # contagem, soma, máximo
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._log_file = None
+        self._logger = None
+        if not enabled:
+            return
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if log_path:
+            Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+            self._log_file = open(log_path, "a", encoding="utf-8")
+            self._logger = structlog.wrap_logger(
+                structlog.PrintLogger(self._log_file),
+                processors=[
+                    structlog.processors.add_log_level,
+                    structlog.processors.TimeStamper(fmt="iso", utc=True),
+                    structlog.processors.JSONRenderer(default=str),
+                ],
+            )
+        atexit.register(self.close)
+
+    def span(self, name: str, **fields: Any):
+        """Context manager que mede uma etapa: `with telemetry.span("etapa", rows=n) as span: ...`."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, fields)
+
+    def count(self, metric: str, value: float = 1, **labels: Any) -> None:
+        """Incrementa um contador avulso (ex: acertos de cache fora de um span)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(metric, tuple(sorted((k, str(v)) for k, v in labels.items())))] += value
+
+    def render_metrics(self) -> str:
+        """Métricas acumuladas no formato de exposição de texto do Prometheus."""
+        lines = [
+            "# HELP eda_span_seconds Duração das etapas do pipeline.",
+            "# TYPE eda_span_seconds summary",
+        ]
+        with self._lock:
+            durations = {name: list(values) for name, values in self._durations.items()}
+            counters = dict(self._counters)
+            errors = dict(self._errors)
+        for name, (count, total, _) in sorted(durations.items()):
+            lines.append(f'eda_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'eda_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines += ["# HELP eda_span_seconds_max Maior duração observada por etapa.", "# TYPE eda_span_seconds_max gauge"]
+        lines += [f'eda_span_seconds_max{{span="{name}"}} {values[2]:.6f}' for name, values in sorted(durations.items())]
+        lines += ["# HELP eda_span_errors_total Etapas encerradas com exceção.", "# TYPE eda_span_errors_total counter"]
+        lines += [f'eda_span_errors_total{{span="{name}"}} {count}' for name, count in sorted(errors.items())]
+
+        declared = set()
+        for (metric, labels), value in sorted(counters.items()):
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels)
+            lines.append(f"{metric}{{{label_text}}} {value:g}")
+
+        lines += ["# HELP eda_process_rss_peak_bytes Pico de memória residente do processo.",
+                  "# TYPE eda_process_rss_peak_bytes gauge",
+                  f"eda_process_rss_peak_bytes {peak_rss_bytes()}"]
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        """Regrava o arquivo de métricas (de forma atômica, para o coletor nunca ler um arquivo parcial)."""
+        if not self.enabled or self.metrics_path is None:
+            return
+        self._last_flush = time.monotonic()
+        self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp = tempfile.mkstemp(dir=self.metrics_path.parent, suffix=".tmp")
+        with os.fdopen(handle, "w", encoding="utf-8") as f:
+            f.write(self.render_metrics())
+        os.replace(temp, self.metrics_path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """Serve as métricas em `/metrics` numa thread de fundo. Retorna a porta usada."""
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.render_metrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="eda-metrics", daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self) -> None:
+        self.flush()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file, self._logger = None, None
+
+    def _record(self, record: Dict[str, Any]) -> None:
+        name = record["span"]
+        with self._lock:
+            stats = self._durations[name]
+            stats[0] += 1
+            stats[1] += record["seconds"]
+            stats[2] = max(stats[2], record["seconds"])
+            if "error" in record:
+                self._errors[name] += 1
+            for field in _COUNTED_FIELDS:
+                value = record.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._counters[(f"eda_{field}_total", (("span", name),))] += value
+            cache = record.get("cache")
+            if cache is not None and "cache_hit" in record:
+                outcome = "hit" if record["cache_hit"] else "miss"
+                self._counters[("eda_cache_requests_total", (("cache", str(cache)), ("result", outcome)))] += 1
+        if self._logger is not None:
+            self._logger.info(name, **{key: value for key, value in record.items() if key != "span"})
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """Telemetria do processo, criada sob demanda a partir de `settings['telemetry']`."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            options = settings['telemetry']
+            _telemetry = Telemetry(
+                enabled=options['enabled'],
+                log_path=options['log_path'],
+                metrics_path=options['metrics_path'],
+                flush_seconds=options['metrics_flush_seconds'],
+                trace_allocations=options['trace_allocations'],
+            )
+            if _telemetry.enabled and options['metrics_port']:
+                _telemetry.serve(options['metrics_port'])
+        return _telemetry
@@ -1,10 +1,75 @@
 # src/utils.py
 import io
+import keyword
+import posixpath
+import re
 import zipfile
 import pandas as pd
-from typing import Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-def handle_zip_file(file_content: bytes) -> Optional[Tuple[str, pd.DataFrame]]:
+from src.dialect import read_with_fallback, sniff_source
+
+# Nomes já usados no escopo de execução do código gerado.
+_RESERVED_NAMES = {'df', 'pd', 'px', 'fig', 'result'}
+Buffer = Union[bytes, memoryview]
+
+
+class MemoryviewReader(io.RawIOBase):
+    """
+    Arquivo binário somente leitura e navegável sobre um buffer existente.
+    Diferente de `io.BytesIO(memoryview)`, não copia o conteúdo.
+    """
+
+    def __init__(self, buffer: Buffer):
+        super().__init__()
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(self._position + size, len(self._view))
+        data = self._view[self._position:end].tobytes()
+        self._position = max(end, self._position)
+        return data
+
+    def readinto(self, b) -> int:
+        n = max(min(len(b), len(self._view) - self._position), 0)
+        b[:n] = self._view[self._position:self._position + n]
+        self._position += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        if base + offset < 0:
+            raise ValueError("Posição negativa.")
+        self._position = base + offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+def upload_buffer(uploaded_file) -> memoryview:
+    """
+    Conteúdo de um upload do Streamlit sem cópia: `UploadedFile` é um `BytesIO`,
+    e `getbuffer()` expõe seus bytes diretamente. Outros objetos usam `getvalue()`.
+    """
+    getbuffer = getattr(uploaded_file, 'getbuffer', None)
+    view = getbuffer() if callable(getbuffer) else None
+    if not isinstance(view, memoryview):
+        view = memoryview(uploaded_file.getvalue())
+    return view
+
+def handle_zip_file(
+    file_content: Buffer,
+    reader: Callable[..., Any] = pd.read_csv,
+    sniff_bytes: int = 65536,
+) -> Optional[Tuple[str, Any]]:
     """
     Processa um arquivo ZIP em memória de forma segura.
 
@@ -12,27 +77,61 @@ def handle_zip_file(file_content: bytes) -> Optional[Tuple[str, pd.DataFrame]]:
     para mitigar riscos de segurança como "Path Traversal".
 
     Args:
-        file_content: O conteúdo do arquivo ZIP em bytes.
+        file_content: O conteúdo do arquivo ZIP (bytes ou memoryview, sem cópia).
+        reader: Função que recebe o arquivo CSV aberto (e os argumentos do dialeto
+            detectado, como `encoding` e `sep`) e devolve os dados lidos. Por padrão, `pd.read_csv`.
+        sniff_bytes: Tamanho do prefixo usado para detectar o dialeto do CSV.
 
     Returns:
-        Uma tupla contendo o nome do arquivo CSV e o DataFrame, ou None se nenhum CSV for encontrado.
+        Uma tupla contendo o nome do arquivo CSV e o resultado do `reader`,
+        ou None se nenhum CSV for encontrado.
     """
     try:
-        with zipfile.ZipFile(io.BytesIO(file_content)) as z:
+        with zipfile.ZipFile(MemoryviewReader(file_content)) as z:
             # Encontra o primeiro arquivo .csv na lista de arquivos do ZIP
             csv_filename = next((name for name in z.namelist() if name.lower().endswith('.csv')), None)
             
             if csv_filename:
+                # O dialeto (encoding, delimitador...) vem de um prefixo do membro,
+                # e o arquivo é lido uma única vez.
                 with z.open(csv_filename) as csv_file:
-                    # Tenta ler com diferentes encodings comuns
-                    try:
-                        df = pd.read_csv(csv_file)
-                        return csv_filename, df
-                    except UnicodeDecodeError:
-                        # Volta ao início do arquivo para tentar outro encoding
-                        z.open(csv_filename).seek(0)
-                        df = pd.read_csv(z.open(csv_filename), encoding='latin1')
-                        return csv_filename, df
+                    dialect = sniff_source(csv_file, sniff_bytes)
+                    return csv_filename, read_with_fallback(csv_file, dialect,
+                                                            lambda read_kwargs: reader(csv_file, **read_kwargs))
     except zipfile.BadZipFile:
         return None
-    return None
\ No newline at end of file
+    return None
+
+
+def csv_member_sizes(file_content: Buffer) -> Dict[str, int]:
+    """
+    Tamanho descompactado de cada .csv de um ZIP, lido do diretório central
+    (nada é descompactado). Vazio se o ZIP for inválido.
+    """
+    try:
+        with zipfile.ZipFile(MemoryviewReader(file_content)) as z:
+            return {info.filename: info.file_size for info in z.infolist()
+                    if not info.is_dir() and info.filename.lower().endswith('.csv')}
+    except zipfile.BadZipFile:
+        return {}
+
+
+def table_names(members: List[str]) -> Dict[str, str]:
+    """
+    Gera, para cada membro do ZIP, um identificador Python válido e único
+    (ex: 'dados/vendas-2024-01.csv' -> 'vendas_2024_01') para expor a tabela
+    no escopo de execução.
+    """
+    names: Dict[str, str] = {}
+    taken = set(_RESERVED_NAMES)
+    for member in members:
+        stem = posixpath.splitext(posixpath.basename(member))[0]
+        base = re.sub(r'\W', '_', stem).strip('_') or 'tabela'
+        if base[0].isdigit() or keyword.iskeyword(base) or base in _RESERVED_NAMES:
+            base = f"t_{base}"
+        name, suffix = base, 2
+        while name in taken:
+            name, suffix = f"{base}_{suffix}", suffix + 1
+        taken.add(name)
+        names[member] = name
+    return names
@@ -1,9 +1,15 @@
 # tests/conftest.py
 # Arquivo de configuração para o pytest, onde definimos os fixtures.
 
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict
+
 import pytest
 import pandas as pd
 from src.agent import EDAAgentPro
+from src.config import settings
 
 @pytest.fixture
 def sample_csv_content() -> str:
@@ -14,9 +20,71 @@ def sample_csv_content() -> str:
     return "ID,Nome,Idade,Cidade,Salario\n1,Ana,28,Recife,5000\n2,Bruno,35,Salvador,8000\n3,Carla,22,Recife,3500\n4,Daniel,45,Salvador,12000"
 
 @pytest.fixture
-def agent_instance() -> EDAAgentPro:
+def agent_instance(tmp_path, monkeypatch) -> EDAAgentPro:
     """
     Retorna uma instância limpa do EDAAgentPro.
     Usa uma chave de API falsa, pois as chamadas reais à API serão mockadas nos testes.
+    Os caches em disco apontam para um diretório temporário, isolado por teste.
+    """
+    monkeypatch.setitem(settings['cache'], 'dir', str(tmp_path / "datasets"))
+    monkeypatch.setitem(settings['llm_cache'], 'path', str(tmp_path / "answers.sqlite"))
+    monkeypatch.setitem(settings['history'], 'dir', str(tmp_path / "history"))
+    # O registro de datasets é global ao processo; os testes que o usam criam o próprio.
+    monkeypatch.setitem(settings['store'], 'enabled', False)
+    return EDAAgentPro(api_key="fake-api-key-for-testing")
+
+class StubGenerativeModel:
+    """
+    Substituto local de `genai.GenerativeModel` para testes sem rede.
+    Responde com o código associado à pergunta (última linha do prompt),
+    simulando latência e registrando a concorrência observada.
+    """
+
+    def __init__(self, answers: Dict[str, str], latency: float = 0.0):
+        self.answers = answers
+        self.latency = latency
+        self.calls = 0
+        self.chunks_sent = 0
+        self.max_active = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, generation_config=None, stream: bool = False, **kwargs):
+        response = self._respond(prompt)
+        if stream:
+            return StubStream(self, prompt, response.text)
+        return response
+
+    def _respond(self, prompt: str):
+        question = prompt.strip().splitlines()[-1].strip()
+        with self._lock:
+            self.calls += 1
+            self._active += 1
+            self.max_active = max(self.max_active, self._active)
+        time.sleep(self.latency)
+        with self._lock:
+            self._active -= 1
+        code = self.answers.get(question, "result = 'sem resposta'")
+        return SimpleNamespace(text=f"Aqui está:\n```python\n{code}\n```\nEspero que isso ajude na análise.")
+
+class StubStream:
     """
-    return EDAAgentPro(api_key="fake-api-key-for-testing")
\ No newline at end of file
+    Resposta em streaming: entrega o texto em pedaços pequenos e, como na API,
+    o uso de tokens só fica completo depois do último pedaço.
+    """
+
+    def __init__(self, model: StubGenerativeModel, prompt: str, text: str):
+        self.model = model
+        self.text = text
+        self.usage_metadata = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=0)
+
+    def __iter__(self):
+        for start in range(0, len(self.text), 8):
+            self.model.chunks_sent += 1
+            self.usage_metadata.candidates_token_count = (start + 8) // 4
+            yield SimpleNamespace(text=self.text[start:start + 8])
+
+@pytest.fixture
+def stub_model_factory():
+    """Fábrica de modelos stub, para substituir `agent.model` nos testes."""
+    return StubGenerativeModel
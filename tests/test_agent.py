@@ -1,9 +1,14 @@
 # tests/test_agent.py
 # Suíte de testes para o núcleo lógico do agente (EDAAgentPro).
 
+import io
+import zipfile
 import pandas as pd
+import pytest
 from unittest.mock import MagicMock, patch
 
+from src.config import settings
+
 # Os fixtures `agent_instance` e `sample_csv_content` são injetados a partir do conftest.py
 
 def test_load_csv_file(agent_instance, sample_csv_content):
@@ -83,4 +88,682 @@ def test_answer_query_with_gemini_mock(mock_generate_content, agent_instance, sa
     # O agente deve ter executado `df['Idade'].mean()` e retornado o valor.
     # Média de (28, 35, 22, 45) é 32.5.
     assert response['type'] == 'text'
-    assert response['content'] == "32.5"
\ No newline at end of file
+    assert response['content'] == "32.5"
+
+def _mock_upload(name: str, content: bytes) -> MagicMock:
+    mock_file = MagicMock()
+    mock_file.name = name
+    mock_file.getvalue.return_value = content
+    return mock_file
+
+def test_load_large_csv_uses_streaming_reservoir_sample(agent_instance):
+    """
+    Arquivos acima do limite são lidos em blocos e amostrados por reservatório,
+    preservando o formato original exato e a reprodutibilidade da amostra.
+    """
+    rows = "\n".join(f"{i},{i % 7},cat{i % 3}" for i in range(1000))
+    content = f"id,valor,grupo\n{rows}".encode('utf-8')
+    limits = {'sampling_threshold_rows': 100, 'sampling_rows': 50, 'chunk_rows': 64}
+
+    with patch.dict('src.agent.settings', {'file_limits': {**settings['file_limits'], **limits}}):
+        success, _ = agent_instance.load_file(_mock_upload("big.csv", content))
+        first_sample = agent_instance.df['id'].tolist()
+        agent_instance.load_file(_mock_upload("big.csv", content))
+
+    assert success is True
+    assert agent_instance.is_sampled is True
+    assert agent_instance.original_shape == (1000, 3)
+    assert agent_instance.df.shape == (50, 3)
+    assert agent_instance.df['id'].is_unique
+    assert agent_instance.df['id'].tolist() == first_sample
+
+def test_load_zip_file_with_sampling(agent_instance):
+    """O caminho ZIP usa a mesma ingestão em streaming do CSV."""
+    rows = "\n".join(f"{i},{i * 2}" for i in range(300))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as z:
+        z.writestr("dados/vendas.csv", f"a,b\n{rows}")
+    limits = {'sampling_threshold_rows': 100, 'sampling_rows': 20, 'chunk_rows': 32}
+
+    with patch.dict('src.agent.settings', {'file_limits': {**settings['file_limits'], **limits}}):
+        success, message = agent_instance.load_file(_mock_upload("export.zip", buffer.getvalue()))
+
+    assert success is True, message
+    assert agent_instance.filename == "dados/vendas.csv"
+    assert agent_instance.original_shape == (300, 2)
+    assert agent_instance.is_sampled is True
+    assert len(agent_instance.df) == 20
+
+def test_pre_analysis_reports_full_data_statistics(agent_instance):
+    """
+    Com amostragem ativa, o esquema e as estatísticas da pré-análise refletem
+    todas as linhas do arquivo, e não apenas a amostra.
+    """
+    rows = "\n".join(f"{i},{'' if i % 10 == 0 else i % 5},cat{i % 4}" for i in range(1000))
+    content = f"id,nota,grupo\n{rows}".encode('utf-8')
+    limits = {'sampling_threshold_rows': 100, 'sampling_rows': 50, 'chunk_rows': 64}
+
+    with patch.dict('src.agent.settings', {'file_limits': {**settings['file_limits'], **limits}}):
+        agent_instance.load_file(_mock_upload("big.csv", content))
+    result = agent_instance.pre_analysis()
+
+    schema = result['schema']
+    assert schema.loc['nota', 'Valores Nulos (%)'] == 10.0
+    assert schema.loc['nota', 'Tipo de Dado'] == 'float64'
+
+    stats = result['statistics']
+    assert stats.loc['id', 'Não Nulos'] == 1000
+    assert stats.loc['id', 'Média'] == 499.5
+    assert stats.loc['id', 'Mínimo'] == 0 and stats.loc['id', 'Máximo'] == 999
+    assert abs(stats.loc['id', 'Desvio Padrão'] - pd.Series(range(1000)).std()) < 1e-9
+    assert abs(stats.loc['id', 'Mediana'] - 499.5) < 10
+    assert abs(stats.loc['id', 'Distintos (aprox.)'] - 1000) < 50
+    assert stats.loc['grupo', 'Distintos (aprox.)'] == 4
+    assert stats.loc['grupo', 'Mais Frequentes'] == "cat0 (250), cat1 (250), cat2 (250), cat3 (250)"
+    # Coluna quase única: os "mais frequentes" deixam de ser calculados.
+    assert stats.loc['id', 'Mais Frequentes'] == ""
+    assert result['categorical_columns'] == ['grupo']
+
+def test_profile_keeps_heavy_hitters_among_many_distinct_values():
+    """Cada bloco é resumido antes da mescla, e os valores frequentes sobrevivem a milhares de raros."""
+    from src.profiler import DatasetProfile
+
+    profile = DatasetProfile(top_k=3)
+    for start in range(0, 20_000, 5_000):
+        ids = range(start, start + 5_000)
+        profile.update(pd.DataFrame({'codigo': ["comum" if i % 4 == 0 else f"raro{i}" for i in ids]}))
+
+    frequent = profile.columns['codigo'].frequent
+    assert not frequent.skipped
+    assert len(frequent.counts) <= frequent.capacity
+    top = frequent.top()
+    assert next(iter(top)) == "comum"
+    assert 4_000 <= top["comum"] <= 5_000
+
+def test_reupload_hits_dataset_cache(agent_instance, sample_csv_content):
+    """
+    Um segundo upload com o mesmo conteúdo é servido pelo cache em disco,
+    sem novo parse, preservando dados, metadados e perfil.
+    """
+    content = sample_csv_content.encode('utf-8')
+    agent_instance.load_file(_mock_upload("test.csv", content))
+    first_df = agent_instance.df
+
+    with patch.object(agent_instance, '_read_csv') as mock_read:
+        success, _ = agent_instance.load_file(_mock_upload("copia.csv", content))
+        mock_read.assert_not_called()
+
+    assert success is True
+    assert agent_instance.filename == "copia.csv"
+    pd.testing.assert_frame_equal(agent_instance.df, first_df)
+    assert agent_instance.original_shape == (4, 5)
+    assert agent_instance.profile.n_rows == 4
+    stats = agent_instance.dataset_cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['entries'] == 1
+
+def test_memory_optimization_keeps_generated_code_working(agent_instance, sample_csv_content):
+    """
+    Com a compactação ativa, os tipos ficam menores, o relatório de bytes é
+    produzido e o código gerado continua devolvendo os mesmos resultados.
+    """
+    options = {**settings['memory_optimization'], 'enabled': True}
+
+    with patch.dict('src.agent.settings', {'memory_optimization': options}):
+        agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+
+    assert agent_instance.df['Cidade'].dtype != 'category'
+    assert agent_instance.df['Idade'].dtype == 'int32'
+    report = agent_instance.memory_report
+    assert report['bytes_after'] < report['bytes_before']
+
+    # Código no estilo do LLM, sem `observed=`: um filtro não deixa grupos vazios no resultado.
+    response = agent_instance._execute_code(
+        "result = df[df['Salario'] > 9000].groupby('Cidade')['Salario'].sum()")
+    assert response['type'] == 'table'
+    assert response['content'].to_dict() == {'Salvador': 12000}
+    counts = agent_instance._execute_code("result = df[df['Cidade'] == 'Recife']['Cidade'].value_counts()")
+    assert counts['content'].to_dict() == {'Recife': 2}
+
+def test_memory_optimization_converts_text_to_category_only_when_enabled(agent_instance, sample_csv_content):
+    """`categories` é opcional: reduz mais a memória, mas o groupby passa a listar categorias vazias."""
+    options = {**settings['memory_optimization'], 'enabled': True, 'categories': True}
+
+    with patch.dict('src.agent.settings', {'memory_optimization': options}):
+        agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+
+    assert agent_instance.df['Cidade'].dtype == 'category'
+    response = agent_instance._execute_code("result = df.groupby('Cidade', observed=True)['Salario'].sum()")
+    assert response['content'].to_dict() == {'Recife': 8500, 'Salvador': 20000}
+
+@patch('google.generativeai.GenerativeModel.generate_content')
+def test_repeated_question_reuses_cached_code(mock_generate_content, agent_instance, sample_csv_content):
+    """
+    A mesma pergunta (a menos de caixa, espaços e pontuação final) sobre o mesmo
+    dataset não gera uma nova chamada à API; o código em cache é reexecutado.
+    """
+    mock_response = MagicMock()
+    mock_response.text = "```python\nresult = df['Salario'].max()\n```"
+    mock_generate_content.return_value = mock_response
+    agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+
+    first = agent_instance.answer_query("Qual o maior salário?")
+    second = agent_instance.answer_query("  qual o MAIOR salário ")
+
+    mock_generate_content.assert_called_once()
+    assert first == second == {"type": "text", "content": "12000"}
+    stats = agent_instance.answer_cache.stats()
+    assert stats['memory_hits'] == 1 and stats['misses'] == 1
+
+def test_code_that_fails_is_not_cached(agent_instance, sample_csv_content, stub_model_factory):
+    """O código só entra no cache depois de executar sem erro; a próxima pergunta igual chama o modelo de novo."""
+    agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+    question = "Qual o maior bônus?"
+    agent_instance.model = stub_model_factory({question: "result = df['Bonus'].max()"})
+
+    assert agent_instance.answer_query(question)['type'] == 'error'
+    assert agent_instance.answer_query(question)['type'] == 'error'
+    assert agent_instance.model.calls == 2
+
+    agent_instance.model.answers[question] = "result = df['Salario'].max()"
+    assert agent_instance.answer_query(question)['content'] == "12000"
+    assert agent_instance.answer_query(question)['content'] == "12000"
+    assert agent_instance.model.calls == 3
+
+def test_answer_queries_batch_overlaps_calls_and_keeps_order(agent_instance, sample_csv_content, stub_model_factory):
+    """
+    O lote sobrepõe as chamadas ao modelo (com concorrência limitada) e devolve
+    os resultados na ordem das perguntas.
+    """
+    questions = [f"Pergunta {i}" for i in range(6)]
+    answers = {q: f"result = df['Idade'].iloc[{i % 4}]" for i, q in enumerate(questions)}
+    agent_instance.model = stub_model_factory(answers, latency=0.05)
+    agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+    batch = {'max_concurrency': 3, 'requests_per_minute': 6000, 'burst': 6}
+
+    with patch.dict('src.agent.settings', {'batch': batch}):
+        results = agent_instance.answer_queries(questions)
+
+    ages = ["28", "35", "22", "45"]
+    assert [r['content'] for r in results] == [ages[i % 4] for i in range(6)]
+    assert agent_instance.model.calls == 6
+    assert 1 < agent_instance.model.max_active <= 3
+
+def test_answer_query_stream_executes_as_soon_as_code_block_closes(agent_instance, sample_csv_content, stub_model_factory):
+    """
+    O streaming emite o texto parcial, executa o código ao fechar o bloco
+    (sem consumir o texto final do modelo) e mede os tempos separadamente.
+    """
+    agent_instance.model = stub_model_factory({"Qual a idade mínima?": "result = df['Idade'].min()"})
+    agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+
+    events = list(agent_instance.answer_query_stream("Qual a idade mínima?"))
+
+    partials = [e['content'] for e in events if e['event'] == 'text']
+    assert len(partials) > 1 and partials[0] in partials[-1]
+    assert "ajude" not in partials[-1]
+    final = events[-1]
+    assert final['event'] == 'result'
+    assert final['result'] == {"type": "text", "content": "22"}
+    metrics = final['metrics']
+    assert 0 <= metrics['time_to_first_token'] <= metrics['time_to_code'] <= metrics['time_to_result']
+
+@patch('google.generativeai.GenerativeModel.generate_content')
+def test_suggested_queries_are_answered_without_llm(mock_generate_content, agent_instance, sample_csv_content):
+    """
+    As perguntas sugeridas na pré-análise são respondidas pelo caminho rápido,
+    no mesmo formato de `_execute_code`, sem chamar a API Gemini.
+    """
+    agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+    suggested = agent_instance.pre_analysis()['suggested_queries']
+
+    results = [agent_instance.answer_query(q) for q in suggested]
+
+    mock_generate_content.assert_not_called()
+    assert [r['type'] for r in results] == ['plot', 'table', 'table']
+    counts = results[1]['content']
+    assert dict(zip(counts['Nome'], counts['contagem'])) == {'Ana': 1, 'Bruno': 1, 'Carla': 1, 'Daniel': 1}
+    histogram = results[0]['content'].data[0]
+    assert histogram.type == 'bar' and histogram.y.sum() == 4
+    grouped = agent_instance.answer_query("Média de Salario por Cidade")['content']
+    assert grouped.to_dict() == {'Salvador': 10000.0, 'Recife': 4250.0}
+
+@pytest.mark.parametrize("question", [
+    "Qual o total de Salario por Cidade em 2023?",
+    "Qual a distribuição de Idade entre os moradores de Recife?",
+    "Qual a diferença de Salario entre os top 3?",
+])
+def test_fast_path_falls_back_to_llm_when_question_has_more_than_the_template(
+        question, agent_instance, sample_csv_content, stub_model_factory):
+    """Números, valores das células ou palavras que o template não cobre levam a pergunta ao LLM."""
+    agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+    agent_instance.model = stub_model_factory({question: "result = 'resposta do LLM'"})
+
+    result = agent_instance.answer_query(question)
+
+    assert agent_instance.model.calls == 1
+    assert result == {"type": "text", "content": "resposta do LLM"}
+    assert agent_instance.last_analysis.get("intent") is None
+
+def test_histogram_is_binned_on_the_server(agent_instance):
+    """A figura do histograma traz uma barra por faixa, com tamanho independente do número de linhas."""
+    rows = "\n".join(str((i * 7919) % 100_003) for i in range(200_000))
+    agent_instance.load_file(_mock_upload("valores.csv", f"valor\n{rows}".encode('utf-8')))
+
+    figure = agent_instance.answer_query("Distribuição de valor")['content']
+
+    bars = figure.data[0]
+    assert bars.type == 'bar' and len(bars.x) <= 100
+    assert bars.y.sum() == len(agent_instance.df)
+    assert len(figure.to_json()) < 50_000
+
+def test_prompt_context_respects_token_budget_on_wide_frames(agent_instance, stub_model_factory):
+    """
+    Em datasets largos, o contexto do prompt é truncado ao orçamento de tokens,
+    priorizando as colunas citadas na pergunta, e o tamanho fica registrado.
+    """
+    header = ",".join(f"col_{i}" for i in range(300))
+    rows = "\n".join(",".join(str(i * j) for i in range(300)) for j in range(5))
+    agent_instance.model = stub_model_factory({})
+    agent_instance.load_file(_mock_upload("largo.csv", f"{header}\n{rows}".encode('utf-8')))
+    prompt_options = {**settings['prompt'], 'max_context_tokens': 400}
+
+    with patch.dict('src.agent.settings', {'prompt': prompt_options}):
+        prompt, stats = agent_instance._build_prompt("Qual a soma de col_299 ao longo do tempo?")
+
+    assert agent_instance.prompt_stats[-1] is stats
+    assert "`col_299`" in prompt
+    assert 0 < stats['columns_included'] < stats['columns_total'] == 300
+    # Orçamento do contexto + instruções fixas do prompt.
+    assert stats['prompt_tokens'] < 400 + 300
+
+    # Só os prompts mais recentes ficam guardados.
+    for _ in range(agent_instance.prompt_stats.maxlen + 5):
+        agent_instance._build_prompt("Qual a média de col_1?")
+    assert len(agent_instance.prompt_stats) == settings['prompt']['stats_entries']
+    assert stats['prompt_chars'] == len(prompt)
+
+def test_confirm_on_full_data_replaces_sample_estimate(agent_instance, stub_model_factory):
+    """
+    Uma análise feita sobre a amostra pode ser reavaliada sobre todas as linhas,
+    lendo apenas as colunas usadas e relatando o progresso.
+    """
+    rows = "\n".join(f"{i},{i % 10},g{i % 3}" for i in range(1000))
+    content = f"id,valor,grupo\n{rows}".encode('utf-8')
+    limits = {'sampling_threshold_rows': 100, 'sampling_rows': 50, 'chunk_rows': 64}
+    agent_instance.model = stub_model_factory({"Qual a soma de valor?": "result = df['valor'].sum()"})
+
+    with patch.dict('src.agent.settings', {'file_limits': {**settings['file_limits'], **limits}}):
+        agent_instance.load_file(_mock_upload("big.csv", content))
+    preview = agent_instance.answer_query("Qual a soma de valor?")
+    progress = []
+    exact = agent_instance.confirm_on_full_data(agent_instance.last_analysis, progress=progress.append)
+
+    assert int(preview['content']) < 4500
+    assert exact['content'] == "4500"
+    assert exact['exact'] is True
+    assert progress[-1] == 1.0
+    assert agent_instance.memory_log[-1]['params']['columns'] == ['valor']
+
+    counts = agent_instance.answer_query("Mostre a contagem de categorias em 'grupo'.")
+    assert counts['content']['contagem'].sum() == 50
+    full_counts = agent_instance.confirm_on_full_data(agent_instance.last_analysis)
+    assert full_counts['content']['contagem'].sum() == 1000
+
+    # O top-k devolve linhas inteiras: a confirmação lê todas as colunas.
+    top = agent_instance.answer_query("top 5 valor")
+    assert list(top['content'].columns) == ['id', 'valor', 'grupo']
+    full_top = agent_instance.confirm_on_full_data(agent_instance.last_analysis)
+    assert list(full_top['content'].columns) == ['id', 'valor', 'grupo']
+    assert full_top['content']['valor'].tolist() == [9] * 5
+    assert agent_instance.memory_log[-1]['params']['columns'] is None
+
+def test_zip_with_many_csvs_is_read_in_parallel(agent_instance, stub_model_factory):
+    """
+    Todos os CSVs do ZIP são lidos em paralelo: em `concat` viram um único dataset
+    (amostrado sobre todas as linhas) e em `tables` viram tabelas nomeadas.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as z:
+        for month in range(1, 4):
+            rows = "\n".join(f"{month * 1000 + i},{month}" for i in range(100))
+            z.writestr(f"export/vendas-2024-0{month}.csv", f"id,mes\n{rows}")
+    content = buffer.getvalue()
+    limits = {'sampling_threshold_rows': 150, 'sampling_rows': 60, 'chunk_rows': 32}
+    file_limits = {**settings['file_limits'], **limits}
+
+    with patch.dict('src.agent.settings', {'file_limits': file_limits, 'zip': {'mode': 'concat', 'workers': 2}}):
+        success, message = agent_instance.load_file(_mock_upload("export.zip", content))
+    assert success is True, message
+    assert agent_instance.original_shape == (300, 2)
+    assert agent_instance.is_sampled is True
+    assert len(agent_instance.df) == 60 and agent_instance.df['id'].is_unique
+    assert set(agent_instance.df['mes']) == {1, 2, 3}
+    assert agent_instance.profile.n_rows == 300
+    assert [entry['Linhas'] for entry in agent_instance.ingestion_report] == [100, 100, 100]
+    assert agent_instance.full_source.members == [f"export/vendas-2024-0{m}.csv" for m in range(1, 4)]
+
+    agent_instance.model = stub_model_factory({"Total por mês?": "result = len(vendas_2024_02) + len(df)"})
+    with patch.dict('src.agent.settings', {'file_limits': file_limits, 'zip': {'mode': 'tables', 'workers': 2}}):
+        success, message = agent_instance.load_file(_mock_upload("export.zip", content))
+    assert success is True, message
+    assert list(agent_instance.tables) == ["vendas_2024_01", "vendas_2024_02", "vendas_2024_03"]
+    assert agent_instance.answer_query("Total por mês?")['content'] == "200"
+
+    with zipfile.ZipFile(buffer, 'a') as z:
+        z.writestr("export/clientes.csv", "id,nome\n1,Ana")
+    with patch.dict('src.agent.settings', {'zip': {'mode': 'concat', 'workers': 2}}):
+        success, message = agent_instance.load_file(_mock_upload("export.zip", buffer.getvalue()))
+    assert success is False
+    assert "clientes.csv" in message
+
+def test_confirm_on_full_data_keeps_the_other_zip_tables(agent_instance, stub_model_factory):
+    """No modo `tables`, a confirmação reprocessa `df` e mantém as demais tabelas no escopo do código."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as z:
+        z.writestr("vendas.csv", "id,valor\n" + "\n".join(f"{i},{i % 10}" for i in range(1000)))
+        z.writestr("lojas.csv", "loja,cidade\n1,Recife\n2,Salvador")
+        z.writestr("clientes.csv", "cliente\n" + "\n".join(str(i) for i in range(500)))
+    limits = {'sampling_threshold_rows': 100, 'sampling_rows': 50, 'chunk_rows': 64}
+    agent_instance.model = stub_model_factory({
+        "Quantas linhas?": "result = len(df) + len(lojas)",
+        "Quantos clientes?": "result = len(vendas) + len(clientes)",
+    })
+
+    with patch.dict('src.agent.settings', {'file_limits': {**settings['file_limits'], **limits},
+                                           'zip': {'mode': 'tables', 'workers': 1}}):
+        success, message = agent_instance.load_file(_mock_upload("loja.zip", buffer.getvalue()))
+    assert success is True, message
+
+    assert agent_instance.answer_query("Quantas linhas?")['content'] == "52"
+    assert agent_instance.can_confirm(agent_instance.last_analysis)
+    exact = agent_instance.confirm_on_full_data(agent_instance.last_analysis)
+    assert exact == {"type": "text", "content": "1002", "exact": True}
+
+    # `clientes` também é uma amostra: a confirmação não seria exata e é recusada.
+    assert agent_instance.answer_query("Quantos clientes?")['content'] == "100"
+    assert not agent_instance.can_confirm(agent_instance.last_analysis)
+    refused = agent_instance.confirm_on_full_data(agent_instance.last_analysis)
+    assert refused['type'] == 'error' and "`clientes`" in refused['content']
+
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+def test_load_csv_detects_dialect_in_a_single_parse(agent_instance, engine):
+    """Encoding, delimitador e decimal vêm de um prefixo do arquivo; bytes inválidos depois dele não interrompem a leitura."""
+    rows = "\n".join(f"Região {i};{i},5" for i in range(200))
+    content = f"local;valor\n{rows}\n".encode('latin1')
+    limits = {'sniff_bytes': 1024, 'engine': engine}
+
+    with patch.dict('src.agent.settings', {'csv': limits}):
+        success, message = agent_instance.load_file(_mock_upload("latin1.csv", content))
+        assert success is True, message
+        assert agent_instance.df['local'].iloc[0] == "Região 0"
+        assert agent_instance.df['valor'].sum() == pytest.approx(sum(i + 0.5 for i in range(200)))
+
+        # Só ASCII no prefixo: detecta UTF-8, falha no byte latin1 do final e relê em latin1.
+        content = ("local,valor\n" + "a,1\n" * 500 + "São,2\n").encode('latin1')
+        success, message = agent_instance.load_file(_mock_upload("tail.csv", content))
+        assert success is True, message
+        assert agent_instance.df['local'].iloc[-1] == "São"
+        assert len(agent_instance.df) == 501
+        assert agent_instance.profile.n_rows == 501
+
+        # Cabeçalho numérico (anos) continua sendo cabeçalho, como no `pd.read_csv`.
+        success, message = agent_instance.load_file(_mock_upload("anos.csv", b"2020,2021\n1,2\n3,4\n"))
+        assert success is True, message
+        assert list(agent_instance.df.columns) == ["2020", "2021"]
+        assert len(agent_instance.df) == 2
+
+        # Primeira linha igual às demais em tipo e largura: arquivo sem cabeçalho.
+        success, message = agent_instance.load_file(_mock_upload("dados.csv", b"10,20\n30,40\n50,60\n"))
+        assert success is True, message
+        assert list(agent_instance.df.columns) == [0, 1]
+        assert len(agent_instance.df) == 3
+
+class _BufferUpload(io.BytesIO):
+    """Imita o `UploadedFile` do Streamlit, que é um `BytesIO` com nome."""
+
+    def __init__(self, name: str, content: bytes):
+        super().__init__(content)
+        self.name = name
+
+    def getvalue(self):
+        raise AssertionError("o upload não deve ser copiado com getvalue()")
+
+def test_upload_is_read_without_copies_and_size_limit_is_enforced(agent_instance, sample_csv_content):
+    """O buffer do upload é lido sem cópia; arquivos e ZIPs acima do limite são recusados antes do parse."""
+    success, message = agent_instance.load_file(_BufferUpload("vendas.csv", sample_csv_content.encode('utf-8')))
+    assert success is True, message
+    assert agent_instance.df.shape == (4, 5)
+
+    limits = {**settings['file_limits'], 'max_file_size_mb': 0.01}
+    large = "id,valor\n" + "1,2\n" * 5000
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        z.writestr("grande.csv", large)
+    assert len(buffer.getvalue()) < 10 * 1024
+
+    with patch.dict('src.agent.settings', {'file_limits': limits}):
+        with patch('src.agent.read_csv_streaming') as reader:
+            success, message = agent_instance.load_file(_BufferUpload("grande.csv", large.encode()))
+            assert success is False and "limite" in message
+            success, message = agent_instance.load_file(_BufferUpload("grande.zip", buffer.getvalue()))
+            assert success is False and "descompactado" in message
+            reader.assert_not_called()
+
+def test_sessions_share_one_copy_of_the_same_dataset(agent_instance, sample_csv_content, tmp_path):
+    """
+    Duas sessões com o mesmo arquivo compartilham os dados do registro, sem que
+    alterações de uma atinjam a outra; datasets sem uso saem da memória pelo orçamento.
+    """
+    from src.agent import EDAAgentPro
+    from src.store import DatasetRegistry
+
+    registry = DatasetRegistry(max_bytes=10 * 1024 ** 2, spill=agent_instance.dataset_cache)
+    other = EDAAgentPro(api_key="fake-api-key-for-testing")
+    agent_instance.registry = other.registry = registry
+    content = sample_csv_content.encode('utf-8')
+
+    with patch.object(other, '_read_csv') as mock_read:
+        agent_instance.load_file(_mock_upload("vendas.csv", content))
+        other.load_file(_mock_upload("copia.csv", content))
+        mock_read.assert_not_called()
+    assert other.memory_log[-1]['params']['source'] == "memory"
+    assert other.filename == "copia.csv"
+    assert registry.resident()[0]['Sessões'] == 2
+
+    # Uma escrita no lugar que a análise estática não detecta falha em vez de vazar.
+    with pytest.raises(ValueError, match="read-only"):
+        other._execute_code("idades = df['Idade'].to_numpy()\nidades[0] = -1\nresult = df")
+    assert agent_instance.df.loc[0, 'Idade'] == 28
+
+    other._execute_code("df.loc[0, 'Idade'] = -1\ndf['Nova'] = 1\nresult = df")
+    assert other.df.loc[0, 'Idade'] == -1
+    assert agent_instance.df.loc[0, 'Idade'] == 28
+    assert 'Nova' not in agent_instance.df.columns
+    # A sessão que alterou os dados passou a usar uma cópia própria e devolveu a referência.
+    assert registry.resident()[0]['Sessões'] == 1
+    assert pd.get_option("mode.copy_on_write") is False
+
+    # Ao trocar de arquivo, a referência anterior é devolvida e, sem espaço, o dataset é descartado.
+    registry.max_bytes = 1
+    agent_instance.load_file(_mock_upload("outro.csv", b"a,b\n1,2"))
+    other.load_file(_mock_upload("outro.csv", b"a,b\n1,2"))
+    assert [row['Arquivo'] for row in registry.resident()] == ["outro.csv"]
+    assert registry.stats()['evictions'] == 1
+    assert agent_instance.dataset_cache.contains(other.dataset_key)
+
+def test_interaction_history_spills_old_results_within_budget(agent_instance):
+    """Resultados antigos saem da memória para o disco (e depois são descartados), mantendo os metadados."""
+    rows = "\n".join(f"{i},g{i % 50}" for i in range(2000))
+    agent_instance.load_file(_mock_upload("dados.csv", f"valor,grupo\n{rows}".encode('utf-8')))
+    history = agent_instance.history
+    history.max_memory_bytes = 20 * 1024
+
+    first = agent_instance.answer_query("Mostre a contagem de categorias em 'grupo'.")
+    first_id = history.last_id
+    for _ in range(3):
+        agent_instance.answer_query("Mostre a contagem de categorias em 'valor'.")
+
+    usage = history.usage()
+    assert usage['memory_bytes'] <= history.max_memory_bytes or usage['in_memory'] == 1
+    assert usage['on_disk'] >= 1
+    assert not history.is_resident(first_id)
+    assert history.entry(first_id)['summary'] == {"type": "table", "shape": (50, 2)}
+    assert history.entry(first_id)['params']['intent'] == "value_counts"
+    pd.testing.assert_frame_equal(history.result(first_id)['content'], first['content'])
+    assert agent_instance.memory_log[first_id]['result']['type'] == "table"
+
+    history.max_disk_bytes = 1
+    agent_instance.answer_query("Mostre a contagem de categorias em 'grupo'.")
+    assert history.result(first_id) is None
+    assert history.usage()['evicted'] >= 1
+
+def test_large_plots_are_downsampled_before_rendering(agent_instance, stub_model_factory):
+    """
+    Traces com mais pontos que `plots.max_points` são reduzidos no servidor
+    (LTTB para linhas, binning 2D para dispersões) e passam a usar WebGL.
+    """
+    rows = "\n".join(f"{i},{(i * 7919) % 1000},{i % 5}" for i in range(20000))
+    agent_instance.model = stub_model_factory({
+        "Mostre a linha de valor.": "fig = px.line(df, x='id', y='valor', render_mode='svg')",
+        "Mostre a dispersão.": "fig = px.scatter(df, x='id', y='valor', color='grupo')",
+    })
+    agent_instance.load_file(_mock_upload("serie.csv", f"id,valor,grupo\n{rows}".encode('utf-8')))
+
+    line = agent_instance.answer_query("Mostre a linha de valor.")
+    trace = line['content'].data[0]
+    assert line['points'] == {"points_before": 20000, "points_after": 5000, "traces_reduced": 1}
+    assert trace.type == "scattergl" and len(trace.x) == 5000
+    assert trace.x[0] == 0 and trace.x[-1] == 19999
+
+    # O tamanho da figura vem dos arrays dos traces, sem serializá-la, e é medido
+    # uma só vez para a memória de resultados e o histórico.
+    from src.history import payload_bytes
+    measure = MagicMock(wraps=payload_bytes)
+    with patch('src.agent.payload_bytes', measure), patch('src.memo.payload_bytes', measure), \
+            patch('src.history.payload_bytes', measure), patch('plotly.io.to_json') as serialized:
+        scatter = agent_instance.answer_query("Mostre a dispersão.")
+    figures = [call for call in measure.call_args_list if call.args[0] is scatter['content']]
+    assert len(figures) == 1 and not serialized.called
+    size = agent_instance.history.entry(agent_instance.history.last_id)['bytes']
+    assert size == agent_instance.result_memo.stats()['bytes'] - payload_bytes(line)
+    assert size >= 2 * 8 * scatter['points']['points_after']
+    assert scatter['points']['points_before'] == 20000
+    assert scatter['points']['points_after'] <= 5000
+    # A cor contínua acompanha os pontos escolhidos.
+    points = scatter['content'].data[0]
+    assert len(points.marker.color) == len(points.x) == scatter['points']['points_after']
+
+def test_telemetry_records_pipeline_spans_and_metrics(agent_instance, sample_csv_content, stub_model_factory, tmp_path):
+    """
+    Com a telemetria ativa, cada etapa vira uma linha JSON (com o encadeamento
+    das etapas de uma pergunta) e as métricas agregadas vão para o arquivo
+    no formato do Prometheus. Desativada, nenhum span é criado.
+    """
+    import json
+    from src.telemetry import Telemetry
+
+    assert Telemetry(enabled=False).span("load_file") is Telemetry(enabled=False).span("execute_code")
+
+    telemetry = Telemetry(enabled=True, log_path=str(tmp_path / "spans.jsonl"),
+                          metrics_path=str(tmp_path / "metrics.prom"), flush_seconds=3600)
+    agent_instance.telemetry = telemetry
+    agent_instance.model = stub_model_factory({"Qual a média de idade?": "result = df['Idade'].mean()",
+                                               "Qual a idade máxima?": "result = df['Idade'].max()"})
+    agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+    agent_instance.answer_query("Qual a média de idade?")
+    agent_instance.answer_query("Qual a média de idade?")
+    list(agent_instance.answer_query_stream("Qual a idade máxima?"))
+    telemetry.close()
+
+    spans = [json.loads(line) for line in (tmp_path / "spans.jsonl").read_text().splitlines()]
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span["event"], []).append(span)
+    assert by_name["load_file"][0]["rows"] == 4 and by_name["load_file"][0]["cache_hit"] is False
+    assert by_name["parse"][0]["parent_id"] == by_name["load_file"][0]["span_id"]
+
+    question = by_name["answer_query"][0]
+    children = [span for span in spans if span["parent_id"] == question["span_id"]]
+    assert {span["event"] for span in children} >= {"build_prompt", "generate_content", "execute_code"}
+    assert all(span["trace_id"] == question["trace_id"] for span in children)
+    generation = by_name["generate_content"]
+    assert len(generation) == 2 and generation[0]["prompt_tokens"] > 0 and generation[0]["response_tokens"] > 0
+    # O stream é interrompido ao fechar o bloco de código, antes de a API informar o uso completo.
+    assert generation[1]["streaming"] is True and generation[1]["tokens_estimated"] is True
+    assert by_name["execute_code"][0]["rows"] == 4 and by_name["execute_code"][0]["result_type"] == "text"
+
+    metrics = (tmp_path / "metrics.prom").read_text()
+    assert 'eda_span_seconds_count{span="execute_code"} 3' in metrics
+    assert 'eda_cache_requests_total{cache="answer",result="hit"} 1' in metrics
+    assert 'eda_cache_requests_total{cache="answer",result="miss"} 2' in metrics
+    prompt_tokens = generation[0]["prompt_tokens"] + generation[1]["prompt_tokens"]
+    assert f'eda_prompt_tokens_total{{span="generate_content"}} {prompt_tokens}' in metrics
+
+def test_equivalent_code_reuses_results_until_the_data_changes(agent_instance, sample_csv_content, stub_model_factory):
+    """
+    Código equivalente (formatação, nomes de variáveis e ordem de argumentos
+    nomeados diferentes) não é reexecutado sobre a mesma versão dos dados;
+    código que altera `df` e uma nova carga descartam os resultados memorizados.
+    """
+    from src.memo import analyze_code
+    from src.sandbox import execute_code
+
+    assert analyze_code("fig = px.bar(df, x='Cidade', y='Salario')").key == \
+        analyze_code("fig = px.bar(df,\n    y=\"Salario\", x='Cidade')  # barras").key
+    assert analyze_code("result = df['Idade'].mean()").key != analyze_code("result = df['Salario'].mean()").key
+    assert analyze_code("result = df.sample(2)").memoizable is False
+
+    agent_instance.model = stub_model_factory({
+        "Qual o salário médio?": "salarios = df['Salario']\nresult = salarios.mean()",
+        "Média dos salários": "# média simples\ns = df[\"Salario\"]\n\nresult = s.mean()",
+        "Dobre os salários": "df['Salario'] = df['Salario'] * 2\nresult = 'ok'",
+    })
+    agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+
+    with patch('src.agent.execute_code', wraps=execute_code) as executed:
+        assert agent_instance.answer_query("Qual o salário médio?")['content'] == "7125.0"
+        assert agent_instance.answer_query("Média dos salários")['content'] == "7125.0"
+        assert executed.call_count == 1
+
+        agent_instance.answer_query("Dobre os salários")
+        assert agent_instance.answer_query("Média dos salários")['content'] == "14250.0"
+        assert executed.call_count == 3
+
+        agent_instance.load_file(_mock_upload("test.csv", sample_csv_content.encode('utf-8')))
+        assert agent_instance.answer_query("Média dos salários")['content'] == "7125.0"
+        assert executed.call_count == 4
+    assert agent_instance.result_memo.stats()["hits"] == 1
+
+def test_confirm_on_full_data_loads_every_column_when_df_is_used_whole(agent_instance, stub_model_factory):
+    """
+    Só há poda de colunas quando `df` é usado apenas como `df['col']`; agrupamentos
+    e filtros por máscara precisam das demais colunas e recebem o dataset inteiro.
+    """
+    from src.fulldata import referenced_columns
+
+    columns = ['id', 'valor', 'grupo']
+    assert referenced_columns("result = df['valor'].sum()", columns) == ['valor']
+    assert referenced_columns("result = df.groupby('grupo').mean()", columns) is None
+    assert referenced_columns("result = df[df['valor'] > 8]", columns) is None
+    assert referenced_columns("result = df.nlargest(5, 'valor')", columns) is None
+
+    rows = "\n".join(f"{i},{i % 10},g{i % 3}" for i in range(1000))
+    content = f"id,valor,grupo\n{rows}".encode('utf-8')
+    full = pd.read_csv(io.BytesIO(content))
+    limits = {'sampling_threshold_rows': 100, 'sampling_rows': 50, 'chunk_rows': 64}
+    agent_instance.model = stub_model_factory({
+        "Média por grupo": "result = df.groupby('grupo').mean()",
+        "Linhas com valor acima de 8": "result = df[df['valor'] > 8]",
+    })
+    with patch.dict('src.agent.settings', {'file_limits': {**settings['file_limits'], **limits}}):
+        agent_instance.load_file(_mock_upload("big.csv", content))
+
+    agent_instance.answer_query("Média por grupo")
+    means = agent_instance.confirm_on_full_data(agent_instance.last_analysis)
+    pd.testing.assert_frame_equal(means['content'], full.groupby('grupo').mean(), check_dtype=False)
+
+    agent_instance.answer_query("Linhas com valor acima de 8")
+    filtered = agent_instance.confirm_on_full_data(agent_instance.last_analysis)
+    assert list(filtered['content'].columns) == columns
+    assert len(filtered['content']) == 100 and filtered['exact'] is True
@@ -0,0 +1,52 @@
+# tests/test_benchmarks.py
+# Testes da suíte de benchmarks (benchmarks/): geradores e detecção de regressões.
+
+import copy
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from benchmarks.datasets import KINDS, QUESTIONS, generate, materialize, write_csv
+from benchmarks.run import Case, compare, run_suite
+from src.config import settings
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_generators_are_deterministic_and_round_trip_through_csv(kind):
+    """O mesmo `seed` gera os mesmos dados, e o CSV escrito em blocos relê o dataset inteiro."""
+    frame = generate(kind, 250_000 if kind == "tall" else 2_000, seed=7)
+    pd.testing.assert_frame_equal(frame, generate(kind, len(frame), seed=7))
+    assert not frame.equals(generate(kind, len(frame), seed=8))
+
+    buffer = io.BytesIO()
+    write_csv(kind, len(frame), buffer, seed=7)
+    assert len(pd.read_csv(io.BytesIO(buffer.getvalue()))) == len(frame)
+    # Os ids continuam entre os blocos de geração.
+    assert frame['id'].is_monotonic_increasing and frame['id'].is_unique
+
+def test_benchmark_suite_runs_offline_and_flags_regressions(tmp_path):
+    """
+    A suíte roda com o modelo simulado, restaura as configurações ao final e
+    acusa apenas regressões acima dos limites e do ruído mínimo.
+    """
+    before = copy.deepcopy(settings)
+    cases = [Case("tall", 3_000, "zip"), Case("null_heavy", 3_000, "csv")]
+    document = run_suite(cases, tmp_path / "data", repeat=1, memory=True, report=lambda line: None)
+
+    assert settings == before
+    with zipfile.ZipFile(materialize("tall", 3_000, "zip", tmp_path / "data")) as archive:
+        assert archive.namelist() == ["tall.csv"]
+    stages = document["results"]["tall-3000-zip"]["stages"]
+    assert {"load_file", "handle_zip_file", "pre_analysis"} <= set(stages)
+    assert len([name for name in stages if name.startswith("answer_query")]) == len(QUESTIONS["tall"])
+    assert all(stats["seconds"] > 0 and stats["peak_bytes"] > 0 for stats in stages.values())
+
+    assert compare(document, document) == []
+    slower = copy.deepcopy(document)
+    slower["results"]["tall-3000-zip"]["stages"]["load_file"]["seconds"] += 1.0
+    slower["results"]["null_heavy-3000-csv"]["stages"]["pre_analysis"]["peak_bytes"] += 64 * 1024 ** 2
+    regressions = compare(document, slower, max_slowdown=1.5, max_memory_growth=1.3)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("tall-3000-zip load_file")
+    assert "pico" in regressions[1]
@@ -0,0 +1,47 @@
+# tests/test_sandbox.py
+# Testes do pool de execução isolada (src/sandbox.py).
+
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from src.sandbox import ExecutionPool
+
+@pytest.fixture(scope="module")
+def pool():
+    """Pool com um único worker, compartilhado pelos testes deste módulo."""
+    pool = ExecutionPool(workers=1, timeout_seconds=2, max_memory_mb=256)
+    yield pool
+    pool.close()
+
+@pytest.fixture
+def frames():
+    return {'df': pd.DataFrame({'Cidade': ['Recife', 'Salvador', 'Recife'], 'Salario': [5000, 8000, 3500]})}
+
+def test_pool_returns_tables_and_figures(pool, frames):
+    """Tabelas e figuras voltam do worker no mesmo formato do modo em processo."""
+    table = pool.run("dataset", frames, "result = df.groupby('Cidade')['Salario'].sum()")
+    assert table['type'] == 'table'
+    assert table['content'].to_dict() == {'Recife': 8500, 'Salvador': 8000}
+
+    plot = pool.run("dataset", frames, "fig = px.bar(df, x='Cidade', y='Salario')")
+    assert plot['type'] == 'plot'
+    assert isinstance(plot['content'], go.Figure)
+
+def test_pool_isolates_mutations(pool, frames):
+    """Alterações feitas pelo código gerado não persistem entre execuções."""
+    pool.run("dataset", frames, "df['Salario'] = 0\ndf.loc[0, 'Cidade'] = 'X'")
+    result = pool.run("dataset", frames, "result = df['Salario'].sum()")
+    assert result == {"type": "text", "content": "16500"}
+
+def test_pool_reports_timeout_and_memory_errors(pool, frames):
+    """Estouros de tempo e memória viram erros estruturados e o pool continua ativo."""
+    timeout = pool.run("dataset", frames, "while True:\n    pass")
+    assert timeout['type'] == 'error'
+    assert "tempo limite" in timeout['content']
+
+    memory = pool.run("dataset", frames, "result = bytearray(1024 ** 3)")
+    assert memory['type'] == 'error'
+    assert "memória" in memory['content']
+
+    assert pool.run("dataset", frames, "result = len(df)")['content'] == "3"